@@ -0,0 +1,606 @@
+"""
+Modo de servicio asíncrono (ASGI) de backend_dap.
+
+Los endpoints que esperan al modelo (/pregunta, /resumen_noticias,
+/resumen_diarios, /resumen_do) se atienden aquí con el cliente asíncrono
+del proveedor (AsyncOpenAI, ver llm_utils): mientras una llamada espera al
+modelo, el mismo proceso sigue atendiendo otras, así
+que un worker sostiene cientos de llamadas concurrentes. El resto de las
+rutas (frontend, fechas, PDFs...) se delegan tal cual a la app Flask.
+
+La preparación del contexto (pandas, lectura de archivos) es la misma de
+backend_dap y corre en un thread para no bloquear el event loop.
+
+Configuración recomendada (un worker por CPU, no uno por request en vuelo):
+
+  uvicorn asgi_dap:app --host 0.0.0.0 --port $PORT --workers 2 \\
+      --limit-concurrency 500 --timeout-keep-alive 5
+
+  # o bajo gunicorn, con workers de uvicorn:
+  gunicorn asgi_dap:app -k uvicorn.workers.UvicornWorker -w 2 \\
+      --timeout 120 --bind 0.0.0.0:$PORT
+
+Modo síncrono (el de siempre), que necesita un worker por request en vuelo:
+
+  gunicorn backend_dap:app -w 8 --timeout 120 --bind 0.0.0.0:$PORT
+
+gunicorn lee gunicorn.conf.py del directorio actual: con preload_app los
+índices y cachés se cargan una vez en el master antes del fork (ver ahí).
+
+Para comparar ambos modos con la misma memoria: python loadtest_dap.py
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import backend_dap as dap
+import metricas_utils as metricas
+from uso_utils import iniciar_uso, registrar_uso, terminar_uso, uso
+from llm_utils import (
+    LLM_PLAZO,
+    ModeloNoDisponible,
+    iniciar_plazo,
+    llamar_async,
+    plazo_restante,
+    proveedor,
+    terminar_plazo,
+)
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+# Todo lo que no se atiende aquí pasa a la app Flask
+flask_asgi = WsgiToAsgi(dap.app)
+
+# Vuelos en curso en este proceso: llave -> asyncio.Future
+_vuelos_async = {}
+
+
+def _reiniciar_tras_fork() -> None:
+    # Los futures son del event loop del padre (el cliente lo rehace llm_utils)
+    _vuelos_async.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+async def completar_async(mensajes: list, modelo: str) -> str:
+    """
+    Equivalente asíncrono de backend_dap.completar (mismos reintentos,
+    plazo y circuit breaker).
+    """
+    t0 = time.perf_counter()
+    with metricas.tramo("llm"):
+        texto, usage = await llamar_async(
+            lambda timeout: proveedor().completar_async(mensajes, modelo, timeout)
+        )
+    metricas.registrar_llm(modelo, usage)
+    # SQLite en un thread: el insert no debe frenar el event loop
+    await asyncio.to_thread(registrar_uso, modelo, usage, time.perf_counter() - t0)
+    return texto
+
+
+async def _calcular_con_lock_de_archivo(llave: str, calcular) -> dict:
+    """
+    Igual que backend_dap._calcular_con_lock_de_archivo, sondeando el lock
+    con asyncio.sleep: no bloquea el event loop ni deja un flock pendiente
+    en un thread si el request se cancela.
+    """
+    if dap.fcntl is None:
+        return await calcular()
+
+    ruta = dap.ruta_lock(llave)
+    limite = time.monotonic() + plazo_restante(dap.SINGLEFLIGHT_TIMEOUT)
+    pausa = 0.01
+    while (lock_f := dap.intentar_lock(ruta)) is None:
+        cacheado = dap.leer_resultado_cacheado(llave)
+        if cacheado is not None:
+            return cacheado
+        if time.monotonic() + pausa > limite:
+            raise dap.espera_agotada(llave)
+        await asyncio.sleep(pausa)
+        pausa = min(pausa * 2, 0.5)
+
+    try:
+        cacheado = dap.leer_resultado_cacheado(llave)
+        if cacheado is not None:
+            return cacheado
+        return await calcular()
+    finally:
+        dap.soltar_lock(ruta, lock_f)
+
+
+async def ejecutar_una_vez_async(llave: str, corrutina_fn, respaldo: str | None = None) -> dict:
+    """
+    Single-flight asíncrono: misma semántica que backend_dap.ejecutar_una_vez
+    (y comparte con él la caché en disco, los locks entre workers y el
+    respaldo que se sirve si el modelo no está disponible).
+    """
+    try:
+        return await _ejecutar_una_vez_async(llave, corrutina_fn, respaldo)
+    except ModeloNoDisponible:
+        anterior = dap.leer_resultado_cacheado(respaldo) if respaldo else None
+        metricas.registrar_cache("respaldo", anterior is not None)
+        if anterior is None:
+            raise
+        return {**anterior, "desactualizado": True}
+
+
+async def _ejecutar_una_vez_async(llave: str, corrutina_fn, respaldo: str | None) -> dict:
+    cacheado = dap.leer_resultado_cacheado(llave)
+    metricas.registrar_cache("resultados", cacheado is not None)
+    if cacheado is not None:
+        return cacheado
+
+    vuelo = _vuelos_async.get(llave)
+    if vuelo is not None:
+        try:
+            return await asyncio.shield(vuelo)
+        except asyncio.CancelledError:
+            # Se canceló el líder (su cliente se desconectó), no este request:
+            # se vuelve a intentar, ahora posiblemente como líder
+            if not vuelo.cancelled() or asyncio.current_task().cancelling():
+                raise
+            return await _ejecutar_una_vez_async(llave, corrutina_fn, respaldo)
+
+    vuelo = asyncio.get_running_loop().create_future()
+    # Evita el aviso "exception was never retrieved" si nadie más esperaba
+    vuelo.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _vuelos_async[llave] = vuelo
+
+    async def calcular():
+        resultado = await corrutina_fn()
+        if not resultado.get("error"):
+            dap.guardar_resultado_cacheado(llave, resultado)
+            if respaldo:
+                dap.guardar_resultado_cacheado(respaldo, resultado)
+        return resultado
+
+    try:
+        resultado = await _calcular_con_lock_de_archivo(llave, calcular)
+        vuelo.set_result(resultado)
+        return resultado
+    except Exception as e:
+        vuelo.set_exception(e)
+        raise
+    finally:
+        # Una cancelación no pasa por el except: sin esto quienes esperan
+        # el vuelo quedarían colgados
+        if not vuelo.done():
+            vuelo.cancel()
+        _vuelos_async.pop(llave, None)
+
+
+async def generar_resumen_noticias_async(fecha_str: str) -> dict:
+    resultado, mensajes = await asyncio.to_thread(dap.preparar_resumen_noticias, fecha_str)
+    if resultado is not None:
+        return resultado
+
+    resumen_texto = await completar_async(
+        mensajes, os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini")
+    )
+    return {
+        "fecha": fecha_str,
+        "resumen": resumen_texto,
+    }
+
+
+async def generar_resumen_diarios_async(fecha_str: str, jurisdiccion_filtro: str | None) -> dict:
+    resultado, tareas = await asyncio.to_thread(
+        dap.preparar_resumen_diarios, fecha_str, jurisdiccion_filtro
+    )
+    if resultado is not None:
+        return resultado
+
+    # Las jurisdicciones se resumen en paralelo, no una tras otra
+    modelo = os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")
+    textos = await asyncio.gather(*(completar_async(m, modelo) for _, m in tareas))
+    return dap.armar_resumen_diarios(
+        fecha_str, [(jur, txt) for (jur, _), txt in zip(tareas, textos)]
+    )
+
+
+async def obtener_resumen_noticias_async(fecha_str: str) -> dict:
+    version = await asyncio.to_thread(dap.version_datos_noticias, fecha_str)
+    llave = dap.llave_resumen("noticias", fecha_str, None, version)
+    with uso(fecha=fecha_str):
+        return await ejecutar_una_vez_async(
+            llave, lambda: generar_resumen_noticias_async(fecha_str),
+            respaldo=dap.llave_respaldo("noticias", fecha_str, None),
+        )
+
+
+async def obtener_resumen_diarios_async(fecha_str: str, jurisdiccion_filtro: str | None) -> dict:
+    jur = jurisdiccion_filtro.strip().upper() if jurisdiccion_filtro else None
+    version = await asyncio.to_thread(dap.version_datos_diarios, fecha_str)
+    llave = dap.llave_resumen("diarios", fecha_str, jur, version)
+    with uso(fecha=fecha_str):
+        return await ejecutar_una_vez_async(
+            llave, lambda: generar_resumen_diarios_async(fecha_str, jur),
+            respaldo=dap.llave_respaldo("diarios", fecha_str, jur),
+        )
+
+
+async def obtener_resumen_noticias_rango_async(desde_str: str, hasta_str: str | None) -> dict:
+    """
+    Igual que backend_dap.obtener_resumen_noticias_rango, pero los resúmenes
+    diarios que falten se generan en paralelo.
+    """
+    dap.parsear_rango(desde_str, hasta_str)
+    hasta_str = hasta_str or desde_str
+    version = await asyncio.to_thread(dap.version_datos_noticias, desde_str, hasta_str)
+    rango = f"{desde_str}..{hasta_str}"
+    llave = dap.llave_resumen("noticias_rango", rango, None, version)
+
+    async def generar():
+        dias = await asyncio.to_thread(dap.dias_con_noticias, desde_str, hasta_str)
+        diarios = await asyncio.gather(*(obtener_resumen_noticias_async(d) for d in dias))
+        resumenes = list(zip(dias, diarios))
+        resultado, mensajes = dap.preparar_resumen_rango("noticias", desde_str, hasta_str, resumenes)
+        if resultado is not None:
+            return resultado
+        return {
+            "desde": desde_str,
+            "hasta": hasta_str,
+            "fechas": [d for d, r in resumenes if not r.get("error") and r.get("resumen")],
+            "resumen": await completar_async(mensajes, os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini")),
+        }
+
+    with uso(fecha=rango):
+        return await ejecutar_una_vez_async(
+            llave, generar, respaldo=dap.llave_respaldo("noticias_rango", rango, None)
+        )
+
+
+async def obtener_resumen_diarios_rango_async(
+    desde_str: str, hasta_str: str | None, jurisdiccion_filtro: str | None
+) -> dict:
+    """
+    Igual que backend_dap.obtener_resumen_diarios_rango, pero los resúmenes
+    diarios que falten se generan en paralelo.
+    """
+    dap.parsear_rango(desde_str, hasta_str)
+    hasta_str = hasta_str or desde_str
+    jur = jurisdiccion_filtro.strip().upper() if jurisdiccion_filtro else None
+    version = await asyncio.to_thread(dap.version_datos_diarios_rango, desde_str, hasta_str)
+    rango = f"{desde_str}..{hasta_str}"
+    llave = dap.llave_resumen("diarios_rango", rango, jur, version)
+
+    async def generar():
+        dias = await asyncio.to_thread(dap.dias_con_diarios, desde_str, hasta_str, jur)
+        diarios = await asyncio.gather(*(obtener_resumen_diarios_async(d, jur) for d in dias))
+        resumenes = list(zip(dias, diarios))
+        resultado, mensajes = dap.preparar_resumen_rango("diarios", desde_str, hasta_str, resumenes)
+        if resultado is not None:
+            return resultado
+        return {
+            "desde": desde_str,
+            "hasta": hasta_str,
+            "fechas": [d for d, r in resumenes if not r.get("error") and r.get("resumen")],
+            "resumen": await completar_async(mensajes, os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")),
+        }
+
+    with uso(fecha=rango):
+        return await ejecutar_una_vez_async(
+            llave, generar, respaldo=dap.llave_respaldo("diarios_rango", rango, jur)
+        )
+
+
+# ------------------------------
+# 📦 Utilidades ASGI
+# ------------------------------
+
+def _args(scope) -> dict:
+    query = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+    return {k: v[0] for k, v in query.items() if v}
+
+
+async def _json_body(receive) -> dict:
+    cuerpo = b""
+    while True:
+        mensaje = await receive()
+        cuerpo += mensaje.get("body", b"")
+        if not mensaje.get("more_body"):
+            break
+    try:
+        data = json.loads(cuerpo or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _if_none_match(scope) -> set:
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"if-none-match":
+            etiquetas = valor.decode("latin-1").split(",")
+            return {e.strip().removeprefix("W/").strip('"') for e in etiquetas}
+    return set()
+
+
+async def _etag_o_304(scope, send, version_fn) -> str | None:
+    """
+    Igual que backend_dap.con_etag: calcula el ETag del request y, si el
+    cliente ya lo tiene, responde 304 y devuelve None. Si no se puede
+    calcular la versión, devuelve "" (respuesta sin ETag).
+    """
+    try:
+        version = await asyncio.to_thread(version_fn, _args(scope))
+    except Exception:
+        return ""
+
+    etag = dap.calcular_etag(
+        scope["path"], scope.get("query_string", b"").decode("utf-8", "replace"), version
+    )
+    coincidencias = _if_none_match(scope)
+    if etag in coincidencias or "*" in coincidencias:
+        await send({
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [
+                (b"etag", f'"{etag}"'.encode("ascii")),
+                (b"cache-control", dap.CACHE_CONTROL_LECTURA.encode("latin-1")),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b""})
+        return None
+    return etag
+
+
+async def _responder(send, payload: dict, status: int = 200, etag: str = "") -> None:
+    cuerpo = json.dumps(payload, sort_keys=True).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(cuerpo)).encode("ascii")),
+        (b"access-control-allow-origin", b"*"),
+    ]
+    if payload.get("desactualizado"):
+        # Respaldo con el modelo caído: que el navegador no lo guarde (ver con_etag)
+        headers.append((b"cache-control", b"no-store"))
+    elif etag and status == 200:
+        headers.append((b"etag", f'"{etag}"'.encode("ascii")))
+        headers.append((b"cache-control", dap.CACHE_CONTROL_LECTURA.encode("latin-1")))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers,
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def _responder_stream(send, generador) -> None:
+    """
+    Manda cada línea del generador (síncrono) en cuanto sale; el generador
+    avanza en un thread para no bloquear el event loop mientras espera al modelo.
+    """
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/x-ndjson"),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    while True:
+        linea = await asyncio.to_thread(next, generador, None)
+        if linea is None:
+            break
+        await send({"type": "http.response.body", "body": linea.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# ------------------------------
+# 🌐 Endpoints asíncronos
+# ------------------------------
+
+async def resumen_noticias(scope, receive, send):
+    args = _args(scope)
+    fecha_str = args.get("fecha")
+    desde_str = args.get("desde")
+    if not fecha_str and not desde_str:
+        return await _responder(send, {"error": "Debe especificar una fecha en formato YYYY-MM-DD"}, 400)
+
+    etag = await _etag_o_304(scope, send, dap.version_http_resumen_noticias)
+    if etag is None:
+        return
+
+    try:
+        if fecha_str:
+            resultado = await obtener_resumen_noticias_async(fecha_str)
+        else:
+            resultado = await obtener_resumen_noticias_rango_async(desde_str, args.get("hasta"))
+    except FileNotFoundError as e:
+        return await _responder(send, {"error": str(e)}, 500)
+    except ValueError as e:
+        return await _responder(send, {"error": str(e)}, 400)
+    except ModeloNoDisponible as e:
+        print("⚠️ /resumen_noticias (async) sin modelo ni respaldo:", repr(e))
+        return await _responder(send, {"error": dap.ERROR_MODELO_NO_DISPONIBLE}, 503)
+    except Exception as e:
+        print("❌ Error en /resumen_noticias (async):", repr(e))
+        return await _responder(send, {"error": "Error interno al generar el resumen"}, 500)
+
+    if resultado.get("error") in ("No hay noticias para esa fecha", "No hay noticias en ese rango de fechas"):
+        return await _responder(send, resultado, 404)
+    await _responder(send, resultado, 200, etag)
+
+
+async def _resumen_diarios_comun(
+    send, fecha_str: str, jurisdiccion: str | None, incluir_jurisdiccion: bool, etag: str = ""
+):
+    try:
+        resultado = await obtener_resumen_diarios_async(fecha_str, jurisdiccion)
+    except FileNotFoundError as e:
+        return await _responder(send, {"error": str(e)}, 500)
+    except ValueError as e:
+        return await _responder(send, {"error": str(e)}, 400)
+    except ModeloNoDisponible as e:
+        print("⚠️ Resumen normativo (async) sin modelo ni respaldo:", repr(e))
+        return await _responder(send, {"error": dap.ERROR_MODELO_NO_DISPONIBLE}, 503)
+    except Exception as e:
+        print("❌ Error en resumen normativo (async):", repr(e))
+        return await _responder(send, {"error": "Error interno al generar el resumen normativo"}, 500)
+
+    payload = {
+        "fecha": resultado.get("fecha", fecha_str),
+        "resumen": resultado.get("resumen", ""),
+    }
+    if incluir_jurisdiccion:
+        payload["jurisdiccion"] = jurisdiccion
+    if resultado.get("desactualizado"):
+        payload["desactualizado"] = True
+    if resultado.get("error"):
+        payload["error"] = resultado["error"]
+        return await _responder(send, payload, 404)
+    await _responder(send, payload, 200, etag)
+
+
+async def resumen_diarios(scope, receive, send):
+    args = _args(scope)
+    fecha_str = args.get("fecha")
+    desde_str = args.get("desde")
+    if not fecha_str and not desde_str:
+        return await _responder(send, {"error": "Debe especificar una fecha en formato YYYY-MM-DD"}, 400)
+
+    jurisdiccion = args.get("jurisdiccion")
+    if jurisdiccion:
+        jurisdiccion = jurisdiccion.strip().upper()
+
+    etag = await _etag_o_304(scope, send, dap.version_http_resumen_diarios)
+    if etag is None:
+        return
+
+    if not fecha_str:
+        try:
+            resultado = await obtener_resumen_diarios_rango_async(desde_str, args.get("hasta"), jurisdiccion)
+        except FileNotFoundError as e:
+            return await _responder(send, {"error": str(e)}, 500)
+        except ValueError as e:
+            return await _responder(send, {"error": str(e)}, 400)
+        except ModeloNoDisponible as e:
+            print("⚠️ /resumen_diarios (rango, async) sin modelo ni respaldo:", repr(e))
+            return await _responder(send, {"error": dap.ERROR_MODELO_NO_DISPONIBLE}, 503)
+        except Exception as e:
+            print("❌ Error en /resumen_diarios (rango, async):", repr(e))
+            return await _responder(send, {"error": "Error interno al generar el resumen normativo"}, 500)
+        return await _responder(send, resultado, 404 if resultado.get("error") else 200, etag)
+
+    await _resumen_diarios_comun(send, fecha_str, jurisdiccion, incluir_jurisdiccion=False, etag=etag)
+
+
+async def resumen_do(scope, receive, send):
+    data = await _json_body(receive)
+    fecha_str = data.get("fecha")
+    jurisdiccion = data.get("jurisdiccion")
+
+    if not fecha_str:
+        return await _responder(send, {"error": "Debe especificar 'fecha' en el cuerpo JSON"}, 400)
+    if not jurisdiccion:
+        return await _responder(send, {"error": "Debe especificar 'jurisdiccion' en el cuerpo JSON"}, 400)
+
+    jurisdiccion = str(jurisdiccion).strip().upper()
+    await _resumen_diarios_comun(send, fecha_str, jurisdiccion, incluir_jurisdiccion=True)
+
+
+async def pregunta(scope, receive, send):
+    data = await _json_body(receive)
+    texto_pregunta = data.get("pregunta", "")
+    fecha_str = data.get("fecha")
+
+    if not texto_pregunta or not isinstance(texto_pregunta, str):
+        return await _responder(send, {"error": "Debe especificar el campo 'pregunta' en el cuerpo JSON"}, 400)
+
+    payload, status, mensajes = await asyncio.to_thread(
+        dap.preparar_pregunta, texto_pregunta, fecha_str, data.get("desde"), data.get("hasta")
+    )
+    if mensajes is None:
+        return await _responder(send, payload, status)
+
+    if data.get("stream") is True:
+        return await _responder_stream(send, dap.generar_respuesta_stream(payload, mensajes))
+
+    try:
+        with uso(fecha=dap.fecha_de_payload(payload)):
+            respuesta = await completar_async(mensajes, os.getenv("PREGUNTA_MODEL", "gpt-4o-mini"))
+    except ModeloNoDisponible as e:
+        print("⚠️ /pregunta (async) sin modelo:", repr(e))
+        return await _responder(send, {"error": dap.ERROR_MODELO_NO_DISPONIBLE}, 503)
+    except Exception as e:
+        print("❌ Error en /pregunta (async) al llamar a OpenAI:", repr(e))
+        return await _responder(send, {"error": "Error interno al generar la respuesta de la pregunta"}, 500)
+
+    payload["respuesta"] = respuesta
+    await _responder(send, payload, 200)
+
+
+async def _con_metricas(handler, scope, receive, send):
+    """
+    Mismas métricas que los hooks de la app Flask: latencia y status por
+    endpoint, tramos del request y, con SERVER_TIMING=1, el header. También
+    fija el plazo de las llamadas al modelo (backend_dap.PLAZOS_LLM) y el
+    endpoint al que se anota su uso (uso_utils).
+    """
+    t0 = time.perf_counter()
+    token = metricas.iniciar_request()
+    token_plazo = iniciar_plazo(dap.PLAZOS_LLM.get(scope["path"], LLM_PLAZO))
+    token_uso = iniciar_uso(endpoint=scope["path"])
+    status = [500]
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.start":
+            status[0] = mensaje["status"]
+            if metricas.SERVER_TIMING:
+                valor = metricas.server_timing(metricas.tramos_request(), time.perf_counter() - t0)
+                mensaje = {**mensaje, "headers": [*mensaje["headers"], (b"server-timing", valor.encode("latin-1"))]}
+        await send(mensaje)
+
+    try:
+        return await handler(scope, receive, enviar)
+    finally:
+        metricas.registrar_request(scope["path"], scope["method"], status[0], time.perf_counter() - t0)
+        metricas.terminar_request(token)
+        terminar_plazo(token_plazo)
+        terminar_uso(token_uso)
+
+
+RUTAS = {
+    ("POST", "/pregunta"): pregunta,
+    ("GET", "/resumen_noticias"): resumen_noticias,
+    ("GET", "/resumen_diarios"): resumen_diarios,
+    ("POST", "/resumen_do"): resumen_do,
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                # Sin preload cada worker calienta en un thread; /ready da 503 mientras tanto
+                dap.iniciar_calentamiento()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http":
+        handler = RUTAS.get((scope["method"], scope["path"]))
+        # async=1 solo encola un job (rápido): lo atiende la app Flask
+        if handler is not None and _args(scope).get("async") != "1":
+            if dap.estado_calentamiento()["estado"] == "calentando":
+                await asyncio.to_thread(dap.esperar_calentamiento)
+            return await _con_metricas(handler, scope, receive, send)
+
+    # OPTIONS (CORS preflight) y el resto de rutas: app Flask
+    await flask_asgi(scope, receive, send)
@@ -1,9 +1,85 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from __future__ import annotations
+
+from flask import (
+    Flask,
+    g,
+    has_request_context,
+    jsonify,
+    make_response,
+    request,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+)
 from flask_cors import CORS   # 👈 NUEVA LÍNEA
 import os
+import sys
+import hashlib
+import io
+import json
+import re
+import contextvars
+import threading
+import time
+import zipfile
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-import pandas as pd
-from openai import OpenAI
+from functools import lru_cache, wraps
+from urllib.parse import quote
+
+try:
+    import fcntl  # Solo existe en Unix; en Windows el single-flight es por proceso
+except ImportError:
+    fcntl = None
+
+from contexto_utils import (
+    agrupar_casi_duplicados,
+    empacar_bloques,
+    empacar_lineas,
+    jaccard,
+    normalizar,
+    palabras_titular,
+    presupuesto_tokens,
+)
+from do_textos_utils import cargar_indice_offsets, leer_lineas, leer_seccion, resolver_ruta
+from jobs_utils import encolar, obtener_job, registrar_tipo
+from llm_utils import (
+    LLM_PLAZO,
+    LLM_PROVEEDOR,
+    ModeloNoDisponible,
+    circuito,
+    iniciar_plazo,
+    llamar,
+    plazo_restante,
+    proveedor,
+    stream_protegido,
+    terminar_plazo,
+)
+from items_do_utils import ITEMS_DO_LIMITE, buscar_items, sincronizar_items, version_items
+from fechas_utils import SIN_FECHA, fechas_de_ordinales, iso_de_ordinal, ordinales_fecha
+from perezoso_utils import importar_perezoso
+from uso_utils import AGRUPACIONES, iniciar_uso, registrar_uso, reporte_uso, terminar_uso, uso
+from metricas_utils import (
+    SERVER_TIMING,
+    exportar_prometheus,
+    iniciar_perfil,
+    iniciar_request,
+    observar,
+    registrar_cache,
+    registrar_llm,
+    registrar_medidor,
+    registrar_request,
+    server_timing,
+    terminar_perfil,
+    terminar_request,
+    tramo,
+    tramos_request,
+)
+
+# pandas, numpy y el SDK de OpenAI (ver llm_utils) tardan más de un segundo
+# en importarse: se cargan la primera vez que se usan, no al arrancar el proceso
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
 
 
 # ------------------------------
@@ -13,12 +89,26 @@ from openai import OpenAI
 app = Flask(__name__, static_folder="static", static_url_path="/static")
 CORS(app, resources={r"/*": {"origins": "*"}})  # 👈 Habilita CORS para todo
 
-# Cliente OpenAI
+# Modelo: proveedor de llm_utils (LLM_PROVEEDOR=openai por defecto, o
+# "falso" para correr sin red). Sin la llave la app arranca igual (fechas,
+# PDFs, /health...) y solo fallan los endpoints que llaman al modelo.
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("Falta la variable de entorno OPENAI_API_KEY")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+if LLM_PROVEEDOR == "openai" and not OPENAI_API_KEY:
+    print("⚠️ Falta la variable de entorno OPENAI_API_KEY: los resúmenes y /pregunta van a fallar")
+
+# Plazo (segundos) de las llamadas al modelo de cada endpoint, reintentos
+# incluidos. Se ajusta con PLAZOS_LLM='{"/pregunta": 20}'. Fuera de un
+# request (jobs, CLI) vale LLM_PLAZO.
+PLAZOS_LLM = {
+    "/pregunta": 30,
+    "/resumen_noticias": 100,
+    "/resumen_diarios": 100,
+    "/resumen_do": 60,
+    **json.loads(os.getenv("PLAZOS_LLM") or "{}"),
+}
+
+# Respuesta cuando el modelo no contesta y no hay un resumen anterior que servir
+ERROR_MODELO_NO_DISPONIBLE = "El modelo no está disponible en este momento; intenta de nuevo en unos segundos"
 
 # Orden en el que queremos mostrar las jurisdicciones
 ORDEN_JURISDICCIONES = ["DOF", "SONORA", "VERACRUZ", "CDMX"]
@@ -47,14 +137,126 @@ ORDEN_TEMATICO = [
 # 🔧 Helpers
 # ------------------------------
 
-def cargar_noticias_dap_por_fecha(fecha_str: str) -> pd.DataFrame:
+def completar(mensajes: list, modelo: str) -> str:
     """
-    Carga noticias desde noticias_dap.csv y devuelve solo las de la fecha indicada.
-    - fecha_str debe venir en formato 'YYYY-MM-DD'.
+    Llamada síncrona al modelo (temperature=0) y texto de la respuesta, con
+    reintentos dentro del plazo del request y circuit breaker (llm_utils.llamar):
+    si el modelo no contesta lanza ModeloNoDisponible.
+    El modo asíncrono (asgi_dap.py) hace la misma llamada con completar_async.
+    """
+    t0 = time.perf_counter()
+    with tramo("llm"):
+        texto, usage = llamar(lambda timeout: proveedor().completar(mensajes, modelo, timeout))
+    registrar_llm(modelo, usage)
+    registrar_uso(modelo, usage, time.perf_counter() - t0)
+    return texto
+
+
+def completar_lote(solicitudes: dict, fechas: dict | None = None) -> dict:
+    """
+    Muchas llamadas como un solo trabajo: {id: (mensajes, modelo)} ->
+    {id: texto o Exception}. Con OpenAI es un batch (más barato, pero tarda
+    minutos u horas): solo para pregenerar, nunca dentro de un request.
+    fechas ({id: fecha}) atribuye el uso de cada solicitud a su fecha.
+    """
+    with tramo("llm_lote"):
+        respuestas = proveedor().completar_lote(solicitudes)
+    textos = {}
+    for id_, respuesta in respuestas.items():
+        if isinstance(respuesta, Exception):
+            textos[id_] = respuesta
+            continue
+        texto, usage = respuesta
+        registrar_llm(solicitudes[id_][1], usage)
+        registrar_uso(solicitudes[id_][1], usage, tipo="lote", fecha=(fechas or {}).get(id_))
+        textos[id_] = texto
+    return textos
+
+
+def completar_stream(mensajes: list, modelo: str, fecha: str | None = None):
+    """
+    Como completar(), pero genera el texto por pedazos conforme llega (sin
+    reintentos: lo ya mandado no se puede repetir).
+    """
+    t0 = time.perf_counter()
+
+    def al_terminar(usage):
+        registrar_llm(modelo, usage)
+        registrar_uso(modelo, usage, time.perf_counter() - t0, tipo="stream", fecha=fecha)
+
+    yield from stream_protegido(lambda timeout: proveedor().stream(
+        mensajes, modelo, al_terminar=al_terminar, timeout=timeout
+    ))
+    # Fuera de tramo(): el generador se consume cuando el request ya terminó
+    observar("dap_tramo_segundos", time.perf_counter() - t0, tramo="llm_stream")
+
+
+# Rango máximo (en días) que aceptan los parámetros desde/hasta
+RANGO_MAX_DIAS = int(os.getenv("RANGO_MAX_DIAS", "31"))
+
+# Última versión leída de noticias_dap.csv: firma (mtime, tamaño) ->
+# DataFrame ordenado por fecha + lista de sus ordinales (fechas_utils) para
+# cortar rangos con bisect, y la versión de cada día (ver version_datos_noticias)
+_noticias_cache = {"firma": None, "df": None, "fechas": None, "dias": [], "versiones": {}}
+
+
+def parsear_fecha(fecha_str: str):
+    try:
+        return datetime.strptime(fecha_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("La fecha debe ir en formato YYYY-MM-DD")
+
+
+def parsear_rango(desde_str: str, hasta_str: str | None = None) -> tuple:
+    """
+    Valida un rango desde/hasta (YYYY-MM-DD, ambos inclusive) y lo devuelve
+    como (date, date). Sin 'hasta', el rango es solo el día 'desde'.
+    """
+    desde = parsear_fecha(desde_str)
+    hasta = parsear_fecha(hasta_str) if hasta_str else desde
+    if hasta < desde:
+        raise ValueError("'desde' no puede ser posterior a 'hasta'")
+    if (hasta - desde).days + 1 > RANGO_MAX_DIAS:
+        raise ValueError(f"El rango no puede abarcar más de {RANGO_MAX_DIAS} días")
+    return desde, hasta
+
+
+def cortar_rango(df: pd.DataFrame, fechas: list, desde, hasta) -> pd.DataFrame:
+    """
+    Filas de df (ordenado por fecha, con los ordinales de sus fechas en la
+    lista 'fechas') entre los date desde y hasta inclusive, en O(log n) con
+    bisect sobre enteros.
+    """
+    return df.iloc[bisect_left(fechas, desde.toordinal()):bisect_right(fechas, hasta.toordinal())]
+
+
+def cargar_noticias_dap() -> tuple[pd.DataFrame, list]:
+    """
+    Lee noticias_dap.csv una sola vez por versión del archivo (mtime + tamaño)
+    y devuelve (df ordenado por fecha, lista de ordinales de sus fechas).
+
+    Cada fila trae fecha_ord (ordinal int32, ver fechas_utils) y
+    fecha_parsed (el date correspondiente); las filas sin fecha válida se
+    descartan.
+
+    El orden original del CSV se conserva dentro de cada día. El DataFrame
+    devuelto es compartido: quien lo modifique debe hacer .copy().
     """
     if not os.path.exists(NOTICIAS_DAP_CSV):
         raise FileNotFoundError(f"No se encontró el archivo {NOTICIAS_DAP_CSV}")
 
+    st = os.stat(NOTICIAS_DAP_CSV)
+    firma = (st.st_mtime_ns, st.st_size)
+    if _noticias_cache["firma"] == firma:
+        registrar_cache("noticias_csv", True)
+        return _noticias_cache["df"], _noticias_cache["fechas"]
+
+    registrar_cache("noticias_csv", False)
+    with tramo("carga_noticias"):
+        return _cargar_noticias_dap(firma)
+
+
+def _cargar_noticias_dap(firma: tuple) -> tuple[pd.DataFrame, list]:
     df = pd.read_csv(NOTICIAS_DAP_CSV)
 
     columnas_esperadas = ["fecha", "titular", "termino", "enlace", "medio"]
@@ -65,25 +267,132 @@ def cargar_noticias_dap_por_fecha(fecha_str: str) -> pd.DataFrame:
                 f"pero las columnas actuales son: {list(df.columns)}"
             )
 
-    # Normalizar fechas del CSV a date
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
+    # Normalizar fechas del CSV (DD/MM/YYYY o ISO) a ordinales
+    df["fecha_ord"] = ordinales_fecha(df["fecha"])
+    df = (
+        df[df["fecha_ord"] != SIN_FECHA]
+        .sort_values("fecha_ord", kind="stable")
+        .reset_index(drop=True)
+    )
+    df["fecha_parsed"] = fechas_de_ordinales(df["fecha_ord"])
 
-    try:
-        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-    except ValueError:
-        raise ValueError("La fecha debe ir en formato YYYY-MM-DD")
+    versiones = _versiones_por_dia(df)
+    _noticias_cache["firma"] = firma
+    _noticias_cache["df"] = df
+    _noticias_cache["fechas"] = df["fecha_ord"].tolist()
+    _noticias_cache["dias"] = sorted(versiones)
+    _noticias_cache["versiones"] = versiones
+    return df, _noticias_cache["fechas"]
+
+
+def _versiones_por_dia(df: pd.DataFrame) -> dict:
+    """
+    ordinal -> hash de las filas de ese día (en su orden). df viene ordenado
+    por fecha_ord, así que cada día es un tramo contiguo.
+    """
+    if df.empty:
+        return {}
+    hashes = pd.util.hash_pandas_object(
+        df[["fecha", "titular", "termino", "enlace", "medio"]], index=False
+    ).to_numpy()
+    dias, inicios = np.unique(df["fecha_ord"].to_numpy(), return_index=True)
+    fines = [*inicios[1:], len(df)]
+    return {
+        int(dia): hashlib.sha1(hashes[a:b].tobytes()).hexdigest()[:16]
+        for dia, a, b in zip(dias, inicios, fines)
+    }
+
+
+def cargar_noticias_dap_por_fecha(fecha_str: str) -> pd.DataFrame:
+    """
+    Devuelve las noticias de noticias_dap.csv de la fecha indicada.
+    - fecha_str debe venir en formato 'YYYY-MM-DD'.
+    """
+    df, fechas = cargar_noticias_dap()
+    fecha_obj = parsear_fecha(fecha_str)
+    return cortar_rango(df, fechas, fecha_obj, fecha_obj).copy()
+
+
+def cargar_noticias_dap_rango(desde_str: str, hasta_str: str | None = None) -> pd.DataFrame:
+    """
+    Devuelve las noticias entre desde_str y hasta_str (YYYY-MM-DD, inclusive).
+    """
+    df, fechas = cargar_noticias_dap()
+    desde, hasta = parsear_rango(desde_str, hasta_str)
+    return cortar_rango(df, fechas, desde, hasta).copy()
+
+
+def agrupar_noticias(noticias: pd.DataFrame) -> list[dict]:
+    """
+    Agrupa, por día y tema, los titulares que cuentan la misma nota en
+    distintos medios (MinHash sobre los titulares normalizados).
+
+    Cada grupo queda como:
+      {
+        "fecha": "YYYY-MM-DD",
+        "termino": "...",
+        "titular", "medio", "enlace": los del titular representativo
+            (el que más se parece al resto del grupo),
+        "n_medios": medios distintos que la publicaron,
+        "medios": [...],
+        "titulares": [{"titular", "medio", "enlace"}, ...]
+      }
+
+    Los grupos salen por fecha, por tema (ORDEN_TEMATICO primero) y, dentro
+    de cada tema, los de más medios primero.
+    """
+    if noticias.empty:
+        return []
+
+    rango_tema = {t: i for i, t in enumerate(ORDEN_TEMATICO)}
+    grupos = []
+
+    # groupby descarta las llaves NaN: sin fillna se perderían las notas sin tema
+    temas = noticias["termino"].fillna("").astype(str)
+    for (fecha, tema), subset in noticias.groupby([noticias["fecha_parsed"], temas], sort=False):
+        filas = [
+            {
+                "titular": str(row["titular"]).strip(),
+                "medio": str(row.get("medio", "")),
+                "enlace": str(row.get("enlace", "")),
+            }
+            for _, row in subset.iterrows()
+        ]
+        filas = [f for f in filas if f["titular"]]
+
+        for indices in agrupar_casi_duplicados([f["titular"] for f in filas], ignorar=str(tema)):
+            miembros = [filas[i] for i in indices]
+
+            # Representante: el titular con más palabras en común con los demás
+            palabras = [palabras_titular(m["titular"]) for m in miembros]
+            mejor = max(
+                range(len(miembros)),
+                key=lambda i: sum(jaccard(palabras[i], p) for p in palabras),
+            )
+
+            medios = list(dict.fromkeys(m["medio"] for m in miembros if m["medio"]))
+            grupos.append({
+                "fecha": fecha.strftime("%Y-%m-%d"),
+                "termino": str(tema),
+                "titular": miembros[mejor]["titular"],
+                "medio": miembros[mejor]["medio"],
+                "enlace": miembros[mejor]["enlace"],
+                "n_medios": len(medios),
+                "medios": medios,
+                "titulares": miembros,
+            })
 
-    noticias_dia = df[df["fecha_parsed"] == fecha_obj].copy()
-    return noticias_dia
+    grupos.sort(key=lambda g: (
+        g["fecha"], rango_tema.get(g["termino"], len(ORDEN_TEMATICO)), g["termino"], -g["n_medios"]
+    ))
+    return grupos
 
 
 def construir_contexto_por_tema(noticias_dia: pd.DataFrame) -> str:
     """
     Construye un contexto textual donde cada línea es:
-    'tema :: titular'
-    agrupado por tema (termino).
+    'tema :: titular' (con ' (N medios)' si la nota salió en varios medios)
+    agrupado por tema (termino), con una sola línea por nota.
     """
     if noticias_dia.empty:
         return ""
@@ -92,41 +401,42 @@ def construir_contexto_por_tema(noticias_dia: pd.DataFrame) -> str:
     noticias_dia["termino"] = noticias_dia["termino"].astype(str)
     noticias_dia["titular"] = noticias_dia["titular"].astype(str)
 
-    temas_presentes = list(noticias_dia["termino"].unique())
-
-    # Reordenamos según ORDEN_TEMATICO, y luego agregamos cualquier tema extra al final
-    temas_ordenados = []
-    ya_agregados = set()
-
-    for t in ORDEN_TEMATICO:
-        if t in temas_presentes and t not in ya_agregados:
-            temas_ordenados.append(t)
-            ya_agregados.add(t)
-
-    for t in temas_presentes:
-        if t not in ya_agregados:
-            temas_ordenados.append(t)
-            ya_agregados.add(t)
+    # agrupar_noticias ya deja los temas en orden de ORDEN_TEMATICO (y los
+    # extra al final) y, dentro de cada tema, las notas con más medios primero
+    lineas_por_tema = {}
+    for grupo in agrupar_noticias(noticias_dia):
+        tema_norm = grupo["termino"].replace(" ", "_").lower()
+        linea = f"{tema_norm} :: {grupo['titular']}"
+        if grupo["n_medios"] > 1:
+            linea += f" ({grupo['n_medios']} medios)"
+        lineas_por_tema.setdefault(grupo["termino"], []).append(linea)
+
+    # Un bloque por tema, en orden de prioridad; el empaquetador llena el
+    # presupuesto de tokens del modelo y descarta titulares casi duplicados
+    bloques = [(None, lineas_tema) for lineas_tema in lineas_por_tema.values()]
+
+    modelo = os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini")
+    empacado = empacar_bloques(
+        bloques,
+        presupuesto_tokens(modelo),
+        modelo,
+        clave=lambda l: re.sub(r" \(\d+ medios\)$", "", l.split(" :: ", 1)[-1]),
+    )
 
     lineas = []
-    max_contexto_por_tema = 10  # cuántos titulares máximo enviamos al modelo por tema
-
-    for tema in temas_ordenados:
-        subset = noticias_dia[noticias_dia["termino"] == tema].head(max_contexto_por_tema)
-        tema_norm = tema.replace(" ", "_").lower()
-        for _, row in subset.iterrows():
-            titulo = row["titular"].strip()
-            if titulo:
-                lineas.append(f"{tema_norm} :: {titulo}")
+    for n, indices in empacado:
+        lineas.extend(bloques[n][1][i] for i in indices)
 
     contexto = "\n".join(lineas)
     return contexto
 
 
-def generar_resumen_noticias_dap(fecha_str: str) -> dict:
+def preparar_resumen_noticias(fecha_str: str) -> tuple[dict | None, list | None]:
     """
-    Genera el resumen en bullets por tema (sin links) para las noticias de DAP en una fecha.
-    Devuelve un dict listo para jsonify.
+    Arma los mensajes para el resumen de noticias de una fecha.
+
+    Devuelve (resultado, None) si no hace falta llamar al modelo
+    (no hay noticias), o (None, mensajes) en caso contrario.
     """
     noticias_dia = cargar_noticias_dap_por_fecha(fecha_str)
 
@@ -136,9 +446,10 @@ def generar_resumen_noticias_dap(fecha_str: str) -> dict:
             "resumen": "",
             "titulares_por_tema": {},
             "error": "No hay noticias para esa fecha",
-        }
+        }, None
 
-    contexto = construir_contexto_por_tema(noticias_dia)
+    with tramo("contexto"):
+        contexto = construir_contexto_por_tema(noticias_dia)
 
     system_msg = """
 Eres un redactor técnico que elabora un resumen factual de noticias
@@ -183,34 +494,30 @@ Genera el resumen en bullets por tema para la fecha {fecha_str}.
 Cada línea del contexto tiene el formato:
 tema :: titular
 
+Si varios medios publicaron la misma nota, aparece una sola vez con
+"(N medios)" al final: no lo incluyas en el resumen, pero úsalo para
+saber qué hechos tuvieron más cobertura.
+
 Contexto (titulares del día):
 {contexto}
 """
 
-    completion = client.chat.completions.create(
-        model=os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini"),
-        temperature=0,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-    )
+    return None, [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
+    ]
 
-    resumen_texto = completion.choices[0].message.content.strip()
 
-    # También devolvemos las noticias crudas agrupadas por tema
-    titulares_por_tema = {}
-    for tema, group in noticias_dia.groupby("termino"):
-        tema_norm = tema.replace(" ", "_").lower()
-        titulares_por_tema[tema_norm] = []
-        for _, row in group.iterrows():
-            titulares_por_tema[tema_norm].append(
-                {
-                    "titular": str(row["titular"]).strip(),
-                    "medio": str(row["medio"]).strip(),
-                    "enlace": str(row["enlace"]).strip(),
-                }
-            )
+def generar_resumen_noticias_dap(fecha_str: str) -> dict:
+    """
+    Genera el resumen en bullets por tema (sin links) para las noticias de DAP en una fecha.
+    Devuelve un dict listo para jsonify.
+    """
+    resultado, mensajes = preparar_resumen_noticias(fecha_str)
+    if resultado is not None:
+        return resultado
+
+    resumen_texto = completar(mensajes, os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini"))
 
     return {
         "fecha": fecha_str,
@@ -218,6 +525,216 @@ Contexto (titulares del día):
     }
 
 
+# ------------------------------
+# 🏷️ Caché HTTP (ETag + 304)
+# ------------------------------
+
+# Cache-Control de las respuestas con ETag. Por defecto el navegador guarda
+# la respuesta pero la revalida siempre: si los datos no cambiaron, el
+# servidor contesta 304 sin cuerpo y sin recalcular nada.
+CACHE_CONTROL_LECTURA = os.getenv("CACHE_CONTROL_LECTURA", "no-cache")
+
+# Súbelo si cambia el formato de las respuestas sin que cambien los datos
+ETAG_VERSION = os.getenv("ETAG_VERSION", "1")
+
+# Descarga de PDFs: "" (los manda Flask), "x-accel" (nginx) o "x-sendfile"
+PDF_OFFLOAD = os.getenv("PDF_OFFLOAD", "").strip().lower()
+
+# Location interna de nginx que apunta a BASE_DIR (solo con x-accel)
+PDF_ACCEL_PREFIX = os.getenv("PDF_ACCEL_PREFIX", "/pdfs_internos/")
+
+app.config["USE_X_SENDFILE"] = PDF_OFFLOAD == "x-sendfile"
+
+
+def firma_archivo(ruta: str) -> str:
+    """
+    Versión de un archivo (mtime + tamaño); "-" si no existe.
+    """
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return "-"
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def calcular_etag(ruta: str, query: str, version: str) -> str:
+    crudo = "|".join([ETAG_VERSION, ruta, query, version])
+    return hashlib.sha1(crudo.encode("utf-8")).hexdigest()
+
+
+def version_http_resumen_noticias(args) -> str:
+    """
+    Versión de lo que devolvería /resumen_noticias: las noticias del día (o
+    del rango) y el modelo.
+    """
+    return "|".join([os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini"), version_noticias_args(args)])
+
+
+def version_http_resumen_diarios(args) -> str:
+    """
+    Versión de lo que devolvería /resumen_diarios: los resúmenes por tomo
+    del día (o del rango) y el modelo. Falla si faltan o no son válidos los
+    parámetros, y entonces la respuesta sale sin ETag.
+    """
+    if args.get("fecha"):
+        version = version_datos_diarios(args["fecha"])
+    else:
+        version = version_datos_diarios_rango(args["desde"], args.get("hasta"))
+    return "|".join([os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini"), version])
+
+
+def con_etag(version_fn):
+    """
+    Decorador para endpoints GET de solo lectura.
+
+    version_fn() devuelve una cadena que cambia cuando cambian los datos de
+    los que sale la respuesta. Con ella (más ruta y query) se arma un ETag
+    fuerte:
+      - Si el request trae If-None-Match con ese ETag: 304, sin llamar al endpoint.
+      - Si no: se llama al endpoint y, si responde 200, se le agregan
+        ETag y Cache-Control.
+    Si version_fn falla (p. ej. falta el archivo), el endpoint responde como
+    siempre, sin ETag. Una respuesta desactualizada (resumen de respaldo
+    con el modelo caído) sale sin ETag y con no-store, para que no se quede
+    en la caché del navegador cuando el modelo vuelva.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envuelta(*args, **kwargs):
+            try:
+                version = version_fn()
+            except Exception:
+                return vista(*args, **kwargs)
+
+            etag = calcular_etag(
+                request.path, request.query_string.decode("utf-8", "replace"), version
+            )
+            if request.if_none_match.contains(etag):
+                resp = app.response_class(status=304)
+            else:
+                resp = make_response(vista(*args, **kwargs))
+                if g.pop("desactualizado", False):
+                    resp.headers["Cache-Control"] = "no-store"
+                    return resp
+                if resp.status_code != 200:
+                    return resp
+
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = CACHE_CONTROL_LECTURA
+            return resp
+        return envuelta
+    return decorador
+
+
+# ------------------------------
+# 📊 Métricas y perfiles
+# ------------------------------
+
+def _metricas_lru() -> dict:
+    """
+    Hits/misses de los LRU en memoria, leídos de cache_info() al exportar.
+    """
+    caches = {
+        "resumenes": _leer_resumen_version,
+        "hash_pdf": _hash_archivo_version,
+        "embedding_pregunta": _embedding_pregunta,
+    }
+    valores = {}
+    for nombre, fn in caches.items():
+        info = fn.cache_info()
+        valores[(("cache", nombre), ("resultado", "hit"))] = info.hits
+        valores[(("cache", nombre), ("resultado", "miss"))] = info.misses
+    return valores
+
+
+registrar_medidor(
+    "dap_lru_total", "counter", "Consultas a los LRU en memoria por caché y resultado", _metricas_lru
+)
+registrar_medidor(
+    "dap_resumenes_en_curso", "gauge", "Resúmenes calculándose ahora (single-flight)", lambda: len(_vuelos)
+)
+
+
+@app.before_request
+def iniciar_metricas_request():
+    g.t0 = time.perf_counter()
+    g.token_tramos = iniciar_request()
+    g.perfil = iniciar_perfil()
+
+
+@app.after_request
+def registrar_metricas_request(resp):
+    t0 = g.get("t0")
+    if t0 is None:
+        return resp
+    total = time.perf_counter() - t0
+    # La regla (/do_pdfs) y no la ruta, para no abrir una serie por URL
+    endpoint = request.url_rule.rule if request.url_rule else "sin_ruta"
+    registrar_request(endpoint, request.method, resp.status_code, total)
+    if SERVER_TIMING:
+        resp.headers["Server-Timing"] = server_timing(tramos_request(), total)
+    return resp
+
+
+@app.teardown_request
+def cerrar_metricas_request(_error=None):
+    # Corre aunque la vista haya fallado, así el perfilador siempre se apaga
+    perfil = g.pop("perfil", None)
+    if perfil is not None:
+        t0 = g.get("t0", time.perf_counter())
+        terminar_perfil(perfil, f"{request.method} {request.path}", time.perf_counter() - t0)
+    token = g.pop("token_tramos", None)
+    if token is not None:
+        terminar_request(token)
+
+
+# ------------------------------
+# 🛡️ Plazos del modelo
+# ------------------------------
+
+registrar_medidor(
+    "dap_llm_circuito", "gauge", "Estado del circuit breaker del modelo (1 en el estado actual)",
+    lambda: {
+        (("estado", e),): int(circuito.info()["estado"] == e)
+        for e in ("cerrado", "abierto", "semiabierto")
+    },
+)
+
+
+@app.before_request
+def iniciar_plazo_llm():
+    regla = request.url_rule.rule if request.url_rule else None
+    g.token_plazo = iniciar_plazo(PLAZOS_LLM.get(regla, LLM_PLAZO))
+
+
+@app.teardown_request
+def terminar_plazo_llm(_error=None):
+    token = g.pop("token_plazo", None)
+    if token is not None:
+        terminar_plazo(token)
+
+
+@app.before_request
+def iniciar_uso_request():
+    # Las llamadas al modelo de este request se anotan a su regla (ver uso_utils)
+    g.token_uso = iniciar_uso(endpoint=request.url_rule.rule if request.url_rule else "sin_ruta")
+
+
+@app.teardown_request
+def terminar_uso_request(_error=None):
+    token = g.pop("token_uso", None)
+    if token is not None:
+        terminar_uso(token)
+
+
+def marcar_desactualizado() -> None:
+    """
+    Avisa a con_etag que la respuesta en curso es un respaldo (sin ETag).
+    """
+    if has_request_context():
+        g.desactualizado = True
+
+
 # ------------------------------
 # 🌐 Endpoints
 # ------------------------------
@@ -234,45 +751,335 @@ def health():
     return jsonify({"status": "ok", "message": "Backend DAP MVP activo"})
 
 
+@app.route("/cache_stats")
+def cache_stats():
+    """
+    Endpoint:
+      GET /cache_stats
+
+    Hits/misses del LRU de resúmenes, para dimensionar RESUMENES_CACHE_MAX.
+    """
+    return jsonify({"resumenes": stats_cache_resumenes()})
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Endpoint:
+      GET /metrics
+
+    Métricas de este proceso en formato de texto de Prometheus: requests y
+    latencias por endpoint, tramos (carga de índices, contexto, LLM),
+    llamadas y tokens del modelo, y hits/misses de las cachés.
+    """
+    resp = make_response(exportar_prometheus())
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return resp
+
+
+@app.route("/usage")
+def usage():
+    """
+    Endpoint:
+      GET /usage
+      GET /usage?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&por=dia,endpoint,modelo
+
+    Tokens, costo estimado y latencia de las llamadas al modelo de todos los
+    workers (bitácora de uso_utils), entre dos días de llamada (por defecto
+    los últimos 30). `por` elige la agrupación: dia, endpoint, modelo, fecha
+    (de los datos resumidos) y/o tipo (chat, stream, lote); vacío da solo
+    el total.
+    """
+    por = request.args.get("por", "dia,endpoint,modelo")
+    try:
+        reporte = reporte_uso(
+            parsear_fecha(request.args["desde"]) if request.args.get("desde") else None,
+            parsear_fecha(request.args["hasta"]) if request.args.get("hasta") else None,
+            tuple(c.strip() for c in por.split(",") if c.strip()),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "agrupaciones": list(AGRUPACIONES)}), 400
+    except Exception as e:
+        print("❌ Error en /usage:", repr(e))
+        return jsonify({"error": "No se pudo leer la bitácora de uso"}), 500
+    return jsonify(reporte), 200
+
 
 @app.route("/resumen_noticias", methods=["GET"])
+@con_etag(lambda: version_http_resumen_noticias(request.args))
 def resumen_noticias():
     """
     Endpoint:
       GET /resumen_noticias?fecha=YYYY-MM-DD
+      GET /resumen_noticias?desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+
+    Con desde/hasta devuelve un solo resumen del rango (inclusive), armado
+    a partir de los resúmenes diarios.
+
+    Con async=1 no espera al modelo: encola un job y responde 202 con su id
+    (ver /jobs/<id>).
     """
-    fecha_str = request.args.get("fecha")
-    if not fecha_str:
-        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+    if request.args.get("async") == "1":
+        return respuesta_job("resumen_noticias", request.args)
+
+    payload, status = resolver_resumen_noticias(request.args)
+    return jsonify(payload), status
+
+
+def resolver_resumen_noticias(args) -> tuple[dict, int]:
+    """
+    Cuerpo y status de /resumen_noticias para esos parámetros (lo usan el
+    endpoint y los jobs).
+    """
+    fecha_str = args.get("fecha")
+    desde_str = args.get("desde")
+    hasta_str = args.get("hasta")
+    if not fecha_str and not desde_str:
+        return {"error": "Debe especificar una fecha en formato YYYY-MM-DD"}, 400
 
     try:
-        resultado = generar_resumen_noticias_dap(fecha_str)
+        if fecha_str:
+            resultado = obtener_resumen_noticias(fecha_str)
+        else:
+            resultado = obtener_resumen_noticias_rango(desde_str, hasta_str)
     except FileNotFoundError as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return {"error": str(e)}, 400
+    except ModeloNoDisponible as e:
+        print("⚠️ /resumen_noticias sin modelo ni respaldo:", repr(e))
+        return {"error": ERROR_MODELO_NO_DISPONIBLE}, 503
     except Exception as e:
         # log para debug
         print("❌ Error en /resumen_noticias:", repr(e))
-        return jsonify({"error": "Error interno al generar el resumen"}), 500
+        return {"error": "Error interno al generar el resumen"}, 500
 
     # Si no hay noticias, devolvemos 404 lógico, pero con cuerpo útil
-    if resultado.get("error") == "No hay noticias para esa fecha":
-        return jsonify(resultado), 404
+    if resultado.get("error") in ("No hay noticias para esa fecha", "No hay noticias en ese rango de fechas"):
+        return resultado, 404
 
-    return jsonify(resultado), 200
+    return resultado, 200
 
-def cargar_diarios_por_fecha(fecha_str: str) -> pd.DataFrame:
+@app.route("/clusters_noticias", methods=["GET"])
+@con_etag(lambda: version_noticias_args(request.args))
+def clusters_noticias():
+    """
+    Endpoint:
+      GET /clusters_noticias?fecha=YYYY-MM-DD[&termino=gas]
+      GET /clusters_noticias?desde=YYYY-MM-DD&hasta=YYYY-MM-DD[&termino=gas]
+
+    Titulares agrupados por nota (misma noticia en varios medios), por día
+    y tema, con su titular representativo y el número de medios (n_medios).
+    """
+    fecha_str = request.args.get("fecha")
+    desde_str = request.args.get("desde")
+    termino = request.args.get("termino")
+    if not fecha_str and not desde_str:
+        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+
+    try:
+        if fecha_str:
+            noticias = cargar_noticias_dap_por_fecha(fecha_str)
+        else:
+            noticias = cargar_noticias_dap_rango(desde_str, request.args.get("hasta"))
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 500
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if termino:
+        noticias = noticias[noticias["termino"].astype(str) == termino]
+
+    grupos = agrupar_noticias(noticias)
+
+    payload = {
+        "clusters": grupos,
+        "total_titulares": int(len(noticias)),
+        "total_clusters": len(grupos),
+    }
+    if fecha_str:
+        payload["fecha"] = fecha_str
+    else:
+        payload["desde"] = desde_str
+        payload["hasta"] = request.args.get("hasta") or desde_str
+    return jsonify(payload), 200
+
+# ------------------------------
+# 🗃️ Caché del índice normativo y de resúmenes
+# ------------------------------
+
+# Máximo de archivos _resumen.txt que se mantienen en memoria
+RESUMENES_CACHE_MAX = int(os.getenv("RESUMENES_CACHE_MAX", "512"))
+
+# Última versión leída de do_index.csv: firma (mtime, tamaño) -> DataFrame,
+# más una vista ordenada por fecha y sus fechas para cortar rangos con bisect
+_do_index_cache = {
+    "firma": None, "df": None, "ordenado": None, "fechas": None, "pdf_por_id": {}, "texto_por_id": {},
+}
+
+
+def cargar_do_index() -> pd.DataFrame:
+    """
+    Lee do_index.csv una sola vez por versión del archivo (mtime + tamaño).
+
+    Al cargar se precalculan:
+      - fecha_ord / fecha_parsed: la fecha ya normalizada, como ordinal
+        (SIN_FECHA si no se pudo leer) y como date (None), ver fechas_utils
+      - summary_abspath: la ruta absoluta de cada resumen (separadores
+        tipo Windows normalizados y colgada de BASE_DIR si es relativa)
+      - pdf_abspath: la ruta absoluta de cada PDF, y el mapa id -> ruta
+        que usa ruta_pdf_por_id()
+      - el mapa id -> ruta absoluta del texto extraído (text_path) que usa
+        ruta_texto_por_id()
+
+    El DataFrame devuelto es compartido: quien lo modifique debe hacer .copy().
+    """
+    st = os.stat(DO_INDEX_CSV)
+    firma = (st.st_mtime_ns, st.st_size)
+    if _do_index_cache["firma"] == firma:
+        registrar_cache("do_index", True)
+        return _do_index_cache["df"]
+
+    registrar_cache("do_index", False)
+    with tramo("carga_do_index"):
+        return _cargar_do_index(firma)
+
+
+def _cargar_do_index(firma: tuple) -> pd.DataFrame:
+    df = pd.read_csv(DO_INDEX_CSV)
+
+    if "fecha" in df.columns:
+        df["fecha_ord"] = ordinales_fecha(df["fecha"])
+        df["fecha_parsed"] = fechas_de_ordinales(df["fecha_ord"])
+
+    if "summary_path" in df.columns:
+        df["summary_abspath"] = [
+            resolver_ruta(r) if isinstance(r, str) else "" for r in df["summary_path"]
+        ]
+
+    # id -> ruta absoluta del PDF (pdf_path es la carpeta; el archivo se llama como el id)
+    pdf_por_id = {}
+    if "pdf_path" in df.columns and "id" in df.columns:
+        df["pdf_abspath"] = [
+            os.path.normpath(os.path.join(resolver_ruta(carpeta), str(doc_id).strip()))
+            if isinstance(carpeta, str) and carpeta.strip() else ""
+            for carpeta, doc_id in zip(df["pdf_path"], df["id"])
+        ]
+        for doc_id, ruta in zip(df["id"].astype(str), df["pdf_abspath"]):
+            pdf_por_id.setdefault(doc_id, ruta)
+
+    texto_por_id = {}
+    if "id" in df.columns:
+        textos = df["text_path"] if "text_path" in df.columns else [None] * len(df)
+        for doc_id, ruta in zip(df["id"].astype(str), textos):
+            texto_por_id.setdefault(doc_id, resolver_ruta(ruta) if isinstance(ruta, str) else "")
+
+    _do_index_cache["firma"] = firma
+    _do_index_cache["df"] = df
+    _do_index_cache["pdf_por_id"] = pdf_por_id
+    _do_index_cache["texto_por_id"] = texto_por_id
+    _do_index_cache["ordenado"] = None
+    _do_index_cache["fechas"] = None
+    return df
+
+
+def indice_do_ordenado() -> tuple[pd.DataFrame, list]:
+    """
+    Vista de cargar_do_index() ordenada por fecha (sin fechas inválidas) y
+    la lista de sus ordinales, para cortar rangos con bisect. Se arma una
+    vez por versión del índice.
+    """
+    df = cargar_do_index()
+    if _do_index_cache["ordenado"] is None:
+        ordenado = (
+            df[df["fecha_ord"] != SIN_FECHA]
+            .sort_values("fecha_ord", kind="stable")
+            .reset_index(drop=True)
+        )
+        _do_index_cache["ordenado"] = ordenado
+        _do_index_cache["fechas"] = ordenado["fecha_ord"].tolist()
+    return _do_index_cache["ordenado"], _do_index_cache["fechas"]
+
+
+def ruta_pdf_por_id(doc_id: str) -> str | None:
     """
-    Carga el índice normativo (do_index.csv) y devuelve solo los registros
-    de la fecha indicada que ya tienen resumen generado.
-    - fecha_str debe ir en formato 'YYYY-MM-DD'.
+    Ruta absoluta del PDF de un documento del índice, resuelta al cargarlo.
+    None si el id no está en el índice; "" si está pero no tiene pdf_path.
+    """
+    cargar_do_index()
+    return _do_index_cache["pdf_por_id"].get(str(doc_id))
+
+
+def ruta_texto_por_id(doc_id: str) -> str | None:
+    """
+    Como ruta_pdf_por_id, para el texto extraído (do_textos) del documento:
+    None si el id no está en el índice, "" si no tiene text_path.
+    """
+    cargar_do_index()
+    return _do_index_cache["texto_por_id"].get(str(doc_id))
+
+
+@lru_cache(maxsize=1024)
+def _hash_archivo_version(ruta: str, mtime_ns: int, size: int) -> str:
+    # Igual que _leer_resumen_version: mtime_ns y size solo van en la llave
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_archivo(ruta: str) -> str:
+    """
+    sha256 del contenido de un archivo, calculado una vez por versión.
+    """
+    st = os.stat(ruta)
+    return _hash_archivo_version(ruta, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=RESUMENES_CACHE_MAX)
+def _leer_resumen_version(ruta: str, mtime_ns: int, size: int) -> str:
+    # mtime_ns y size solo forman parte de la llave: si el archivo cambia,
+    # la versión anterior deja de pedirse y sale del LRU por sí sola.
+    with open(ruta, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def leer_resumen(ruta: str) -> str | None:
+    """
+    Devuelve el contenido de un _resumen.txt pasando por el LRU.
+    Devuelve None si el archivo no existe.
+    """
+    try:
+        st = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return _leer_resumen_version(ruta, st.st_mtime_ns, st.st_size)
+
+
+def stats_cache_resumenes() -> dict:
+    info = _leer_resumen_version.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_ratio": round(info.hits / total, 4) if total else None,
+        "maxsize": info.maxsize,
+        "currsize": info.currsize,
+    }
+
+
+def cargar_diarios_rango(desde_str: str, hasta_str: str | None = None) -> pd.DataFrame:
+    """
+    Carga el índice normativo (do_index.csv) y devuelve los registros entre
+    desde_str y hasta_str (YYYY-MM-DD, inclusive) que ya tienen resumen generado.
+    - Sin hasta_str, devuelve solo el día desde_str.
     - Filtra filas con summary_path no vacío y status = 'summary_ready' (si existe).
     """
     if not os.path.exists(DO_INDEX_CSV):
         raise FileNotFoundError(f"No se encontró el archivo {DO_INDEX_CSV}")
 
-    df = pd.read_csv(DO_INDEX_CSV)
+    df = cargar_do_index()
 
     columnas_esperadas = [
         "id",
@@ -291,34 +1098,51 @@ def cargar_diarios_por_fecha(fecha_str: str) -> pd.DataFrame:
                 f"Columnas actuales: {list(df.columns)}"
             )
 
-    # Normalizar fecha
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
-
-    try:
-        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-    except ValueError:
-        raise ValueError("La fecha debe ir en formato YYYY-MM-DD")
+    desde, hasta = parsear_rango(desde_str, hasta_str)
 
-    df_dia = df[df["fecha_parsed"] == fecha_obj].copy()
+    # Las fechas ya vienen normalizadas y ordenadas desde indice_do_ordenado()
+    ordenado, fechas = indice_do_ordenado()
+    df_rango = cortar_rango(ordenado, fechas, desde, hasta).copy()
 
     # Nos quedamos solo con documentos que ya tienen resumen
-    def tiene_resumen(row):
-        status = str(row.get("status", "")).strip().lower()
-        summary_path = str(row.get("summary_path", "")).strip()
-        return bool(summary_path) and (status == "summary_ready" or status == "")
+    if not df_rango.empty:
+        df_rango = df_rango[mascara_tiene_resumen(df_rango)]
 
-    if not df_dia.empty:
-        df_dia = df_dia[df_dia.apply(tiene_resumen, axis=1)]
+    return df_rango
 
-    return df_dia
 
-
-def construir_contexto_diarios_por_jurisdiccion(df_dia: pd.DataFrame) -> dict:
+def cargar_diarios_por_fecha(fecha_str: str) -> pd.DataFrame:
+    """
+    Registros de do_index.csv de la fecha indicada (YYYY-MM-DD) que ya tienen
+    resumen generado. Ver cargar_diarios_rango.
+    """
+    return cargar_diarios_rango(fecha_str)
+
+
+def mascara_tiene_resumen(df: pd.DataFrame) -> pd.Series:
+    """
+    True en las filas con summary_path no vacío y status 'summary_ready' o vacío.
+    """
+    status = df["status"].astype(str).str.strip().str.lower()
+    summary_path = df["summary_path"].astype(str).str.strip()
+    return (summary_path != "") & status.isin(["summary_ready", ""])
+
+
+def _clave_bullet(linea: str) -> str | None:
+    # Solo los bullets se deduplican; encabezados ("GAS", "DOF"...) se repiten a propósito
+    return linea if linea.lstrip().startswith("-") else None
+
+
+def construir_contexto_diarios_por_jurisdiccion(
+    df_dia: pd.DataFrame, presupuesto: int | None = None
+) -> dict:
     """
     A partir de las filas del índice de un día,
     construye un dict {jurisdiccion: texto_concatenado_de_resumenes}.
+
+    Cada jurisdicción se llena hasta 'presupuesto' tokens (por defecto, el
+    del modelo de resúmenes normativos) con líneas completas de los
+    resúmenes, sin bullets casi duplicados entre tomos.
     """
     contexto_por_jurisdiccion = {}
     if df_dia.empty:
@@ -328,64 +1152,53 @@ def construir_contexto_diarios_por_jurisdiccion(df_dia: pd.DataFrame) -> dict:
     df_dia["jurisdiccion"] = df_dia["jurisdiccion"].astype(str)
     df_dia["summary_path"] = df_dia["summary_path"].astype(str)
 
-    # Límite de caracteres por jurisdicción para no mandar textos absurdamente grandes
-    max_chars_por_jurisdiccion = int(os.getenv("DO_MAX_CHARS_RESUMENES", "24000"))
+    modelo = os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")
+    if presupuesto is None:
+        presupuesto = presupuesto_tokens(modelo)
 
     for jurisdiccion, group in df_dia.groupby("jurisdiccion"):
         textos = []
         for _, row in group.iterrows():
-            ruta_rel = str(row.get("summary_path", "")).strip()
-            if not ruta_rel:
+            # Ruta absoluta precalculada al cargar el índice (cargar_do_index)
+            ruta_resumen = str(row.get("summary_abspath", "") or "")
+            if not ruta_resumen:
+                ruta_resumen = resolver_ruta(row.get("summary_path", ""))
+            if not ruta_resumen:
                 continue
 
-            # 👇 Normalizar separadores tipo Windows -> separador del SO actual
-            ruta_rel = ruta_rel.replace("\\", os.sep)
-
-            # Normalizamos la ruta tal como viene del CSV
-            ruta_resumen = os.path.normpath(ruta_rel)
-
-            # Si es relativa, la colgamos del directorio base del proyecto
-            if not os.path.isabs(ruta_resumen):
-                ruta_resumen = os.path.join(BASE_DIR, ruta_resumen)
-
-            if not os.path.exists(ruta_resumen):
-                print(f"⚠️ No se encontró resumen: {ruta_resumen}")
-                continue
             try:
-                with open(ruta_resumen, "r", encoding="utf-8") as f:
-                    txt = f.read().strip()
-                if txt:
-                    textos.append(txt)
+                txt = leer_resumen(ruta_resumen)
             except Exception as e:
                 print(f"⚠️ Error al leer resumen {ruta_resumen}: {e}")
+                continue
+
+            if txt is None:
+                print(f"⚠️ No se encontró resumen: {ruta_resumen}")
+                continue
+            if txt:
+                textos.append(txt)
 
         if not textos:
             continue
 
-        texto_concatenado = "\n\n".join(textos)
-        # Recorte por seguridad
-        texto_concatenado = texto_concatenado[:max_chars_por_jurisdiccion]
-        contexto_por_jurisdiccion[jurisdiccion] = texto_concatenado
+        lineas = "\n".join(textos).splitlines()
+        elegidas = empacar_lineas(lineas, presupuesto, modelo, clave=_clave_bullet)
+        if elegidas:
+            contexto_por_jurisdiccion[jurisdiccion] = "\n".join(lineas[i] for i in elegidas)
 
     return contexto_por_jurisdiccion
 
 
 
-def generar_resumen_diarios(fecha_str: str, jurisdiccion_filtro: str | None = None) -> dict:
+def preparar_resumen_diarios(
+    fecha_str: str, jurisdiccion_filtro: str | None = None
+) -> tuple[dict | None, list | None]:
     """
-    Genera un resumen diario normativo por fecha.
-
-    Si jurisdiccion_filtro es None:
-        - Consolida todas las jurisdicciones (DOF, SONORA, VERACRUZ, CDMX, etc.)
-    Si jurisdiccion_filtro tiene valor (ej. "VERACRUZ"):
-        - Solo genera resumen para esa jurisdicción.
+    Arma los mensajes del resumen normativo de una fecha, uno por jurisdicción.
 
-    Devuelve un dict listo para jsonify:
-      {
-        "fecha": "YYYY-MM-DD",
-        "resumen": "DOF\n- ...\nSONORA\n- ...\n...",
-        "error": "..." (opcional)
-      }
+    Devuelve (resultado, None) si no hace falta llamar al modelo (no hay
+    diarios o resúmenes para esa fecha/jurisdicción), o (None, tareas) con
+    tareas = [(jurisdiccion, mensajes), ...] en el orden de presentación.
     """
     df_dia = cargar_diarios_por_fecha(fecha_str)
 
@@ -394,16 +1207,17 @@ def generar_resumen_diarios(fecha_str: str, jurisdiccion_filtro: str | None = No
             "fecha": fecha_str,
             "resumen": "",
             "error": "No hay diarios oficiales para esa fecha",
-        }
+        }, None
 
-    contexto_por_jur = construir_contexto_diarios_por_jurisdiccion(df_dia)
+    with tramo("contexto"):
+        contexto_por_jur = construir_contexto_diarios_por_jurisdiccion(df_dia)
 
     if not contexto_por_jur:
         return {
             "fecha": fecha_str,
             "resumen": "",
             "error": "No hay resúmenes normativos disponibles para esa fecha",
-        }
+        }, None
 
     # Normalizamos filtro de jurisdicción (si viene)
     jurisdiccion_filtro_norm = None
@@ -453,8 +1267,6 @@ SIN introducción.
 SIN conclusiones.
 """
 
-    resumen_final_lineas = []
-
     # Determinar qué jurisdicciones procesar
     if jurisdiccion_filtro_norm:
         # Solo una jurisdicción
@@ -463,7 +1275,7 @@ SIN conclusiones.
                 "fecha": fecha_str,
                 "resumen": "",
                 "error": f"No hay diarios para la jurisdicción '{jurisdiccion_filtro_norm}' en esa fecha",
-            }
+            }, None
         jurisdicciones_a_procesar = [jurisdiccion_filtro_norm]
     else:
         # Todas las jurisdicciones en orden fijo, luego las extra
@@ -481,6 +1293,7 @@ SIN conclusiones.
                 jurisdicciones_a_procesar.append(j_up)
                 ya_agregadas.add(j_up)
 
+    tareas = []
     for jurisdiccion in jurisdicciones_a_procesar:
         contexto = contexto_por_jur.get(jurisdiccion)
         if not contexto:
@@ -496,16 +1309,22 @@ Reescríbelos siguiendo estrictamente las instrucciones editoriales:
 \"\"\"{contexto}\"\"\"
 """
 
-        completion = client.chat.completions.create(
-            model=os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini"),
-            temperature=0,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-        )
+        tareas.append((jurisdiccion, [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg},
+        ]))
+
+    return None, tareas
+
+
+def armar_resumen_diarios(fecha_str: str, resumenes: list) -> dict:
+    """
+    Une las respuestas del modelo [(jurisdiccion, texto), ...] en el
+    resumen final con un bloque por jurisdicción.
+    """
+    resumen_final_lineas = []
 
-        resumen_jur = completion.choices[0].message.content.strip()
+    for jurisdiccion, resumen_jur in resumenes:
         if not resumen_jur:
             continue
 
@@ -528,363 +1347,1488 @@ Reescríbelos siguiendo estrictamente las instrucciones editoriales:
         "resumen": resumen_texto,
     }
 
-# -----------------------------------------
-# 🧠 Helpers para /pregunta
-# -----------------------------------------
 
-def detectar_intencion_pregunta(pregunta: str) -> dict:
+def generar_resumen_diarios(fecha_str: str, jurisdiccion_filtro: str | None = None) -> dict:
     """
-    Analiza la pregunta y devuelve un dict con:
+    Genera un resumen diario normativo por fecha.
+
+    Si jurisdiccion_filtro es None:
+        - Consolida todas las jurisdicciones (DOF, SONORA, VERACRUZ, CDMX, etc.)
+    Si jurisdiccion_filtro tiene valor (ej. "VERACRUZ"):
+        - Solo genera resumen para esa jurisdicción.
+
+    Devuelve un dict listo para jsonify:
       {
-        "tipo": "noticias" | "normativo",
-        "jurisdiccion": "DOF"/"SONORA"/"VERACRUZ"/"CDMX" o None,
-        "termino": uno de ORDEN_TEMATICO o None
+        "fecha": "YYYY-MM-DD",
+        "resumen": "DOF\n- ...\nSONORA\n- ...\n...",
+        "error": "..." (opcional)
       }
     """
-    p = (pregunta or "").lower()
-
-    # Detectar jurisdicción (normativo)
-    jurisdiccion = None
-    if "dof" in p or "diario oficial de la federación" in p:
-        jurisdiccion = "DOF"
-    elif "sonora" in p:
-        jurisdiccion = "SONORA"
-    elif "veracruz" in p:
-        jurisdiccion = "VERACRUZ"
-    elif "cdmx" in p or "ciudad de méxico" in p:
-        jurisdiccion = "CDMX"
-
-    # ¿Es normativo?
-    palabras_normativo = [
-        "dof",
-        "diario oficial",
-        "gaceta",
-        "congreso",
-        "parlamentaria",
-        "ley",
-        "reforma",
-    ]
-    es_normativo = any(w in p for w in palabras_normativo) or jurisdiccion is not None
-
-    # Detectar tema de noticias (termino)
-    termino = None
-    patrones_temas = {
-        "industria_alimentaria": ["industria alimentaria", "alimentos", "alimentaria"],
-        "cemento": ["cemento"],
-        "gas": ["gas"],
-        "impuesto": ["impuesto", "impuestos", "tributario", "fiscal"],
-        "casinos": ["casino", "casinos", "juegos de azar"],
-        "movilidad": ["movilidad", "transporte público", "tráfico", "transito", "tránsito"],
-        "seguridad": ["seguridad", "violencia", "delincuencia"],
-        "agenda nacional": ["agenda nacional", "noticias nacionales"],
-    }
+    resultado, tareas = preparar_resumen_diarios(fecha_str, jurisdiccion_filtro)
+    if resultado is not None:
+        return resultado
 
-    for t, patrones in patrones_temas.items():
-        if any(pat in p for pat in patrones):
-            termino = t
-            break
+    modelo = os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")
+    resumenes = [(jur, completar(mensajes, modelo)) for jur, mensajes in tareas]
+    return armar_resumen_diarios(fecha_str, resumenes)
 
-    tipo = "normativo" if es_normativo else "noticias"
+# -----------------------------------------
+# 🔒 Single-flight + caché de resúmenes
+# -----------------------------------------
 
-    return {
-        "tipo": tipo,
-        "jurisdiccion": jurisdiccion,
-        "termino": termino,
-    }
+# Resultados de resúmenes ya generados (un JSON por llave), compartidos
+# entre threads y entre workers de gunicorn
+RESUMENES_CACHE_DIR = os.getenv(
+    "RESUMENES_CACHE_DIR", os.path.join(BASE_DIR, "cache_resumenes")
+)
 
+# Cuánto espera un request a que otro termine el mismo cálculo
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "300"))
 
-def obtener_ultima_fecha_noticias() -> str | None:
+# Vuelos en curso dentro de este proceso: llave -> {"evento", "resultado", "error"}
+_vuelos = {}
+_vuelos_lock = threading.Lock()
+
+
+def llave_resumen(tipo: str, fecha_str: str, jurisdiccion: str | None, version: str) -> str:
     """
-    Devuelve la fecha más reciente disponible en noticias_dap.csv en formato YYYY-MM-DD.
+    Llave estable de un resumen. Incluye la versión de los datos de entrada y
+    el modelo, así que si cambia un resumen por tomo o el CSV, cambia la llave.
     """
-    if not os.path.exists(NOTICIAS_DAP_CSV):
-        return None
+    modelo = os.getenv(
+        "DO_RESUMEN_MODEL" if tipo.startswith("diarios") else "DAP_RESUMEN_MODEL", "gpt-4o-mini"
+    )
+    crudo = "|".join([tipo, fecha_str, jurisdiccion or "", modelo, version])
+    return hashlib.sha1(crudo.encode("utf-8")).hexdigest()
 
-    df = pd.read_csv(NOTICIAS_DAP_CSV)
-    if "fecha" not in df.columns:
-        return None
 
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
+def llave_respaldo(tipo: str, fecha_str: str, jurisdiccion: str | None) -> str:
+    """
+    Llave del último resumen generado para esos parámetros, sin importar la
+    versión de los datos: es lo que se sirve (marcado como desactualizado)
+    si el modelo no está disponible.
+    """
+    return llave_resumen(tipo, fecha_str, jurisdiccion, "ultimo")
 
-    fechas = df["fecha_parsed"].dropna().unique().tolist()
-    if not fechas:
-        return None
 
-    ultima = max(fechas)
-    return ultima.strftime("%Y-%m-%d")
+def version_datos_noticias(desde_str: str, hasta_str: str | None = None) -> str:
+    """
+    Versión de las noticias de un día (o del rango desde..hasta): sale de
+    los hashes por día calculados al cargar el CSV. Agregar noticias de un
+    día no cambia la de los demás, así que sus resúmenes cacheados, ETags
+    e ids de job siguen valiendo después de cada ingesta.
+    """
+    cargar_noticias_dap()
+    desde = parsear_fecha(desde_str).toordinal()
+    hasta = parsear_fecha(hasta_str or desde_str).toordinal()
+    dias, versiones = _noticias_cache["dias"], _noticias_cache["versiones"]
+    partes = [f"{d}:{versiones[d]}" for d in dias[bisect_left(dias, desde):bisect_right(dias, hasta)]]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:16]
 
 
-def obtener_ultima_fecha_diarios() -> str | None:
+def version_noticias_args(args) -> str:
     """
-    Devuelve la fecha más reciente disponible en do_index.csv (con resumen listo)
-    en formato YYYY-MM-DD.
+    version_datos_noticias para los parámetros fecha o desde/hasta de un
+    request. Falla si faltan o no son válidos (la respuesta sale sin ETag).
     """
-    if not os.path.exists(DO_INDEX_CSV):
-        return None
+    if args.get("fecha"):
+        return version_datos_noticias(args["fecha"])
+    return version_datos_noticias(args["desde"], args.get("hasta"))
 
-    df = pd.read_csv(DO_INDEX_CSV)
-    if "fecha" not in df.columns:
-        return None
 
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
+def _version_resumenes(df: pd.DataFrame) -> str:
+    """
+    Versión de un conjunto de filas del índice: ruta, mtime y tamaño de cada _resumen.txt.
+    """
+    partes = []
+    for ruta in sorted(df["summary_abspath"].astype(str)):
+        try:
+            st = os.stat(ruta)
+            partes.append(f"{ruta}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            partes.append(f"{ruta}:-")
+    return hashlib.sha1("\n".join(partes).encode("utf-8")).hexdigest()
+
 
-    # Filtrar solo los que tienen resumen
-    def tiene_resumen(row):
-        status = str(row.get("status", "")).strip().lower()
-        summary_path = str(row.get("summary_path", "")).strip()
-        return bool(summary_path) and (status == "summary_ready" or status == "")
+def version_datos_diarios(fecha_str: str) -> str:
+    """
+    Versión de las entradas de un día (ver _version_resumenes).
+    """
+    return _version_resumenes(cargar_diarios_por_fecha(fecha_str))
 
-    df = df[df.apply(tiene_resumen, axis=1)]
 
-    fechas = df["fecha_parsed"].dropna().unique().tolist()
-    if not fechas:
-        return None
+def _ruta_resultado(llave: str) -> str:
+    return os.path.join(RESUMENES_CACHE_DIR, f"{llave}.json")
 
-    ultima = max(fechas)
-    return ultima.strftime("%Y-%m-%d")
 
-def preparar_contexto_y_fuentes_noticias(fecha_str: str, termino_filtro: str | None = None):
-    """
-    Carga las noticias de una fecha (y opcionalmente de un tema) y construye:
-      - contexto textual para LLM
-      - lista de fuentes (titular, medio, enlace, termino)
-    """
+def leer_resultado_cacheado(llave: str) -> dict | None:
+    ruta = _ruta_resultado(llave)
+    if not os.path.exists(ruta):
+        return None
     try:
-        noticias_dia = cargar_noticias_dap_por_fecha(fecha_str)
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
     except Exception as e:
-        print("⚠️ Error al cargar noticias para /pregunta:", repr(e))
-        return "", []
+        print(f"⚠️ Resumen cacheado ilegible {ruta}: {e}")
+        return None
 
-    if termino_filtro:
-        noticias_dia = noticias_dia[noticias_dia["termino"] == termino_filtro]
 
-    if noticias_dia.empty:
-        return "", []
+def guardar_resultado_cacheado(llave: str, resultado: dict) -> None:
+    os.makedirs(RESUMENES_CACHE_DIR, exist_ok=True)
+    ruta = _ruta_resultado(llave)
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
 
-    lineas = []
-    fuentes = []
 
-    # Limitamos número de filas para no pasarle todo al modelo
-    max_noticias = int(os.getenv("MAX_NOTICIAS_PREGUNTA", "40"))
-    noticias_trunc = noticias_dia.head(max_noticias)
+def ruta_lock(llave: str) -> str:
+    os.makedirs(RESUMENES_CACHE_DIR, exist_ok=True)
+    return os.path.join(RESUMENES_CACHE_DIR, f"{llave}.lock")
 
-    for _, row in noticias_trunc.iterrows():
-        tema = str(row["termino"])
-        titular = str(row["titular"])
-        medio = str(row.get("medio", ""))
-        enlace = str(row.get("enlace", ""))
 
-        lineas.append(f"[{tema}] {titular} (medio: {medio})")
+def intentar_lock(ruta: str):
+    """
+    Un intento (sin bloquear) de tomar el flock de `ruta`: devuelve el
+    archivo abierto con el lock, o None si lo tiene otro proceso.
 
-        fuentes.append({
-            "tipo": "noticia",
-            "fecha": fecha_str,
-            "termino": tema,
-            "titular": titular,
-            "medio": medio,
-            "enlace": enlace,
-        })
+    Quien suelta el lock borra el archivo (soltar_lock), así que además se
+    comprueba que lo bloqueado siga siendo el archivo de la ruta: un lock
+    sobre un archivo ya borrado no excluye a nadie.
+    """
+    lock_f = open(ruta, "a")
+    try:
+        fcntl.flock(lock_f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        vigente = os.fstat(lock_f.fileno()).st_ino == os.stat(ruta).st_ino
+    except (BlockingIOError, FileNotFoundError):
+        vigente = False
+    if not vigente:
+        lock_f.close()
+        return None
+    return lock_f
 
-    contexto = "\n".join(lineas)
-    return contexto, fuentes
 
-def preparar_contexto_y_fuentes_diarios(fecha_str: str, jurisdiccion: str | None = None):
-    """
-    Carga los resúmenes normativos de una fecha (y opcionalmente de una jurisdicción)
-    y arma:
-      - contexto textual para LLM (a partir de los resúmenes por tomo)
-      - lista de fuentes (jurisdiccion, id, pdf_path)
-    """
+def soltar_lock(ruta: str, lock_f) -> None:
+    # Borrar antes de cerrar: nadie puede tomar el lock de un archivo que ya no está en la ruta
     try:
-        df_dia = cargar_diarios_por_fecha(fecha_str)
-    except Exception as e:
-        print("⚠️ Error al cargar diarios para /pregunta:", repr(e))
-        return "", []
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+    lock_f.close()
 
-    if df_dia.empty:
-        return "", []
 
-    if jurisdiccion:
-        df_dia = df_dia[df_dia["jurisdiccion"].astype(str).str.upper() == jurisdiccion.upper()]
+def espera_agotada(llave: str) -> ModeloNoDisponible:
+    return ModeloNoDisponible(f"Otro request sigue generando {llave[:12]}; se agotó el plazo para esperarlo")
 
-    if df_dia.empty:
-        return "", []
 
-    contexto_por_jur = construir_contexto_diarios_por_jurisdiccion(df_dia)
+def _calcular_con_lock_de_archivo(llave: str, calcular) -> dict:
+    """
+    Entre workers: solo uno calcula; los demás sondean el lock (sin
+    bloquearse) hasta que el resultado aparece en disco o lo obtienen ellos.
+    La espera no pasa del plazo del request ni de SINGLEFLIGHT_TIMEOUT: al
+    agotarse se lanza ModeloNoDisponible (respaldo o 503), en vez de dejar
+    al worker colgado más allá del timeout de gunicorn.
+    """
+    if fcntl is None:
+        return calcular()
+
+    ruta = ruta_lock(llave)
+    limite = time.monotonic() + plazo_restante(SINGLEFLIGHT_TIMEOUT)
+    pausa = 0.01
+    while (lock_f := intentar_lock(ruta)) is None:
+        cacheado = leer_resultado_cacheado(llave)
+        if cacheado is not None:
+            return cacheado
+        if time.monotonic() + pausa > limite:
+            raise espera_agotada(llave)
+        time.sleep(pausa)
+        pausa = min(pausa * 2, 0.5)
 
-    textos = []
-    fuentes = []
+    try:
+        cacheado = leer_resultado_cacheado(llave)
+        if cacheado is not None:
+            return cacheado
+        return calcular()
+    finally:
+        soltar_lock(ruta, lock_f)
 
-    if jurisdiccion and jurisdiccion in contexto_por_jur:
-        textos.append(f"{jurisdiccion}:\n{contexto_por_jur[jurisdiccion]}")
-        group = df_dia[df_dia["jurisdiccion"].astype(str).str.upper() == jurisdiccion.upper()]
-        df_relevante = group
-    else:
-        # concatenar todo
-        for jur, txt in contexto_por_jur.items():
-            textos.append(f"{jur}:\n{txt}")
-        df_relevante = df_dia
 
-    # Fuentes: lista de documentos (no todos)
-    max_docs = int(os.getenv("MAX_DIARIOS_PREGUNTA", "10"))
-    for _, row in df_relevante.head(max_docs).iterrows():
-        fuentes.append({
-            "tipo": "diario",
-            "fecha": str(row.get("fecha", fecha_str)),
-            "jurisdiccion": str(row.get("jurisdiccion", "")),
-            "id": str(row.get("id", "")),
-            "pdf_path": str(row.get("pdf_path", "")),
-        })
+def ejecutar_una_vez(llave: str, fn, respaldo: str | None = None) -> dict:
+    """
+    Single-flight: requests concurrentes con la misma llave esperan a un
+    único cálculo y comparten su resultado.
+
+    - Si el resultado ya está en disco, se devuelve directo.
+    - Dentro del proceso, el primer thread calcula y los demás esperan.
+    - Entre procesos, un flock sobre <llave>.lock (que se borra al
+      terminar) serializa el cálculo.
+
+    Solo se guardan en disco resultados sin "error". Con `respaldo` (ver
+    llave_respaldo) cada resultado nuevo se guarda también ahí, y si el
+    modelo no está disponible se devuelve ese último resultado con
+    "desactualizado": true en lugar de fallar.
+    """
+    try:
+        return _ejecutar_una_vez(llave, fn, respaldo)
+    except ModeloNoDisponible:
+        anterior = leer_resultado_cacheado(respaldo) if respaldo else None
+        registrar_cache("respaldo", anterior is not None)
+        if anterior is None:
+            raise
+        marcar_desactualizado()
+        return {**anterior, "desactualizado": True}
+
+
+def _ejecutar_una_vez(llave: str, fn, respaldo: str | None) -> dict:
+    cacheado = leer_resultado_cacheado(llave)
+    registrar_cache("resultados", cacheado is not None)
+    if cacheado is not None:
+        return cacheado
+
+    with _vuelos_lock:
+        vuelo = _vuelos.get(llave)
+        lider = vuelo is None
+        if lider:
+            vuelo = {"evento": threading.Event(), "resultado": None, "error": None}
+            _vuelos[llave] = vuelo
+
+    if not lider:
+        # Mismo plazo que la espera entre workers: al agotarse, respaldo o 503
+        if not vuelo["evento"].wait(plazo_restante(SINGLEFLIGHT_TIMEOUT)):
+            raise espera_agotada(llave)
+        if vuelo["error"] is not None:
+            raise vuelo["error"]
+        return vuelo["resultado"]
+
+    def calcular():
+        resultado = fn()
+        if not resultado.get("error"):
+            guardar_resultado_cacheado(llave, resultado)
+            if respaldo:
+                guardar_resultado_cacheado(respaldo, resultado)
+        return resultado
 
-    contexto = "\n\n".join(textos)
-    return contexto, fuentes
+    try:
+        vuelo["resultado"] = _calcular_con_lock_de_archivo(llave, calcular)
+        return vuelo["resultado"]
+    except Exception as e:
+        vuelo["error"] = e
+        raise
+    finally:
+        with _vuelos_lock:
+            _vuelos.pop(llave, None)
+        vuelo["evento"].set()
 
 
-@app.route("/fechas_noticias", methods=["GET"])
-def fechas_noticias():
+def obtener_resumen_noticias(fecha_str: str) -> dict:
     """
-    Endpoint:
-      GET /fechas_noticias
+    generar_resumen_noticias_dap con single-flight y caché por versión del CSV.
+    """
+    llave = llave_resumen("noticias", fecha_str, None, version_datos_noticias(fecha_str))
+    with uso(fecha=fecha_str):
+        return ejecutar_una_vez(
+            llave, lambda: generar_resumen_noticias_dap(fecha_str),
+            respaldo=llave_respaldo("noticias", fecha_str, None),
+        )
 
-    Devuelve:
-      {
-        "fechas": ["YYYY-MM-DD", ...]
-      }
 
-    Fechas disponibles en noticias_dap.csv
+def obtener_resumen_diarios(fecha_str: str, jurisdiccion_filtro: str | None = None) -> dict:
     """
-    CSV_NOTICIAS = os.getenv("NOTICIAS_DAP_CSV", "noticias_dap.csv")
+    generar_resumen_diarios con single-flight y caché por versión de los
+    resúmenes por tomo del día.
+    """
+    jur = jurisdiccion_filtro.strip().upper() if jurisdiccion_filtro else None
+    llave = llave_resumen("diarios", fecha_str, jur, version_datos_diarios(fecha_str))
+    with uso(fecha=fecha_str):
+        return ejecutar_una_vez(
+            llave, lambda: generar_resumen_diarios(fecha_str, jurisdiccion_filtro=jur),
+            respaldo=llave_respaldo("diarios", fecha_str, jur),
+        )
 
-    if not os.path.exists(CSV_NOTICIAS):
-        return jsonify({"error": f"No se encontró el archivo {CSV_NOTICIAS}"}), 500
 
-    try:
-        df = pd.read_csv(CSV_NOTICIAS)
-    except Exception as e:
-        print("❌ Error al leer noticias_dap.csv:", repr(e))
-        return jsonify({"error": "Error al leer el CSV de noticias"}), 500
+# -----------------------------------------
+# 📆 Resúmenes por rango de fechas
+# -----------------------------------------
+#
+# Un resumen de rango no vuelve a mandar titulares ni resúmenes por tomo:
+# se arma con los resúmenes diarios (que salen de la caché de arriba o se
+# generan una vez y quedan ahí) y una sola llamada que los consolida.
 
-    if "fecha" not in df.columns:
-        return jsonify({"error": "El CSV de noticias no tiene columna 'fecha'"}), 500
+def dias_con_noticias(desde_str: str, hasta_str: str | None = None) -> list[str]:
+    noticias = cargar_noticias_dap_rango(desde_str, hasta_str)
+    return sorted({d.strftime("%Y-%m-%d") for d in noticias["fecha_parsed"]})
 
-    # Normalizar fechas
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=True
-    ).dt.date
 
-    fechas_unicas = df["fecha_parsed"].dropna().unique().tolist()
+def dias_con_diarios(
+    desde_str: str, hasta_str: str | None = None, jurisdiccion: str | None = None
+) -> list[str]:
+    df_rango = cargar_diarios_rango(desde_str, hasta_str)
+    if jurisdiccion:
+        df_rango = df_rango[df_rango["jurisdiccion"].astype(str).str.upper() == jurisdiccion.upper()]
+    return sorted({d.strftime("%Y-%m-%d") for d in df_rango["fecha_parsed"]})
 
-    if not fechas_unicas:
-        return jsonify({"fechas": []}), 200
 
-    fechas_ordenadas = sorted(fechas_unicas, reverse=True)
-    fechas_str = [f.strftime("%Y-%m-%d") for f in fechas_ordenadas]
+def version_datos_diarios_rango(desde_str: str, hasta_str: str | None = None) -> str:
+    return _version_resumenes(cargar_diarios_rango(desde_str, hasta_str))
 
-    return jsonify({"fechas": fechas_str}), 200
 
-@app.route("/do_fechas", methods=["GET"])
-def do_fechas():
+def preparar_resumen_rango(
+    tipo: str, desde_str: str, hasta_str: str, resumenes_por_dia: list
+) -> tuple[dict | None, list | None]:
     """
-    Endpoint:
-      GET /do_fechas
+    Arma los mensajes que consolidan resúmenes diarios [(fecha, resultado), ...]
+    en uno solo del rango. tipo es "noticias" o "diarios".
 
-    Devuelve:
-      {
-        "fechas": ["2026-01-30", "2026-01-29", ...]
-      }
+    Devuelve (resultado, None) si no hace falta llamar al modelo (ningún día
+    con contenido, o uno solo), o (None, mensajes) en caso contrario.
 
-    Lista de fechas para las que ya hay al menos un resumen normativo.
+    Si algún día salió del respaldo (el modelo no contestó), lanza
+    ModeloNoDisponible: un rango armado con días viejos no debe quedar en
+    la caché con la versión actual de los datos.
     """
-    if not os.path.exists(DO_INDEX_CSV):
-        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
-
-    try:
-        df = pd.read_csv(DO_INDEX_CSV)
-    except Exception as e:
-        print("❌ Error al leer do_index.csv:", repr(e))
-        return jsonify({"error": "Error al leer el índice normativo"}), 500
+    if any(r.get("desactualizado") for _, r in resumenes_por_dia):
+        raise ModeloNoDisponible(f"Hay resúmenes diarios desactualizados entre {desde_str} y {hasta_str}")
 
-    # Normalizar fechas
-    if "fecha" not in df.columns:
-        return jsonify({"error": "El índice normativo no tiene columna 'fecha'"}), 500
+    dias = [
+        (fecha, r["resumen"]) for fecha, r in resumenes_por_dia
+        if not r.get("error") and r.get("resumen")
+    ]
+    base = {"desde": desde_str, "hasta": hasta_str, "fechas": [f for f, _ in dias]}
 
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
+    if not dias:
+        error = (
+            "No hay noticias en ese rango de fechas" if tipo == "noticias"
+            else "No hay contenido normativo en ese rango de fechas"
+        )
+        return {**base, "resumen": "", "error": error}, None
 
-    # Filtrar filas que ya tienen resumen
-    def tiene_resumen(row):
-        status = str(row.get("status", "")).strip().lower()
-        summary_path = str(row.get("summary_path", "")).strip()
-        return bool(summary_path) and (status == "summary_ready" or status == "")
+    if len(dias) == 1:
+        return {**base, "resumen": dias[0][1]}, None
 
-    df = df[df.apply(tiene_resumen, axis=1)]
+    materia, bloque = (
+        ("noticias", "tema") if tipo == "noticias"
+        else ("diarios oficiales y gacetas", "jurisdicción")
+    )
 
-    if df.empty:
-        return jsonify({"fechas": []}), 200
+    system_msg = f"""
+Eres un redactor técnico que consolida resúmenes diarios de {materia}
+en un solo resumen del periodo para un despacho de asuntos públicos.
 
-    fechas_unicas = df["fecha_parsed"].dropna().unique().tolist()
-    fechas_ordenadas = sorted(fechas_unicas, reverse=True)
-    fechas_str = [f.strftime("%Y-%m-%d") for f in fechas_ordenadas]
+INSTRUCCIONES GENERALES
+- Responde SIEMPRE en español.
+- Usa EXCLUSIVAMENTE la información de los resúmenes diarios proporcionados.
+- No inventes información ni añadas contexto externo.
+- Si un mismo hecho aparece en varios días, menciónalo una sola vez.
+- NO uses frases como: "lo que indica", "lo que podría implicar",
+  "esto muestra que", "esto sugiere que", ni variantes.
 
-    return jsonify({"fechas": fechas_str}), 200
+FORMATO OBLIGATORIO
+- Conserva los bloques de los resúmenes diarios: un encabezado por {bloque}
+  en MAYÚSCULAS (sin viñeta) y debajo sus bullets.
+- Máximo 6 bullets por bloque.
+- Cada bullet debe comenzar con "- " y ser una sola oración factual.
 
-@app.route("/do_jurisdicciones", methods=["GET"])
-def do_jurisdicciones():
-    """
-    Endpoint:
-      GET /do_jurisdicciones
-      GET /do_jurisdicciones?fecha=YYYY-MM-DD  (opcional)
+SIN texto introductorio antes del primer bloque.
+SIN conclusiones ni frases de cierre después del último bullet.
+"""
 
-    Si se pasa 'fecha':
-      - Se devuelven solo jurisdicciones con resumen en esa fecha.
-    Si no:
-      - Se devuelven todas las jurisdicciones presentes en el índice.
+    # Los días más recientes tienen prioridad si no caben todos en el presupuesto
+    modelo = os.getenv("DAP_RESUMEN_MODEL" if tipo == "noticias" else "DO_RESUMEN_MODEL", "gpt-4o-mini")
+    bloques = [(f"[{fecha}]", resumen.splitlines()) for fecha, resumen in reversed(dias)]
+    with tramo("contexto"):
+        empacado = empacar_bloques(bloques, presupuesto_tokens(modelo), modelo, clave=_clave_bullet)
+        contexto = "\n\n".join(
+            bloques[n][0] + "\n" + "\n".join(bloques[n][1][i] for i in indices)
+            for n, indices in sorted(empacado, reverse=True)
+        )
+    user_msg = f"""
+Consolida en un solo resumen el periodo del {desde_str} al {hasta_str}.
 
-    Respuesta:
-      {
-        "fecha": "YYYY-MM-DD" (o null),
-        "jurisdicciones": ["DOF", "SONORA", "VERACRUZ", ...]
-      }
-    """
-    fecha_str = request.args.get("fecha")
+Resúmenes diarios (cada uno precedido por su fecha):
+{contexto}
+"""
 
-    if not os.path.exists(DO_INDEX_CSV):
-        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
+    return None, [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
+    ]
 
-    try:
-        df = pd.read_csv(DO_INDEX_CSV)
-    except Exception as e:
-        print("❌ Error al leer do_index.csv:", repr(e))
-        return jsonify({"error": "Error al leer el índice normativo"}), 500
 
-    # Normalizar fechas
-    if "fecha" not in df.columns or "jurisdiccion" not in df.columns:
-        return jsonify({"error": "El índice normativo no tiene columnas necesarias"}), 500
+def generar_resumen_noticias_rango(desde_str: str, hasta_str: str) -> dict:
+    resumenes = [(d, obtener_resumen_noticias(d)) for d in dias_con_noticias(desde_str, hasta_str)]
+    resultado, mensajes = preparar_resumen_rango("noticias", desde_str, hasta_str, resumenes)
+    if resultado is not None:
+        return resultado
 
-    df["fecha_parsed"] = pd.to_datetime(
-        df["fecha"], errors="coerce", dayfirst=False
-    ).dt.date
+    return {
+        "desde": desde_str,
+        "hasta": hasta_str,
+        "fechas": [d for d, r in resumenes if not r.get("error") and r.get("resumen")],
+        "resumen": completar(mensajes, os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini")),
+    }
 
-    # Filtrar filas que ya tienen resumen
-    def tiene_resumen(row):
-        status = str(row.get("status", "")).strip().lower()
-        summary_path = str(row.get("summary_path", "")).strip()
-        return bool(summary_path) and (status == "summary_ready" or status == "")
 
-    df = df[df.apply(tiene_resumen, axis=1)]
+def generar_resumen_diarios_rango(
+    desde_str: str, hasta_str: str, jurisdiccion_filtro: str | None = None
+) -> dict:
+    resumenes = [
+        (d, obtener_resumen_diarios(d, jurisdiccion_filtro))
+        for d in dias_con_diarios(desde_str, hasta_str, jurisdiccion_filtro)
+    ]
+    resultado, mensajes = preparar_resumen_rango("diarios", desde_str, hasta_str, resumenes)
+    if resultado is not None:
+        return resultado
+
+    return {
+        "desde": desde_str,
+        "hasta": hasta_str,
+        "fechas": [d for d, r in resumenes if not r.get("error") and r.get("resumen")],
+        "resumen": completar(mensajes, os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")),
+    }
+
+
+def obtener_resumen_noticias_rango(desde_str: str, hasta_str: str | None = None) -> dict:
+    """
+    Resumen de noticias de un rango (inclusive), con single-flight y caché
+    por versión del CSV.
+    """
+    parsear_rango(desde_str, hasta_str)
+    hasta_str = hasta_str or desde_str
+    rango = f"{desde_str}..{hasta_str}"
+    llave = llave_resumen("noticias_rango", rango, None, version_datos_noticias(desde_str, hasta_str))
+    with uso(fecha=rango):
+        return ejecutar_una_vez(
+            llave, lambda: generar_resumen_noticias_rango(desde_str, hasta_str),
+            respaldo=llave_respaldo("noticias_rango", rango, None),
+        )
+
+
+def obtener_resumen_diarios_rango(
+    desde_str: str, hasta_str: str | None = None, jurisdiccion_filtro: str | None = None
+) -> dict:
+    """
+    Resumen normativo de un rango (inclusive), con single-flight y caché por
+    versión de los resúmenes por tomo del rango.
+    """
+    parsear_rango(desde_str, hasta_str)
+    hasta_str = hasta_str or desde_str
+    jur = jurisdiccion_filtro.strip().upper() if jurisdiccion_filtro else None
+    rango = f"{desde_str}..{hasta_str}"
+    llave = llave_resumen(
+        "diarios_rango", rango, jur, version_datos_diarios_rango(desde_str, hasta_str)
+    )
+    with uso(fecha=rango):
+        return ejecutar_una_vez(
+            llave, lambda: generar_resumen_diarios_rango(desde_str, hasta_str, jur),
+            respaldo=llave_respaldo("diarios_rango", rango, jur),
+        )
+
+
+# -----------------------------------------
+# 📦 Pregeneración por lote (backfill)
+# -----------------------------------------
+
+def pregenerar_resumenes(desde_str: str, hasta_str: str) -> dict:
+    """
+    Genera de una vez los resúmenes diarios (noticias y normativo de todas
+    las jurisdicciones) de un rango que aún no están en la caché, mandando
+    todas las llamadas como un solo lote (completar_lote). Lo que sale bien
+    queda en RESUMENES_CACHE_DIR con la misma llave que usan los endpoints,
+    así que después se sirve sin llamar al modelo.
+
+    Devuelve conteos: cacheados, sin_datos, solicitudes, generados, fallidos.
+    """
+    desde, hasta = parsear_fecha(desde_str).toordinal(), parsear_fecha(hasta_str).toordinal()
+    modelo_noticias = os.getenv("DAP_RESUMEN_MODEL", "gpt-4o-mini")
+    modelo_do = os.getenv("DO_RESUMEN_MODEL", "gpt-4o-mini")
+    totales = {"cacheados": 0, "sin_datos": 0, "solicitudes": 0, "generados": 0, "fallidos": 0}
+
+    # (llave, respaldo, fecha, ids de solicitud, armar(textos) -> resultado)
+    pendientes = []
+    solicitudes = {}
+
+    if os.path.exists(NOTICIAS_DAP_CSV):
+        _, fechas = cargar_noticias_dap()
+        for fecha in sorted({f for f in fechas if desde <= f <= hasta}):
+            fecha_str = iso_de_ordinal(fecha)
+            llave = llave_resumen("noticias", fecha_str, None, version_datos_noticias(fecha_str))
+            if leer_resultado_cacheado(llave) is not None:
+                totales["cacheados"] += 1
+                continue
+            resultado, mensajes = preparar_resumen_noticias(fecha_str)
+            if resultado is not None:
+                totales["sin_datos"] += 1
+                continue
+            id_ = f"noticias|{fecha_str}"
+            solicitudes[id_] = (mensajes, modelo_noticias)
+            pendientes.append((
+                llave, llave_respaldo("noticias", fecha_str, None), fecha_str, [id_],
+                lambda textos, f=fecha_str: {"fecha": f, "resumen": textos[0]},
+            ))
+
+    if os.path.exists(DO_INDEX_CSV):
+        _, fechas = indice_do_ordenado()
+        for fecha in sorted({f for f in fechas if desde <= f <= hasta}):
+            fecha_str = iso_de_ordinal(fecha)
+            llave = llave_resumen("diarios", fecha_str, None, version_datos_diarios(fecha_str))
+            if leer_resultado_cacheado(llave) is not None:
+                totales["cacheados"] += 1
+                continue
+            resultado, tareas = preparar_resumen_diarios(fecha_str)
+            if resultado is not None:
+                totales["sin_datos"] += 1
+                continue
+            ids = []
+            for jur, mensajes in tareas:
+                ids.append(f"diarios|{fecha_str}|{jur}")
+                solicitudes[ids[-1]] = (mensajes, modelo_do)
+            jurisdicciones = [jur for jur, _ in tareas]
+            pendientes.append((
+                llave, llave_respaldo("diarios", fecha_str, None), fecha_str, ids,
+                lambda textos, f=fecha_str, js=jurisdicciones: armar_resumen_diarios(f, list(zip(js, textos))),
+            ))
+
+    totales["solicitudes"] = len(solicitudes)
+    if not solicitudes:
+        return totales
+
+    fechas_solicitud = {id_: id_.split("|")[1] for id_ in solicitudes}
+    with uso(endpoint="pregenerar"):
+        respuestas = completar_lote(solicitudes, fechas=fechas_solicitud)
+    for llave, respaldo, fecha_str, ids, armar in pendientes:
+        textos = [respuestas.get(i) for i in ids]
+        errores = [t for t in textos if not isinstance(t, str)]
+        if errores:
+            print(f"⚠️ Pregeneración {fecha_str}: {errores[0]!r}")
+            totales["fallidos"] += 1
+            continue
+        resultado = armar(textos)
+        if resultado.get("error"):
+            totales["sin_datos"] += 1
+            continue
+        guardar_resultado_cacheado(llave, resultado)
+        guardar_resultado_cacheado(respaldo, resultado)
+        totales["generados"] += 1
+    return totales
+
+
+# -----------------------------------------
+# 🧠 Helpers para /pregunta
+# -----------------------------------------
+
+# Diccionarios del detector de intención. Se pueden ampliar o reemplazar con
+# un JSON en INTENCIONES_JSON con las mismas llaves ("jurisdicciones",
+# "normativo", "temas"); las frases se comparan sin acentos ni mayúsculas.
+INTENCIONES_JSON = os.getenv("INTENCIONES_JSON")
+
+JURISDICCIONES_PATRONES = {
+    "DOF": ["dof", "diario oficial de la federación"],
+    "SONORA": ["sonora"],
+    "VERACRUZ": ["veracruz"],
+    "CDMX": ["cdmx", "ciudad de méxico"],
+    "PUEBLA": ["puebla"],
+    "COAHUILA": ["coahuila"],
+    "BAJA CALIFORNIA": ["baja california"],
+}
+
+# Con límites de palabra, así que cada plural va aparte ("ley" ya no
+# encuentra "leyes" como lo hacía la búsqueda por subcadena)
+PALABRAS_NORMATIVO = [
+    "dof",
+    "diario oficial", "diarios oficiales",
+    "gaceta", "gacetas",
+    "congreso", "congresos",
+    "parlamentaria", "parlamentarias",
+    "ley", "leyes",
+    "reforma", "reformas",
+    "decreto", "decretos",
+]
+
+# Preguntas de ejemplo -> tipo esperado; python backend_dap.py --verificar-intencion
+EJEMPLOS_INTENCION = [
+    ("Que leyes se publicaron hoy", "normativo"),
+    ("¿Hubo reformas en el Congreso?", "normativo"),
+    ("¿Qué decretos salieron en el DOF?", "normativo"),
+    ("Resumen de las gacetas parlamentarias", "normativo"),
+    ("¿Qué publicaron los diarios oficiales esta semana?", "normativo"),
+    ("¿Qué se publicó en Sonora?", "normativo"),
+    ("¿Qué noticias hay de seguridad?", "noticias"),
+    ("¿Qué pasó con el precio del gas?", "noticias"),
+]
+
+PATRONES_TEMAS = {
+    "industria_alimentaria": ["industria alimentaria", "alimentos", "alimentaria"],
+    "cemento": ["cemento"],
+    "gas": ["gas"],
+    "impuesto": ["impuesto", "impuestos", "tributario", "fiscal"],
+    "casinos": ["casino", "casinos", "juegos de azar"],
+    "movilidad": ["movilidad", "transporte público", "tráfico", "tránsito"],
+    "seguridad": ["seguridad", "violencia", "delincuencia"],
+    "agenda nacional": ["agenda nacional", "noticias nacionales"],
+}
+
+# Matcher compilado: se arma una vez y se rehace solo si cambia do_index.csv
+# (por si aparece una jurisdicción nueva)
+_matcher_intencion = {"firma": None, "regex": None, "etiquetas": None}
+
+
+def _diccionarios_intencion() -> tuple[dict, list, dict]:
+    jurisdicciones = {k: list(v) for k, v in JURISDICCIONES_PATRONES.items()}
+    normativo = list(PALABRAS_NORMATIVO)
+    temas = {k: list(v) for k, v in PATRONES_TEMAS.items()}
+
+    if INTENCIONES_JSON:
+        with open(INTENCIONES_JSON, encoding="utf-8") as f:
+            extra = json.load(f)
+        jurisdicciones.update(extra.get("jurisdicciones", {}))
+        normativo = extra.get("normativo", normativo)
+        temas.update(extra.get("temas", {}))
+
+    # Toda jurisdicción del índice se reconoce al menos por su nombre
+    try:
+        df = cargar_do_index()
+    except FileNotFoundError:
+        df = None
+    if df is not None and "jurisdiccion" in df.columns:
+        for jur in df["jurisdiccion"].dropna().astype(str).str.strip().str.upper().unique():
+            if jur and jur not in jurisdicciones:
+                jurisdicciones[jur] = [jur.lower()]
+
+    return jurisdicciones, normativo, temas
+
+
+def _compilar_matcher_intencion() -> tuple[re.Pattern, dict]:
+    """
+    Arma una sola alternancia regex con todas las frases (normalizadas, las
+    más largas primero y con límites de palabra) y el mapa
+    frase -> [(categoría, valor), ...].
+    """
+    jurisdicciones, normativo, temas = _diccionarios_intencion()
+
+    etiquetas = {}
+    for jur, frases in jurisdicciones.items():
+        for frase in frases:
+            etiquetas.setdefault(normalizar(frase), []).append(("jurisdiccion", jur))
+    for frase in normativo:
+        etiquetas.setdefault(normalizar(frase), []).append(("normativo", True))
+    for tema, frases in temas.items():
+        for frase in frases:
+            etiquetas.setdefault(normalizar(frase), []).append(("termino", tema))
+    etiquetas.pop("", None)
+
+    alternativas = [
+        r"\s+".join(re.escape(parte) for parte in frase.split())
+        for frase in sorted(etiquetas, key=len, reverse=True)
+    ]
+    regex = re.compile(r"\b(?:" + "|".join(alternativas) + r")\b")
+    return regex, etiquetas
+
+
+def matcher_intencion() -> tuple[re.Pattern, dict]:
+    try:
+        st = os.stat(DO_INDEX_CSV)
+        firma = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        firma = None
+
+    if _matcher_intencion["regex"] is None or _matcher_intencion["firma"] != firma:
+        regex, etiquetas = _compilar_matcher_intencion()
+        _matcher_intencion.update(firma=firma, regex=regex, etiquetas=etiquetas)
+    return _matcher_intencion["regex"], _matcher_intencion["etiquetas"]
+
+
+def detectar_intencion_pregunta(pregunta: str) -> dict:
+    """
+    Analiza la pregunta en una sola pasada del matcher compilado y devuelve:
+      {
+        "tipo": "noticias" | "normativo",
+        "jurisdiccion": la primera jurisdicción mencionada o None,
+        "jurisdicciones": todas las mencionadas, en orden de aparición,
+        "termino": de los temas mencionados, el que va primero en
+                   ORDEN_TEMATICO (la prioridad de siempre), o None,
+        "terminos": todos los temas mencionados, en orden de aparición
+      }
+    """
+    regex, etiquetas = matcher_intencion()
+
+    jurisdicciones = []
+    terminos = []
+    es_normativo = False
+    for m in regex.finditer(normalizar(pregunta)):
+        frase = re.sub(r"\s+", " ", m.group(0))
+        for categoria, valor in etiquetas.get(frase, []):
+            if categoria == "jurisdiccion" and valor not in jurisdicciones:
+                jurisdicciones.append(valor)
+            elif categoria == "termino" and valor not in terminos:
+                terminos.append(valor)
+            elif categoria == "normativo":
+                es_normativo = True
+
+    tipo = "normativo" if es_normativo or jurisdicciones else "noticias"
+    rango_tema = {t: i for i, t in enumerate(ORDEN_TEMATICO)}
+
+    return {
+        "tipo": tipo,
+        "jurisdiccion": jurisdicciones[0] if jurisdicciones else None,
+        "jurisdicciones": jurisdicciones,
+        "termino": min(terminos, key=lambda t: rango_tema.get(t, len(ORDEN_TEMATICO)), default=None),
+        "terminos": terminos,
+    }
+
+
+def verificar_intencion() -> list[str]:
+    """
+    Corre EJEMPLOS_INTENCION por detectar_intencion_pregunta y devuelve las
+    que no salen con el tipo esperado (vacía si todo bien).
+    """
+    fallas = []
+    for pregunta, esperado in EJEMPLOS_INTENCION:
+        tipo = detectar_intencion_pregunta(pregunta)["tipo"]
+        if tipo != esperado:
+            fallas.append(f"{pregunta!r}: {tipo} (se esperaba {esperado})")
+    return fallas
+
+
+def obtener_ultima_fecha_noticias() -> str | None:
+    """
+    Devuelve la fecha más reciente disponible en noticias_dap.csv en formato YYYY-MM-DD.
+    """
+    try:
+        _, fechas = cargar_noticias_dap()
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if not fechas:
+        return None
+
+    # Las fechas vienen ordenadas: la última es la más reciente
+    return iso_de_ordinal(fechas[-1])
+
+
+def obtener_ultima_fecha_diarios() -> str | None:
+    """
+    Devuelve la fecha más reciente disponible en do_index.csv (con resumen listo)
+    en formato YYYY-MM-DD.
+    """
+    if not os.path.exists(DO_INDEX_CSV):
+        return None
+
+    df = cargar_do_index()
+    if not {"fecha", "status", "summary_path"}.issubset(df.columns):
+        return None
+
+    ordenado, _ = indice_do_ordenado()
+
+    # Filtrar solo los que tienen resumen
+    fechas = ordenado.loc[mascara_tiene_resumen(ordenado), "fecha_parsed"]
+    if fechas.empty:
+        return None
+
+    return fechas.iloc[-1].strftime("%Y-%m-%d")
+
+def preparar_contexto_y_fuentes_noticias(
+    fecha_str: str, termino_filtro: str | None = None, hasta_str: str | None = None
+):
+    """
+    Carga las noticias de una fecha (o del rango fecha_str..hasta_str, más
+    recientes primero) y opcionalmente de un tema, y construye:
+      - contexto textual para LLM
+      - lista de fuentes (titular, medio, enlace, termino)
+    """
+    try:
+        if hasta_str:
+            noticias_dia = cargar_noticias_dap_rango(fecha_str, hasta_str)
+            noticias_dia = noticias_dia.sort_values("fecha_parsed", ascending=False, kind="stable")
+        else:
+            noticias_dia = cargar_noticias_dap_por_fecha(fecha_str)
+    except Exception as e:
+        print("⚠️ Error al cargar noticias para /pregunta:", repr(e))
+        return "", []
+
+    if termino_filtro:
+        noticias_dia = noticias_dia[noticias_dia["termino"] == termino_filtro]
+
+    if noticias_dia.empty:
+        return "", []
+
+    # Prioridad para el presupuesto de tokens: orden de ORDEN_TEMATICO y,
+    # dentro de cada tema, lo más reciente primero
+    rango_tema = {t: i for i, t in enumerate(ORDEN_TEMATICO)}
+    noticias_dia = noticias_dia.assign(
+        _rango_tema=noticias_dia["termino"].astype(str).map(rango_tema).fillna(len(ORDEN_TEMATICO))
+    ).sort_values(["_rango_tema", "fecha_parsed"], ascending=[True, False], kind="stable")
+
+    lineas = []
+    fuentes = []
+
+    for _, row in noticias_dia.iterrows():
+        tema = str(row["termino"])
+        titular = str(row["titular"])
+        medio = str(row.get("medio", ""))
+        enlace = str(row.get("enlace", ""))
+        fecha_row = row["fecha_parsed"].strftime("%Y-%m-%d")
+
+        if hasta_str:
+            lineas.append(f"[{fecha_row}] [{tema}] {titular} (medio: {medio})")
+        else:
+            lineas.append(f"[{tema}] {titular} (medio: {medio})")
+
+        fuentes.append({
+            "tipo": "noticia",
+            "fecha": fecha_row,
+            "termino": tema,
+            "titular": titular,
+            "medio": medio,
+            "enlace": enlace,
+        })
+
+    modelo = os.getenv("PREGUNTA_MODEL", "gpt-4o-mini")
+    elegidas = empacar_lineas(lineas, presupuesto_tokens(modelo), modelo, clave=_titular_de_linea)
+
+    contexto = "\n".join(lineas[i] for i in elegidas)
+    return contexto, [fuentes[i] for i in elegidas]
+
+
+def _titular_de_linea(linea: str) -> str:
+    # "[fecha] [tema] titular (medio: X)" -> "titular", para deduplicar entre medios
+    return re.sub(r"^(\[[^\]]*\] )+|\s*\(medio: [^)]*\)$", "", linea)
+
+def preparar_contexto_y_fuentes_diarios(
+    fecha_str: str, jurisdiccion: str | None = None, hasta_str: str | None = None
+):
+    """
+    Carga los resúmenes normativos de una fecha (o del rango fecha_str..hasta_str,
+    más recientes primero) y opcionalmente de una jurisdicción, y arma:
+      - contexto textual para LLM (a partir de los resúmenes por tomo)
+      - lista de fuentes (jurisdiccion, id, pdf_path)
+    """
+    try:
+        df_dia = cargar_diarios_rango(fecha_str, hasta_str)
+    except Exception as e:
+        print("⚠️ Error al cargar diarios para /pregunta:", repr(e))
+        return "", []
+
+    if df_dia.empty:
+        return "", []
+
+    if jurisdiccion:
+        df_dia = df_dia[df_dia["jurisdiccion"].astype(str).str.upper() == jurisdiccion.upper()]
+
+    if df_dia.empty:
+        return "", []
+
+    modelo = os.getenv("PREGUNTA_MODEL", "gpt-4o-mini")
+    presupuesto = presupuesto_tokens(modelo)
+
+    # Un bloque por día (el más reciente primero) y, dentro, por jurisdicción;
+    # luego se llena el presupuesto de la pregunta en ese orden de prioridad
+    bloques = []
+    dias = sorted(df_dia["fecha_ord"].unique(), reverse=True)
+    for dia in dias:
+        contexto_por_jur = construir_contexto_diarios_por_jurisdiccion(
+            df_dia[df_dia["fecha_ord"] == dia].copy(), presupuesto
+        )
+        if jurisdiccion:
+            contexto_por_jur = {
+                jur: txt for jur, txt in contexto_por_jur.items() if jur.upper() == jurisdiccion.upper()
+            }
+        for jur, txt in contexto_por_jur.items():
+            encabezado = f"[{iso_de_ordinal(dia)}] {jur}:" if hasta_str else f"{jur}:"
+            bloques.append((encabezado, txt.splitlines()))
+
+    textos = []
+    for n, indices in empacar_bloques(bloques, presupuesto, modelo, clave=_clave_bullet):
+        encabezado, lineas = bloques[n]
+        textos.append(encabezado + "\n" + "\n".join(lineas[i] for i in indices))
+
+    # Fuentes: lista de documentos (no todos)
+    max_docs = int(os.getenv("MAX_DIARIOS_PREGUNTA", "10"))
+    df_relevante = df_dia.sort_values("fecha_ord", ascending=False, kind="stable")
+    fuentes = []
+    for _, row in df_relevante.head(max_docs).iterrows():
+        fuentes.append({
+            "tipo": "diario",
+            "fecha": row["fecha_parsed"].strftime("%Y-%m-%d"),
+            "jurisdiccion": str(row.get("jurisdiccion", "")),
+            "id": str(row.get("id", "")),
+            "pdf_path": str(row.get("pdf_path", "")),
+        })
+
+    contexto = "\n\n".join(textos)
+    return contexto, fuentes
+
+
+# -----------------------------------------
+# 🔎 Índice semántico (embeddings) para /pregunta
+# -----------------------------------------
+
+# Matriz de embeddings normalizados + metadatos de cada item
+INDICE_SEMANTICO_DIR = os.getenv(
+    "INDICE_SEMANTICO_DIR", os.path.join(BASE_DIR, "indice_semantico")
+)
+EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+
+# "0" desactiva la recuperación semántica aunque exista el índice
+RECUPERACION_SEMANTICA = os.getenv("RECUPERACION_SEMANTICA", "1") != "0"
+
+# Items que se recuperan por pregunta
+TOP_K_NOTICIAS = int(os.getenv("TOP_K_NOTICIAS", "30"))
+TOP_K_DIARIOS = int(os.getenv("TOP_K_DIARIOS", "25"))
+
+# Última versión cargada del índice: firma de vectores.npy -> (matriz, items),
+# más tipo/fecha/jurisdicción de cada item como arreglos para filtrar con máscaras
+_indice_semantico_cache = {"firma": None, "matriz": None, "items": None, "columnas": None}
+
+
+def _ruta_vectores() -> str:
+    return os.path.join(INDICE_SEMANTICO_DIR, "vectores.npy")
+
+
+def _ruta_items() -> str:
+    return os.path.join(INDICE_SEMANTICO_DIR, "items.json")
+
+
+def _id_item(item: dict) -> str:
+    crudo = "|".join(str(item.get(k, "")) for k in ("tipo", "fecha", "jurisdiccion", "doc_id", "texto"))
+    return hashlib.sha1(crudo.encode("utf-8")).hexdigest()
+
+
+def embeber_textos(textos: list[str]) -> np.ndarray:
+    """
+    Embeddings normalizados (norma 1) de una lista de textos, en lotes.
+    Cada lote pasa por llamar(): reintentos, plazo y circuit breaker.
+    """
+    lote = int(os.getenv("EMBEDDINGS_LOTE", "256"))
+    vectores = []
+    for i in range(0, len(textos), lote):
+        parte = textos[i:i + lote]
+        with tramo("embeddings"):
+            vectores.extend(llamar(lambda timeout: proveedor().embeber(parte, EMBEDDINGS_MODEL, timeout)))
+
+    matriz = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def items_para_indexar() -> list[dict]:
+    """
+    Todo lo que se puede recuperar: cada titular de noticias_dap.csv y cada
+    bullet de los _resumen.txt de do_index.csv (o párrafo, si no hay bullets).
+    """
+    items = []
+
+    if os.path.exists(NOTICIAS_DAP_CSV):
+        df, _ = cargar_noticias_dap()
+        for _, row in df.iterrows():
+            titular = str(row.get("titular", "")).strip()
+            if not titular:
+                continue
+            items.append({
+                "tipo": "noticia",
+                "fecha": row["fecha_parsed"].strftime("%Y-%m-%d"),
+                "texto": titular,
+                "termino": str(row.get("termino", "")),
+                "medio": str(row.get("medio", "")),
+                "enlace": str(row.get("enlace", "")),
+            })
+
+    if os.path.exists(DO_INDEX_CSV):
+        df = cargar_do_index()
+        for _, row in df.dropna(subset=["fecha_parsed"]).iterrows():
+            txt = leer_resumen(str(row.get("summary_abspath", "") or ""))
+            if not txt:
+                continue
+            bullets = [l[2:].strip() for l in txt.splitlines() if l.startswith("- ")]
+            fragmentos = bullets or [p.strip() for p in txt.split("\n\n") if p.strip()]
+            for fragmento in fragmentos:
+                items.append({
+                    "tipo": "diario",
+                    "fecha": row["fecha_parsed"].strftime("%Y-%m-%d"),
+                    "texto": fragmento,
+                    "jurisdiccion": str(row.get("jurisdiccion", "")).upper(),
+                    "doc_id": str(row.get("id", "")),
+                    "pdf_path": str(row.get("pdf_path", "")),
+                })
+
+    for item in items:
+        item["id"] = _id_item(item)
+    return items
+
+
+def actualizar_indice_semantico() -> dict:
+    """
+    Ingesta: embebe solo los items nuevos y reutiliza los vectores ya
+    calculados. Guarda vectores.npy + items.json en INDICE_SEMANTICO_DIR.
+    """
+    items = items_para_indexar()
+
+    previos = {}
+    if os.path.exists(_ruta_vectores()) and os.path.exists(_ruta_items()):
+        matriz_prev = np.load(_ruta_vectores())
+        with open(_ruta_items(), "r", encoding="utf-8") as f:
+            items_prev = json.load(f)
+        previos = {it["id"]: matriz_prev[i] for i, it in enumerate(items_prev)}
+
+    # Un mismo texto puede aparecer varias veces (p. ej. mismo titular en dos temas)
+    vistos = set()
+    items = [it for it in items if not (it["id"] in vistos or vistos.add(it["id"]))]
+
+    nuevos = [it for it in items if it["id"] not in previos]
+    if nuevos:
+        print(f"🔎 Embebiendo {len(nuevos)} items nuevos ({EMBEDDINGS_MODEL})…")
+        for it, vec in zip(nuevos, embeber_textos([it["texto"] for it in nuevos])):
+            previos[it["id"]] = vec
+
+    if items:
+        matriz = np.vstack([previos[it["id"]] for it in items]).astype(np.float32)
+    else:
+        matriz = np.zeros((0, 0), dtype=np.float32)
+
+    os.makedirs(INDICE_SEMANTICO_DIR, exist_ok=True)
+    with open(_ruta_items(), "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+    # vectores.npy se escribe al final: su mtime es la versión del índice
+    tmp = _ruta_vectores() + ".tmp.npy"
+    np.save(tmp, matriz)
+    os.replace(tmp, _ruta_vectores())
+
+    return {"items": len(items), "nuevos": len(nuevos)}
+
+
+def cargar_indice_semantico() -> tuple[np.ndarray, list] | None:
+    """
+    Devuelve (matriz, items) del índice en disco, o None si no existe.
+    Se recarga solo cuando cambia vectores.npy.
+    """
+    ruta = _ruta_vectores()
+    if not RECUPERACION_SEMANTICA or not os.path.exists(ruta) or not os.path.exists(_ruta_items()):
+        return None
+
+    st = os.stat(ruta)
+    firma = (st.st_mtime_ns, st.st_size)
+    if _indice_semantico_cache["firma"] != firma:
+        matriz = np.load(ruta)
+        with open(_ruta_items(), "r", encoding="utf-8") as f:
+            items = json.load(f)
+        if len(items) != matriz.shape[0]:
+            print("⚠️ Índice semántico inconsistente; se ignora hasta re-indexar")
+            return None
+        columnas = {
+            "tipo": np.array([it["tipo"] for it in items], dtype=str),
+            "fecha": np.array([it["fecha"] for it in items], dtype=str),
+            "jurisdiccion": np.array([it.get("jurisdiccion", "") for it in items], dtype=str),
+        }
+        _indice_semantico_cache.update(firma=firma, matriz=matriz, items=items, columnas=columnas)
+
+    if not _indice_semantico_cache["items"]:
+        return None
+    return _indice_semantico_cache["matriz"], _indice_semantico_cache["items"]
+
+
+@lru_cache(maxsize=256)
+def _embedding_pregunta(texto: str) -> np.ndarray:
+    return embeber_textos([texto])[0]
+
+
+def buscar_similares(
+    pregunta: str,
+    tipo: str,
+    k: int,
+    fecha_str: str | None = None,
+    jurisdiccion: str | None = None,
+    hasta_str: str | None = None,
+) -> list[dict]:
+    """
+    Top-k items del índice más parecidos a la pregunta (producto punto sobre
+    embeddings normalizados = similitud coseno), filtrando por tipo y,
+    opcionalmente, por fecha (o rango fecha_str..hasta_str) y jurisdicción.
+    """
+    indice = cargar_indice_semantico()
+    if indice is None:
+        return []
+    matriz, items = indice
+    columnas = _indice_semantico_cache["columnas"]
+
+    # Fechas YYYY-MM-DD: el orden de los strings es el de las fechas
+    mascara = columnas["tipo"] == tipo
+    if fecha_str:
+        mascara &= (columnas["fecha"] >= fecha_str) & (columnas["fecha"] <= (hasta_str or fecha_str))
+    if jurisdiccion:
+        mascara &= columnas["jurisdiccion"] == jurisdiccion.upper()
+    total = int(mascara.sum())
+    if not total:
+        return []
+
+    # Un solo producto matriz-vector sobre todo el índice; lo filtrado queda en -inf
+    q = _embedding_pregunta(pregunta)
+    scores = np.where(mascara, matriz @ q, -np.inf)
+    k = min(k, total)
+    mejores = np.argpartition(-scores, k - 1)[:k]
+    mejores = mejores[np.argsort(-scores[mejores])]
+
+    return [dict(items[i], score=float(scores[i])) for i in mejores]
+
+
+def recuperar_contexto_y_fuentes(
+    pregunta: str,
+    tipo: str,
+    fecha_str: str | None,
+    jurisdiccion: str | None = None,
+    hasta_str: str | None = None,
+):
+    """
+    Versión semántica de preparar_contexto_y_fuentes_noticias/_diarios.
+    Devuelve (contexto, fuentes) o ("", []) si no hay índice o resultados.
+    """
+    try:
+        if tipo == "noticias":
+            encontrados = buscar_similares(
+                pregunta, "noticia", TOP_K_NOTICIAS, fecha_str, hasta_str=hasta_str
+            )
+        else:
+            encontrados = buscar_similares(
+                pregunta, "diario", TOP_K_DIARIOS, fecha_str, jurisdiccion, hasta_str=hasta_str
+            )
+    except ModeloNoDisponible:
+        raise
+    except Exception as e:
+        print("⚠️ Error en la recuperación semántica para /pregunta:", repr(e))
+        return "", []
+
+    # encontrados ya viene por score: esa es la prioridad para el presupuesto
+    if tipo == "noticias":
+        lineas = [
+            f"[{it['fecha']}] [{it['termino']}] {it['texto']} (medio: {it['medio']})"
+            for it in encontrados
+        ]
+        clave = _titular_de_linea
+    else:
+        lineas = [f"[{it['fecha']}] {it['jurisdiccion']}: {it['texto']}" for it in encontrados]
+        clave = lambda linea: linea.split(": ", 1)[-1]
+
+    modelo = os.getenv("PREGUNTA_MODEL", "gpt-4o-mini")
+    elegidas = empacar_lineas(lineas, presupuesto_tokens(modelo), modelo, clave=clave)
+
+    fuentes = []
+    docs_vistos = set()
+
+    for i in elegidas:
+        it = encontrados[i]
+        if tipo == "noticias":
+            fuentes.append({
+                "tipo": "noticia",
+                "fecha": it["fecha"],
+                "termino": it["termino"],
+                "titular": it["texto"],
+                "medio": it["medio"],
+                "enlace": it["enlace"],
+            })
+        elif it["doc_id"] not in docs_vistos:
+            docs_vistos.add(it["doc_id"])
+            fuentes.append({
+                "tipo": "diario",
+                "fecha": it["fecha"],
+                "jurisdiccion": it["jurisdiccion"],
+                "id": it["doc_id"],
+                "pdf_path": it["pdf_path"],
+            })
+
+    return "\n".join(lineas[i] for i in elegidas), fuentes
+
+
+def contexto_y_fuentes_pregunta(
+    pregunta: str,
+    tipo: str,
+    semantico: bool,
+    fecha_str: str | None,
+    hasta_str: str | None,
+    termino: str | None = None,
+    jurisdiccion: str | None = None,
+):
+    """
+    Contexto de /pregunta: recuperación semántica si hay índice; si no, o si
+    el modelo de embeddings no está disponible, filtros por fecha y término
+    (o jurisdicción), con la fecha más reciente si no viene una.
+    """
+    if semantico:
+        try:
+            return recuperar_contexto_y_fuentes(pregunta, tipo, fecha_str, jurisdiccion, hasta_str=hasta_str)
+        except ModeloNoDisponible as e:
+            print("⚠️ Embeddings no disponibles; /pregunta usa la búsqueda por palabras:", e)
+
+    if tipo == "noticias":
+        fecha_str = fecha_str or obtener_ultima_fecha_noticias()
+        if not fecha_str:
+            return "", []
+        return preparar_contexto_y_fuentes_noticias(fecha_str, termino_filtro=termino, hasta_str=hasta_str)
+
+    fecha_str = fecha_str or obtener_ultima_fecha_diarios()
+    if not fecha_str:
+        return "", []
+    return preparar_contexto_y_fuentes_diarios(fecha_str, jurisdiccion=jurisdiccion, hasta_str=hasta_str)
+
+
+def preparar_pregunta(
+    texto_pregunta: str,
+    fecha_str: str | None = None,
+    desde_str: str | None = None,
+    hasta_str: str | None = None,
+) -> tuple[dict, int, list | None]:
+    """
+    Resuelve intención, fecha (o rango desde/hasta) y contexto de una
+    pregunta y arma los mensajes.
+
+    Devuelve (payload, status, mensajes):
+      - mensajes None: payload es la respuesta final (sin llamar al modelo).
+      - mensajes con valor: payload trae fuentes/tipo/fecha/...; falta
+        agregarle "respuesta" con lo que conteste el modelo.
+    """
+    # Detectar intención
+    intent = detectar_intencion_pregunta(texto_pregunta)
+    tipo = intent["tipo"]           # "noticias" | "normativo"
+    jurisdiccion = intent["jurisdiccion"]
+    termino = intent["termino"]
+
+    # Rango desde/hasta: el contexto se arma con todos los días del rango
+    rango = {}
+    if desde_str or hasta_str:
+        if not desde_str:
+            return {"error": "Debe especificar 'desde' junto con 'hasta'"}, 400, None
+        try:
+            parsear_rango(desde_str, hasta_str)
+        except ValueError as e:
+            return {"error": str(e)}, 400, None
+        hasta_str = hasta_str or desde_str
+        fecha_str = desde_str
+        rango = {"desde": desde_str, "hasta": hasta_str}
+    else:
+        hasta_str = None
+
+    # Con índice semántico se busca en todas las fechas si no viene una;
+    # sin él, se usa la fecha más reciente disponible para ese tipo
+    semantico = cargar_indice_semantico() is not None
+
+    # Resolver fecha si no viene
+    if not fecha_str and not semantico:
+        if tipo == "noticias":
+            fecha_str = obtener_ultima_fecha_noticias()
+        else:
+            fecha_str = obtener_ultima_fecha_diarios()
+
+    if not fecha_str and not semantico:
+        return {"error": "No se pudo determinar una fecha válida para responder la pregunta"}, 400, None
+
+    if rango:
+        desc_fecha = f"entre {desde_str} y {hasta_str}"
+        ref_fecha = f"del {desde_str} al {hasta_str}"
+    elif fecha_str:
+        desc_fecha = f"en la fecha {fecha_str}"
+        ref_fecha = fecha_str
+    else:
+        desc_fecha = "en las fechas disponibles"
+        ref_fecha = "todas las disponibles"
+    fecha_payload = None if rango else fecha_str
+
+    # Construir contexto y fuentes según el tipo
+    if tipo == "noticias":
+        with tramo("contexto"):
+            contexto, fuentes = contexto_y_fuentes_pregunta(
+                texto_pregunta, tipo, semantico, fecha_str, hasta_str, termino=termino
+            )
+        if not contexto:
+            return {
+                "respuesta": f"No encontré noticias relevantes para esa pregunta {desc_fecha}.",
+                "fuentes": [],
+                "tipo": tipo,
+                "fecha": fecha_payload,
+                **rango,
+            }, 200, None
+
+        system_msg = """
+Eres un analista que responde preguntas sobre noticias para un despacho de asuntos públicos.
+
+INSTRUCCIONES:
+- Responde SIEMPRE en español.
+- Usa EXCLUSIVAMENTE la información de los titulares que se te proporcionan.
+- No inventes contexto externo ni antecedentes.
+- No uses frases como:
+  "lo que indica", "lo que implica", "esto sugiere", "esto muestra que",
+  ni saques conclusiones políticas o estratégicas.
+- Puedes responder en 2 a 5 bullets si la pregunta pide un recuento.
+- Sé concreto y factual.
+"""
+
+        user_msg = f"""
+Pregunta del usuario:
+\"\"\"{texto_pregunta}\"\"\"
+
+Fecha de referencia: {ref_fecha}
+
+A continuación tienes titulares de noticias, uno por línea:
+\"\"\"{contexto}\"\"\"
+
+Responde a la pregunta usando ÚNICAMENTE lo que aparece en esos titulares.
+"""
+
+    else:  # tipo == "normativo"
+        with tramo("contexto"):
+            contexto, fuentes = contexto_y_fuentes_pregunta(
+                texto_pregunta, tipo, semantico, fecha_str, hasta_str, jurisdiccion=jurisdiccion
+            )
+        if not contexto:
+            desc_jur = f" para {jurisdiccion}" if jurisdiccion else ""
+            return {
+                "respuesta": f"No encontré contenido normativo relevante{desc_jur} {desc_fecha}.",
+                "fuentes": [],
+                "tipo": tipo,
+                "fecha": fecha_payload,
+                "jurisdiccion": jurisdiccion,
+                **rango,
+            }, 200, None
+
+        system_msg = """
+Eres un analista normativo que responde preguntas sobre diarios oficiales
+y gacetas parlamentarias para un despacho de asuntos públicos.
+
+INSTRUCCIONES:
+- Responde SIEMPRE en español.
+- Usa EXCLUSIVAMENTE la información del contexto normativo que se te proporciona.
+- No inventes artículos, leyes, fechas ni antecedentes externos.
+- No uses frases como:
+  "lo que indica", "lo que implica", "esto sugiere", "esto muestra que".
+- Describe de forma factual qué se publicó o qué medidas se adoptaron.
+- Puedes responder en 2 a 5 bullets si la pregunta pide un recuento.
+"""
+
+        user_msg = f"""
+Pregunta del usuario:
+\"\"\"{texto_pregunta}\"\"\"
+
+Fecha de referencia: {ref_fecha}
+Jurisdicción: {jurisdiccion or "todas las disponibles"}
+
+A continuación tienes resúmenes normativos de diarios oficiales y gacetas:
+\"\"\"{contexto}\"\"\"
+
+Responde a la pregunta usando ÚNICAMENTE lo que aparece en este contexto.
+"""
+
+    return {
+        "fuentes": fuentes,
+        "tipo": tipo,
+        "fecha": fecha_payload,
+        "jurisdiccion": jurisdiccion,
+        "termino": termino,
+        **rango,
+    }, 200, [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
+    ]
+
+
+@app.route("/fechas_noticias", methods=["GET"])
+@con_etag(lambda: firma_archivo(NOTICIAS_DAP_CSV))
+def fechas_noticias():
+    """
+    Endpoint:
+      GET /fechas_noticias
+
+    Devuelve:
+      {
+        "fechas": ["YYYY-MM-DD", ...]
+      }
+
+    Fechas disponibles en noticias_dap.csv
+    """
+    # Mismo índice (y mismas fechas) que usan los resúmenes
+    try:
+        _, fechas = cargar_noticias_dap()
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        print("❌ Error al leer noticias_dap.csv:", repr(e))
+        return jsonify({"error": "Error al leer el CSV de noticias"}), 500
+
+    fechas_str = [iso_de_ordinal(f) for f in sorted(set(fechas), reverse=True)]
+    return jsonify({"fechas": fechas_str}), 200
+
+@app.route("/do_fechas", methods=["GET"])
+@con_etag(lambda: firma_archivo(DO_INDEX_CSV))
+def do_fechas():
+    """
+    Endpoint:
+      GET /do_fechas
+
+    Devuelve:
+      {
+        "fechas": ["2026-01-30", "2026-01-29", ...]
+      }
+
+    Lista de fechas para las que ya hay al menos un resumen normativo.
+    """
+    if not os.path.exists(DO_INDEX_CSV):
+        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
+
+    try:
+        df = cargar_do_index()
+    except Exception as e:
+        print("❌ Error al leer do_index.csv:", repr(e))
+        return jsonify({"error": "Error al leer el índice normativo"}), 500
+
+    if not {"fecha", "status", "summary_path"}.issubset(df.columns):
+        return jsonify({"error": "El índice normativo no tiene columnas necesarias"}), 500
+
+    # Solo filas que ya tienen resumen y fecha válida
+    ordinales = df.loc[mascara_tiene_resumen(df), "fecha_ord"]
+    ordinales = ordinales[ordinales != SIN_FECHA].unique()
+    fechas_str = [iso_de_ordinal(f) for f in sorted(ordinales, reverse=True)]
+
+    return jsonify({"fechas": fechas_str}), 200
+
+@app.route("/do_jurisdicciones", methods=["GET"])
+@con_etag(lambda: firma_archivo(DO_INDEX_CSV))
+def do_jurisdicciones():
+    """
+    Endpoint:
+      GET /do_jurisdicciones
+      GET /do_jurisdicciones?fecha=YYYY-MM-DD  (opcional)
+
+    Si se pasa 'fecha':
+      - Se devuelven solo jurisdicciones con resumen en esa fecha.
+    Si no:
+      - Se devuelven todas las jurisdicciones presentes en el índice.
+
+    Respuesta:
+      {
+        "fecha": "YYYY-MM-DD" (o null),
+        "jurisdicciones": ["DOF", "SONORA", "VERACRUZ", ...]
+      }
+    """
+    fecha_str = request.args.get("fecha")
+
+    if not os.path.exists(DO_INDEX_CSV):
+        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
+
+    try:
+        df = cargar_do_index()
+    except Exception as e:
+        print("❌ Error al leer do_index.csv:", repr(e))
+        return jsonify({"error": "Error al leer el índice normativo"}), 500
+
+    if not {"fecha", "jurisdiccion", "status", "summary_path"}.issubset(df.columns):
+        return jsonify({"error": "El índice normativo no tiene columnas necesarias"}), 500
+
+    # Filtrar filas que ya tienen resumen
+    df = df[mascara_tiene_resumen(df)]
 
     if fecha_str:
         try:
-            fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        except ValueError:
-            return jsonify({"error": "La fecha debe ir en formato YYYY-MM-DD"}), 400
+            fecha_obj = parsear_fecha(fecha_str)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        df = df[df["fecha_parsed"] == fecha_obj]
+        df = df[df["fecha_ord"] == fecha_obj.toordinal()]
 
     if df.empty:
         return jsonify({
@@ -907,55 +2851,267 @@ def do_jurisdicciones():
     }), 200
 
 
+# Payload de /bootstrap ya armado: (firma noticias, firma do_index) -> dict
+_bootstrap_cache = {"firmas": None, "payload": None}
+
+# Se sube al cambiar la forma del payload, para no servir uno viejo del disco
+BOOTSTRAP_FORMATO = "2"
+
+
+def datos_bootstrap() -> dict:
+    """
+    Fechas de noticias, fechas con resumen normativo y jurisdicciones por
+    fecha, a partir de los índices cacheados. Se arma una vez por versión
+    de los dos CSV y se guarda también en RESUMENES_CACHE_DIR: un proceso
+    recién arrancado lo sirve de ahí sin importar pandas ni leer los CSV.
+    """
+    firmas = (firma_archivo(NOTICIAS_DAP_CSV), firma_archivo(DO_INDEX_CSV))
+    if _bootstrap_cache["firmas"] == firmas:
+        return _bootstrap_cache["payload"]
+
+    llave = hashlib.sha1("|".join(["bootstrap", BOOTSTRAP_FORMATO, ETAG_VERSION, *firmas]).encode("utf-8")).hexdigest()
+    payload = leer_resultado_cacheado(llave)
+    if payload is not None:
+        registrar_cache("bootstrap_disco", True)
+        _bootstrap_cache["firmas"] = firmas
+        _bootstrap_cache["payload"] = payload
+        return payload
+    registrar_cache("bootstrap_disco", False)
+
+    fechas_noticias = []
+    if os.path.exists(NOTICIAS_DAP_CSV):
+        _, fechas = cargar_noticias_dap()
+        fechas_noticias = [iso_de_ordinal(f) for f in sorted(set(fechas), reverse=True)]
+
+    jurisdicciones_por_fecha = {}
+    if os.path.exists(DO_INDEX_CSV):
+        ordenado, _ = indice_do_ordenado()
+        if "jurisdiccion" in ordenado.columns and "summary_path" in ordenado.columns:
+            con_resumen = ordenado[mascara_tiene_resumen(ordenado)]
+            for fecha, jur in zip(con_resumen["fecha_parsed"], con_resumen["jurisdiccion"].astype(str).str.upper()):
+                jurisdicciones_por_fecha.setdefault(fecha.isoformat(), set()).add(jur)
+
+    payload = {
+        "fechas_noticias": fechas_noticias,
+        "do_fechas": sorted(jurisdicciones_por_fecha, reverse=True),
+        "do_jurisdicciones": {f: sorted(js) for f, js in jurisdicciones_por_fecha.items()},
+        "version": {
+            "noticias": firmas[0],
+            "do_index": firmas[1],
+            "noticias_por_dia": {iso_de_ordinal(d): v for d, v in _noticias_cache["versiones"].items()},
+        },
+    }
+    try:
+        guardar_resultado_cacheado(llave, payload)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar /bootstrap en disco: {e}")
+    _bootstrap_cache["firmas"] = firmas
+    _bootstrap_cache["payload"] = payload
+    return payload
+
+
+@app.route("/bootstrap", methods=["GET"])
+@con_etag(lambda: "|".join([firma_archivo(NOTICIAS_DAP_CSV), firma_archivo(DO_INDEX_CSV)]))
+def bootstrap():
+    """
+    Endpoint:
+      GET /bootstrap
+
+    Todo lo que necesita index.html para pintar los selectores en un solo
+    request (equivale a /fechas_noticias + /do_fechas + /do_jurisdicciones
+    para cada fecha):
+      {
+        "fechas_noticias": ["2026-02-09", ...],
+        "do_fechas": ["2026-02-12", ...],
+        "do_jurisdicciones": {"2026-02-12": ["CDMX", "DOF"], ...},
+        "version": {"noticias": "...", "do_index": "...",
+                    "noticias_por_dia": {"2026-02-09": "...", ...}}
+      }
+
+    "version" cambia cuando cambian los CSV; el frontend la usa como parte
+    de la llave de su caché de resúmenes. Para noticias usa la del día
+    (noticias_por_dia), que no cambia cuando se agregan notas de otros días.
+    """
+    try:
+        return jsonify(datos_bootstrap()), 200
+    except Exception as e:
+        print("❌ Error al armar /bootstrap:", repr(e))
+        return jsonify({"error": "Error al leer los índices"}), 500
+
+
 # -----------------------------------------
 # 🌐 Endpoint: /resumen_diarios
 # -----------------------------------------
 
 @app.route("/resumen_diarios", methods=["GET"])
+@con_etag(lambda: version_http_resumen_diarios(request.args))
 def resumen_diarios():
     """
     Endpoint:
       GET /resumen_diarios?fecha=YYYY-MM-DD&jurisdiccion=DOF
 
     Parámetros:
-      - fecha: obligatorio (YYYY-MM-DD)
+      - fecha: obligatorio si no hay rango (YYYY-MM-DD)
+      - desde / hasta: opcionales (YYYY-MM-DD), en lugar de fecha, para un
+        solo resumen del rango (inclusive) armado con los resúmenes diarios
       - jurisdiccion: opcional (DOF, SONORA, VERACRUZ, CDMX, etc.)
 
     Si no se pasa 'jurisdiccion', devuelve todas las jurisdicciones disponibles.
     Si se pasa, devuelve solo esa.
+
+    Con async=1 no espera al modelo: encola un job y responde 202 con su id
+    (ver /jobs/<id>). Útil para rangos o días con muchas jurisdicciones, que
+    pueden pasar del timeout del worker.
     """
-    fecha_str = request.args.get("fecha")
-    if not fecha_str:
-        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+    if request.args.get("async") == "1":
+        return respuesta_job("resumen_diarios", request.args)
 
-    jurisdiccion = request.args.get("jurisdiccion")
+    payload, status = resolver_resumen_diarios(request.args)
+    return jsonify(payload), status
+
+
+def resolver_resumen_diarios(args) -> tuple[dict, int]:
+    """
+    Cuerpo y status de /resumen_diarios para esos parámetros (lo usan el
+    endpoint y los jobs).
+    """
+    fecha_str = args.get("fecha")
+    desde_str = args.get("desde")
+    hasta_str = args.get("hasta")
+    if not fecha_str and not desde_str:
+        return {"error": "Debe especificar una fecha en formato YYYY-MM-DD"}, 400
+
+    jurisdiccion = args.get("jurisdiccion")
     if jurisdiccion:
         jurisdiccion = jurisdiccion.strip().upper()
 
+    if not fecha_str:
+        try:
+            resultado = obtener_resumen_diarios_rango(desde_str, hasta_str, jurisdiccion)
+        except FileNotFoundError as e:
+            return {"error": str(e)}, 500
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except ModeloNoDisponible as e:
+            print("⚠️ /resumen_diarios (rango) sin modelo ni respaldo:", repr(e))
+            return {"error": ERROR_MODELO_NO_DISPONIBLE}, 503
+        except Exception as e:
+            print("❌ Error en /resumen_diarios (rango):", repr(e))
+            return {"error": "Error interno al generar el resumen normativo"}, 500
+        return resultado, 404 if resultado.get("error") else 200
+
     try:
-        resultado = generar_resumen_diarios(fecha_str, jurisdiccion_filtro=jurisdiccion)
+        resultado = obtener_resumen_diarios(fecha_str, jurisdiccion_filtro=jurisdiccion)
     except FileNotFoundError as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return {"error": str(e)}, 400
+    except ModeloNoDisponible as e:
+        print("⚠️ /resumen_diarios sin modelo ni respaldo:", repr(e))
+        return {"error": ERROR_MODELO_NO_DISPONIBLE}, 503
     except Exception as e:
         print("❌ Error en /resumen_diarios:", repr(e))
-        return jsonify({"error": "Error interno al generar el resumen normativo"}), 500
+        return {"error": "Error interno al generar el resumen normativo"}, 500
 
     if resultado.get("error"):
-        return jsonify({
+        return {
             "fecha": resultado.get("fecha", fecha_str),
             "resumen": resultado.get("resumen", ""),
             "error": resultado["error"],
-        }), 404
+        }, 404
 
     # Solo fecha + resumen (como en /resumen_noticias)
-    return jsonify({
+    payload = {
         "fecha": resultado.get("fecha"),
         "resumen": resultado.get("resumen", ""),
-    }), 200
+    }
+    if resultado.get("desactualizado"):
+        payload["desactualizado"] = True
+    return payload, 200
+
+
+# -----------------------------------------
+# 🧵 Jobs en segundo plano (resúmenes con async=1)
+# -----------------------------------------
+
+PARAMS_JOB_RESUMEN = ("fecha", "desde", "hasta", "jurisdiccion")
+
+JOBS_RESUMEN = {
+    "resumen_noticias": (resolver_resumen_noticias, version_http_resumen_noticias),
+    "resumen_diarios": (resolver_resumen_diarios, version_http_resumen_diarios),
+}
+
+def _ejecutor_job(tipo: str, resolver):
+    # El uso del modelo de un job se anota aparte del endpoint en línea
+    def ejecutar(params: dict) -> tuple[dict, int]:
+        with uso(endpoint=f"/{tipo} (job)"):
+            return resolver(params)
+    return ejecutar
+
+
+for _tipo, (_resolver, _) in JOBS_RESUMEN.items():
+    registrar_tipo(_tipo, _ejecutor_job(_tipo, _resolver))
+
+
+def respuesta_job(tipo: str, args):
+    """
+    Encola el resumen como job y responde 202 con su id.
+
+    El id sale de los parámetros y de la versión de los datos: pedir lo mismo
+    otra vez devuelve el mismo job (pendiente, en curso o ya terminado). El
+    resultado queda además en la caché de resúmenes, como el de un request
+    normal.
+    """
+    resolver, version_fn = JOBS_RESUMEN[tipo]
+    params = {k: args[k] for k in PARAMS_JOB_RESUMEN if args.get(k)}
+    if params.get("jurisdiccion"):
+        params["jurisdiccion"] = params["jurisdiccion"].strip().upper()
+
+    try:
+        version = version_fn(params)
+    except Exception:
+        # Parámetros inválidos o datos faltantes: el error sale rápido sin job
+        payload, status = resolver(params)
+        return jsonify(payload), status
+
+    crudo = json.dumps([tipo, params, version], sort_keys=True)
+    job_id = hashlib.sha1(crudo.encode("utf-8")).hexdigest()
+    try:
+        job = encolar(job_id, tipo, params)
+    except Exception as e:
+        print("❌ Error al encolar el job:", repr(e))
+        return jsonify({"error": "No se pudo encolar el resumen"}), 500
+
+    resp = jsonify({**job, "url": f"/jobs/{job_id}"})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/jobs/{job_id}"
+    return resp
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def jobs(job_id):
+    """
+    Endpoint:
+      GET /jobs/<id>
+
+    Estado de un job: "pendiente", "corriendo", "terminado" (con "status" y
+    "resultado", el cuerpo que habría devuelto el endpoint) o "error" (con
+    "status" y "resultado" si el endpoint habría respondido 5xx). Un job en
+    error se vuelve a intentar al pedir el mismo resumen otra vez.
+    """
+    try:
+        job = obtener_job(job_id)
+    except Exception as e:
+        print("❌ Error al leer el job:", repr(e))
+        return jsonify({"error": "Error al leer la tabla de jobs"}), 500
+
+    if job is None:
+        return jsonify({"error": "No existe ese job (o ya expiró)"}), 404
+    return jsonify(job), 200
+
 
 @app.route("/jurisdicciones_disponibles", methods=["GET"])
+@con_etag(lambda: firma_archivo(DO_INDEX_CSV))
 def jurisdicciones_disponibles():
     """
     Endpoint:
@@ -967,41 +3123,238 @@ def jurisdicciones_disponibles():
         "jurisdicciones": ["DOF", "SONORA", "VERACRUZ"]
       }
     """
-    fecha_str = request.args.get("fecha")
-    if not fecha_str:
-        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+    fecha_str = request.args.get("fecha")
+    if not fecha_str:
+        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+
+    try:
+        df_dia = cargar_diarios_por_fecha(fecha_str)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 500
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("❌ Error en /jurisdicciones_disponibles:", repr(e))
+        return jsonify({"error": "Error interno al consultar jurisdicciones"}), 500
+
+    if df_dia.empty:
+        return jsonify({
+            "fecha": fecha_str,
+            "jurisdicciones": []
+        }), 404
+
+    jurisdicciones = sorted(df_dia["jurisdiccion"].astype(str).str.upper().unique().tolist())
+
+    return jsonify({
+        "fecha": fecha_str,
+        "jurisdicciones": jurisdicciones
+    }), 200
+
+@app.route("/do_pdfs", methods=["GET"])
+@con_etag(lambda: firma_archivo(DO_INDEX_CSV))
+def do_pdfs():
+    """
+    Endpoint:
+      GET /do_pdfs?fecha=YYYY-MM-DD&jurisdiccion=DOF
+
+    Devuelve la lista de PDFs disponibles para esa fecha y jurisdicción,
+    con una URL para descargarlos desde el servidor.
+    """
+    fecha_str = request.args.get("fecha")
+    jurisdiccion = request.args.get("jurisdiccion")
+
+    if not fecha_str:
+        return jsonify({"error": "Debe especificar una fecha en formato YYYY-MM-DD"}), 400
+    if not jurisdiccion:
+        return jsonify({"error": "Debe especificar una jurisdiccion"}), 400
+
+    jurisdiccion = str(jurisdiccion).strip().upper()
+
+    try:
+        df_dia = cargar_diarios_por_fecha(fecha_str)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e), "documentos": []}), 500
+    except ValueError as e:
+        return jsonify({"error": str(e), "documentos": []}), 400
+    except Exception as e:
+        print("❌ Error en do_pdfs/cargar_diarios_por_fecha:", repr(e))
+        return jsonify({"error": "Error interno al leer el índice normativo", "documentos": []}), 500
+
+    if df_dia.empty:
+        return jsonify({
+            "fecha": fecha_str,
+            "jurisdiccion": jurisdiccion,
+            "documentos": []
+        }), 200
+
+    # Filtrar por jurisdicción
+    df_dia["jurisdiccion"] = df_dia["jurisdiccion"].astype(str).str.upper()
+    df_jur = df_dia[df_dia["jurisdiccion"] == jurisdiccion].copy()
+
+    if df_jur.empty:
+        return jsonify({
+            "fecha": fecha_str,
+            "jurisdiccion": jurisdiccion,
+            "documentos": []
+        }), 200
+
+    docs = []
+    for _, row in df_jur.iterrows():
+        doc_id = str(row.get("id", "")).strip()
+        if not doc_id:
+            continue
+
+        docs.append({
+            "id": doc_id,
+            "nombre": doc_id,
+            "jurisdiccion": jurisdiccion,
+            "url": f"/descargar_pdf?id={doc_id}"
+        })
+
+    return jsonify({
+        "fecha": fecha_str,
+        "jurisdiccion": jurisdiccion,
+        "documentos": docs
+    }), 200
+
+
+@app.route("/descargar_pdf", methods=["GET"])
+def descargar_pdf():
+    """
+    Endpoint:
+      GET /descargar_pdf?id=ID_DEL_DOCUMENTO
+
+    Toma la ruta real del PDF del índice (resuelta al cargar do_index.csv)
+    y lo envía como archivo descargable, con ETag (sha256 del archivo),
+    If-None-Match / If-Range y Range: el navegador puede reanudar descargas
+    y los visores de PDF pedir solo las páginas que muestran.
+
+    Con PDF_OFFLOAD=x-accel (nginx) o PDF_OFFLOAD=x-sendfile (Apache/lighttpd)
+    el proxy de enfrente manda el archivo y el worker queda libre.
+    """
+    doc_id = request.args.get("id")
+    if not doc_id:
+        return jsonify({"error": "Debe especificar el parámetro 'id'"}), 400
+
+    if not os.path.exists(DO_INDEX_CSV):
+        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
+
+    try:
+        ruta_pdf = ruta_pdf_por_id(doc_id)
+    except Exception as e:
+        print("❌ Error al leer do_index.csv en /descargar_pdf:", repr(e))
+        return jsonify({"error": "Error al leer el índice normativo"}), 500
+
+    if ruta_pdf is None:
+        return jsonify({"error": f"No se encontró un registro con id={doc_id}"}), 404
+    if not ruta_pdf:
+        return jsonify({"error": "El índice no tiene pdf_path para este documento"}), 500
+
+    if not os.path.exists(ruta_pdf):
+        return jsonify({"error": f"No se encontró el PDF en {ruta_pdf}"}), 404
+
+    try:
+        etag = hash_archivo(ruta_pdf)
+
+        if PDF_OFFLOAD == "x-accel":
+            resp = respuesta_x_accel(ruta_pdf, doc_id, etag)
+        else:
+            # Con PDF_OFFLOAD=x-sendfile, send_file solo pone la cabecera X-Sendfile
+            resp = send_file(
+                ruta_pdf,
+                mimetype="application/pdf",
+                as_attachment=True,
+                download_name=doc_id,
+                conditional=True,
+                etag=etag,
+            )
+        resp.headers["Cache-Control"] = CACHE_CONTROL_LECTURA
+        return resp
+    except Exception as e:
+        print("❌ Error al enviar PDF en /descargar_pdf:", repr(e))
+        return jsonify({"error": "Error interno al enviar el PDF"}), 500
+
+
+def respuesta_x_accel(ruta_pdf: str, nombre: str, etag: str):
+    """
+    Respuesta vacía con X-Accel-Redirect: nginx sirve el archivo (con Range)
+    desde una location interna que apunta a BASE_DIR, p. ej.:
+
+      location /pdfs_internos/ {
+          internal;
+          alias /ruta/al/proyecto/;
+      }
+    """
+    relativa = os.path.relpath(ruta_pdf, BASE_DIR).replace(os.sep, "/")
+    resp = app.response_class(status=200, mimetype="application/pdf")
+    resp.headers["X-Accel-Redirect"] = PDF_ACCEL_PREFIX.rstrip("/") + "/" + quote(relativa)
+    resp.headers.set("Content-Disposition", "attachment", filename=nombre)
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+
+
+class _BufferSalida(io.RawIOBase):
+    """
+    Destino no "seekable" para zipfile: acumula lo escrito hasta que el
+    generador de la respuesta lo vacía. zipfile detecta que no puede hacer
+    seek y escribe tamaños y CRC en data descriptors tras cada archivo.
+    """
 
-    try:
-        df_dia = cargar_diarios_por_fecha(fecha_str)
-    except FileNotFoundError as e:
-        return jsonify({"error": str(e)}), 500
-    except ValueError as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        print("❌ Error en /jurisdicciones_disponibles:", repr(e))
-        return jsonify({"error": "Error interno al consultar jurisdicciones"}), 500
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
 
-    if df_dia.empty:
-        return jsonify({
-            "fecha": fecha_str,
-            "jurisdicciones": []
-        }), 404
+    def writable(self):
+        return True
 
-    jurisdicciones = sorted(df_dia["jurisdiccion"].astype(str).str.upper().unique().tolist())
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
 
-    return jsonify({
-        "fecha": fecha_str,
-        "jurisdicciones": jurisdicciones
-    }), 200
+    def tell(self):
+        return self._posicion
 
-@app.route("/do_pdfs", methods=["GET"])
-def do_pdfs():
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_zip_pdfs(archivos: list, faltantes: list, bloque: int = 1 << 20):
+    """
+    Genera un ZIP (sin recomprimir: ZIP_STORED) con [(ruta, nombre), ...] en
+    pedazos, sin archivo temporal y con a lo más un bloque en memoria.
+    Si hay PDFs faltantes, se agrega un FALTANTES.txt con sus nombres.
+    """
+    salida = _BufferSalida()
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for ruta, nombre in archivos:
+            info = zipfile.ZipInfo.from_file(ruta, arcname=nombre)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(ruta, "rb") as origen, zf.open(
+                info, mode="w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT
+            ) as destino:
+                for pedazo in iter(lambda: origen.read(bloque), b""):
+                    destino.write(pedazo)
+                    yield salida.vaciar()
+            yield salida.vaciar()
+
+        if faltantes:
+            zf.writestr("FALTANTES.txt", "\n".join(faltantes) + "\n")
+
+    yield salida.vaciar()
+
+
+@app.route("/descargar_pdfs_zip", methods=["GET"])
+def descargar_pdfs_zip():
     """
     Endpoint:
-      GET /do_pdfs?fecha=YYYY-MM-DD&jurisdiccion=DOF
+      GET /descargar_pdfs_zip?fecha=YYYY-MM-DD&jurisdiccion=DOF
 
-    Devuelve la lista de PDFs disponibles para esa fecha y jurisdicción,
-    con una URL para descargarlos desde el servidor.
+    Los mismos PDFs que lista /do_pdfs, en un solo ZIP que se arma y se
+    envía al vuelo (sin recomprimir, sin archivo temporal).
     """
     fecha_str = request.args.get("fecha")
     jurisdiccion = request.args.get("jurisdiccion")
@@ -1016,104 +3369,212 @@ def do_pdfs():
     try:
         df_dia = cargar_diarios_por_fecha(fecha_str)
     except FileNotFoundError as e:
-        return jsonify({"error": str(e), "documentos": []}), 500
+        return jsonify({"error": str(e)}), 500
     except ValueError as e:
-        return jsonify({"error": str(e), "documentos": []}), 400
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("❌ Error en do_pdfs/cargar_diarios_por_fecha:", repr(e))
-        return jsonify({"error": "Error interno al leer el índice normativo", "documentos": []}), 500
-
-    if df_dia.empty:
-        return jsonify({
-            "fecha": fecha_str,
-            "jurisdiccion": jurisdiccion,
-            "documentos": []
-        }), 200
+        print("❌ Error en /descargar_pdfs_zip:", repr(e))
+        return jsonify({"error": "Error interno al leer el índice normativo"}), 500
 
-    # Filtrar por jurisdicción
-    df_dia["jurisdiccion"] = df_dia["jurisdiccion"].astype(str).str.upper()
-    df_jur = df_dia[df_dia["jurisdiccion"] == jurisdiccion].copy()
-
-    if df_jur.empty:
-        return jsonify({
-            "fecha": fecha_str,
-            "jurisdiccion": jurisdiccion,
-            "documentos": []
-        }), 200
+    df_jur = df_dia[df_dia["jurisdiccion"].astype(str).str.upper() == jurisdiccion]
 
-    docs = []
-    for _, row in df_jur.iterrows():
-        doc_id = str(row.get("id", "")).strip()
+    archivos = []
+    faltantes = []
+    for doc_id, ruta in zip(df_jur["id"].astype(str).str.strip(), df_jur["pdf_abspath"]):
         if not doc_id:
             continue
+        if ruta and os.path.exists(ruta):
+            archivos.append((ruta, doc_id))
+        else:
+            faltantes.append(doc_id)
 
-        docs.append({
-            "id": doc_id,
-            "nombre": doc_id,
+    if not archivos:
+        return jsonify({
+            "error": "No hay PDFs disponibles para esa fecha y jurisdicción",
+            "fecha": fecha_str,
             "jurisdiccion": jurisdiccion,
-            "url": f"/descargar_pdf?id={doc_id}"
-        })
+        }), 404
 
-    return jsonify({
-        "fecha": fecha_str,
-        "jurisdiccion": jurisdiccion,
-        "documentos": docs
-    }), 200
+    nombre_zip = f"{jurisdiccion.replace(' ', '_')}_{fecha_str}.zip"
+    resp = app.response_class(
+        stream_with_context(generar_zip_pdfs(archivos, faltantes)),
+        mimetype="application/zip",
+    )
+    resp.headers.set("Content-Disposition", "attachment", filename=nombre_zip)
+    return resp
 
 
-@app.route("/descargar_pdf", methods=["GET"])
-def descargar_pdf():
+@app.route("/do_texto", methods=["GET"])
+def do_texto():
     """
     Endpoint:
-      GET /descargar_pdf?id=ID_DEL_DOCUMENTO
+      GET /do_texto?id=ID_DEL_DOCUMENTO&seccion=N
+      GET /do_texto?id=ID_DEL_DOCUMENTO&desde=L&hasta=L2
 
-    Busca en do_index.csv el registro con ese id, arma la ruta real
-    al PDF (pdf_path + id) y lo envía como archivo descargable.
+    Devuelve un fragmento del texto extraído (do_textos) de un documento:
+    la sección/página N, o las líneas [desde, hasta). Se lee solo ese rango
+    del archivo vía el índice de offsets, sin cargar el texto completo.
     """
     doc_id = request.args.get("id")
     if not doc_id:
         return jsonify({"error": "Debe especificar el parámetro 'id'"}), 400
 
+    # Límite de líneas por petición para no devolver documentos completos
+    max_lineas = int(os.getenv("DO_TEXTO_MAX_LINEAS", "200"))
+    seccion = request.args.get("seccion", type=int)
+    desde = request.args.get("desde", default=0, type=int)
+    hasta = request.args.get("hasta", default=desde + max_lineas, type=int)
+    if desde < 0 or hasta < 0:
+        return jsonify({"error": "'desde' y 'hasta' no pueden ser negativos"}), 400
+    hasta = min(max(hasta, desde), desde + max_lineas)
+
     if not os.path.exists(DO_INDEX_CSV):
         return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
 
     try:
-        df = pd.read_csv(DO_INDEX_CSV)
+        ruta_txt = ruta_texto_por_id(doc_id)
     except Exception as e:
-        print("❌ Error al leer do_index.csv en /descargar_pdf:", repr(e))
+        print("❌ Error al leer do_index.csv en /do_texto:", repr(e))
         return jsonify({"error": "Error al leer el índice normativo"}), 500
 
-    df_id = df[df["id"].astype(str) == str(doc_id)]
-    if df_id.empty:
+    if ruta_txt is None:
         return jsonify({"error": f"No se encontró un registro con id={doc_id}"}), 404
+    if not ruta_txt or not os.path.exists(ruta_txt):
+        return jsonify({"error": "No hay texto extraído para este documento"}), 404
 
-    row = df_id.iloc[0]
-    pdf_dir = str(row.get("pdf_path", "")).strip()
-    if not pdf_dir:
-        return jsonify({"error": "El índice no tiene pdf_path para este documento"}), 500
+    try:
+        indice = cargar_indice_offsets(ruta_txt)
+        if seccion is not None:
+            texto = leer_seccion(ruta_txt, seccion)
+        else:
+            texto = leer_lineas(ruta_txt, desde, hasta)
+    except Exception as e:
+        print("❌ Error al leer texto en /do_texto:", repr(e))
+        return jsonify({"error": "Error interno al leer el texto del documento"}), 500
+
+    resultado = {
+        "id": doc_id,
+        "total_lineas": len(indice["lineas"]),
+        "total_secciones": len(indice["secciones"]),
+        "texto": texto,
+    }
+    if seccion is not None:
+        resultado["seccion"] = seccion
+    else:
+        resultado["desde"] = desde
+        resultado["hasta"] = hasta
+
+    return jsonify(resultado), 200
 
-    # 👇 Normalizar separadores y colgarlo de BASE_DIR si es relativo
-    pdf_dir = pdf_dir.replace("\\", os.sep)
-    if not os.path.isabs(pdf_dir):
-        pdf_dir = os.path.join(BASE_DIR, pdf_dir)
-    pdf_dir = os.path.normpath(pdf_dir)
 
-    ruta_pdf = os.path.join(pdf_dir, doc_id)
-    ruta_pdf = os.path.normpath(ruta_pdf)
+# ------------------------------
+# 🧾 Items normativos (bullets de los _resumen.txt)
+# ------------------------------
 
-    if not os.path.exists(ruta_pdf):
-        return jsonify({"error": f"No se encontró el PDF en {ruta_pdf}"}), 404
+# Firma de do_index.csv con la que se sincronizó por última vez la base de items
+_items_do_firma = {"firma": None}
+
+
+def documentos_para_items(df: pd.DataFrame) -> list[dict]:
+    """
+    Documentos del índice con resumen, en la forma que espera sincronizar_items.
+    """
+    df = df[mascara_tiene_resumen(df) & df["fecha_parsed"].notna()]
+    return [
+        {
+            "doc_id": str(doc_id).strip(),
+            "fecha": fecha.isoformat(),
+            "jurisdiccion": str(jur).strip().upper(),
+            "ruta": ruta,
+        }
+        for doc_id, fecha, jur, ruta in zip(
+            df["id"], df["fecha_parsed"], df["jurisdiccion"], df["summary_abspath"]
+        )
+    ]
+
+
+def items_do_al_dia() -> None:
+    """
+    Sincroniza la base de items si do_index.csv cambió desde la última vez.
+    Solo se vuelven a parsear los _resumen.txt nuevos o modificados; para
+    recoger cambios en resúmenes sin tocar el índice: --ingestar-items.
+    """
+    df = cargar_do_index()
+    firma = _do_index_cache["firma"]
+    if _items_do_firma["firma"] == firma:
+        return
+    with tramo("ingesta_items"):
+        totales = sincronizar_items(documentos_para_items(df))
+    if totales["actualizados"] or totales["borrados"]:
+        print(f"🧾 Items normativos: {totales}")
+    _items_do_firma["firma"] = firma
+
+
+def version_items_do() -> str:
+    """
+    Versión de /items_do: la base ya sincronizada con el índice y su
+    contador de escrituras. No se usa el mtime del archivo: con WAL los
+    cambios quedan en el -wal y el .sqlite3 no se toca hasta el checkpoint.
+    """
+    items_do_al_dia()
+    return f"{firma_archivo(DO_INDEX_CSV)}|{version_items()}"
+
+
+@app.route("/items_do", methods=["GET"])
+@con_etag(version_items_do)
+def items_do():
+    """
+    Endpoint:
+      GET /items_do?desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+                   &jurisdiccion=DOF&dependencia=economia&instrumento=acuerdo&q=texto
+      GET /items_do?fecha=YYYY-MM-DD&...
+
+    Bullets de los resúmenes por tomo, ya separados por fecha, jurisdicción,
+    documento, dependencia emisora y tipo de instrumento. Responde preguntas
+    como "acuerdos de la Secretaría de Economía de este mes" con una
+    consulta indexada, sin pasar por el modelo. Todos los filtros son
+    opcionales. dependencia busca palabras del nombre (la última puede ir
+    incompleta) y q subcadenas del texto, ambos sin acentos.
+
+    Devuelve:
+      {
+        "items": [
+          {"fecha", "jurisdiccion", "doc_id", "orden", "dependencia",
+           "instrumento", "texto"}, ...
+        ],
+        "total": 37
+      }
+    """
+    fecha_str = request.args.get("fecha")
+    desde_str = request.args.get("desde") or fecha_str
+    hasta_str = request.args.get("hasta") or fecha_str
+
+    try:
+        desde = parsear_fecha(desde_str).isoformat() if desde_str else None
+        hasta = parsear_fecha(hasta_str).isoformat() if hasta_str else None
+        limite = min(int(request.args.get("limite", ITEMS_DO_LIMITE)), ITEMS_DO_LIMITE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not os.path.exists(DO_INDEX_CSV):
+        return jsonify({"error": f"No se encontró el archivo {DO_INDEX_CSV}"}), 500
 
     try:
-        return send_file(
-            ruta_pdf,
-            as_attachment=True,
-            download_name=doc_id
+        items_do_al_dia()
+        items, total = buscar_items(
+            desde=desde,
+            hasta=hasta,
+            jurisdiccion=request.args.get("jurisdiccion"),
+            dependencia=request.args.get("dependencia"),
+            instrumento=request.args.get("instrumento"),
+            texto=request.args.get("q"),
+            limite=limite,
         )
     except Exception as e:
-        print("❌ Error al enviar PDF en /descargar_pdf:", repr(e))
-        return jsonify({"error": "Error interno al enviar el PDF"}), 500
+        print("❌ Error al consultar items normativos:", repr(e))
+        return jsonify({"error": "Error al consultar los items normativos"}), 500
 
+    return jsonify({"items": items, "total": total}), 200
 
 
 @app.route("/resumen_do", methods=["POST"])
@@ -1149,11 +3610,14 @@ def resumen_do():
     jurisdiccion = str(jurisdiccion).strip().upper()
 
     try:
-        resultado = generar_resumen_diarios(fecha_str, jurisdiccion_filtro=jurisdiccion)
+        resultado = obtener_resumen_diarios(fecha_str, jurisdiccion_filtro=jurisdiccion)
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 500
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except ModeloNoDisponible as e:
+        print("⚠️ /resumen_do sin modelo ni respaldo:", repr(e))
+        return jsonify({"error": ERROR_MODELO_NO_DISPONIBLE}), 503
     except Exception as e:
         print("❌ Error en /resumen_do:", repr(e))
         return jsonify({"error": "Error interno al generar el resumen normativo"}), 500
@@ -1166,11 +3630,14 @@ def resumen_do():
             "error": resultado["error"],
         }), 404
 
-    return jsonify({
+    payload = {
         "fecha": resultado.get("fecha", fecha_str),
         "jurisdiccion": jurisdiccion,
         "resumen": resultado.get("resumen", ""),
-    }), 200
+    }
+    if resultado.get("desactualizado"):
+        payload["desactualizado"] = True
+    return jsonify(payload), 200
 
 @app.route("/pregunta", methods=["POST"])
 def pregunta():
@@ -1182,10 +3649,13 @@ def pregunta():
         {
           "pregunta": "...",
           "fecha": "YYYY-MM-DD"  (opcional)
+          "desde": "YYYY-MM-DD", "hasta": "YYYY-MM-DD"  (opcionales, rango)
+          "stream": true  (opcional)
         }
 
     Lógica:
       - Detecta si la pregunta es sobre noticias o normativo.
+      - Si viene desde/hasta, usa todos los días del rango.
       - Si no viene fecha, usa la más reciente disponible para ese tipo.
       - Construye contexto a partir de titulares o resúmenes normativos.
       - Llama a OpenAI para responder de forma estrictamente factual.
@@ -1198,121 +3668,235 @@ def pregunta():
     if not texto_pregunta or not isinstance(texto_pregunta, str):
         return jsonify({"error": "Debe especificar el campo 'pregunta' en el cuerpo JSON"}), 400
 
-    # Detectar intención
-    intent = detectar_intencion_pregunta(texto_pregunta)
-    tipo = intent["tipo"]           # "noticias" | "normativo"
-    jurisdiccion = intent["jurisdiccion"]
-    termino = intent["termino"]
+    payload, status, mensajes = preparar_pregunta(
+        texto_pregunta, fecha_str, data.get("desde"), data.get("hasta")
+    )
+    if mensajes is None:
+        return jsonify(payload), status
+
+    if data.get("stream") is True:
+        # NDJSON: primero el payload sin respuesta, luego {"delta": "..."}
+        # conforme llega el texto y al final {"fin": true} (o {"error": ...})
+        return app.response_class(
+            stream_with_context(en_contexto(generar_respuesta_stream(payload, mensajes))),
+            mimetype="application/x-ndjson",
+        )
 
-    # Resolver fecha si no viene
-    if not fecha_str:
-        if tipo == "noticias":
-            fecha_str = obtener_ultima_fecha_noticias()
-        else:
-            fecha_str = obtener_ultima_fecha_diarios()
+    # Llamada al modelo
+    try:
+        with uso(fecha=fecha_de_payload(payload)):
+            respuesta = completar(mensajes, os.getenv("PREGUNTA_MODEL", "gpt-4o-mini"))
+    except ModeloNoDisponible as e:
+        print("⚠️ /pregunta sin modelo:", repr(e))
+        return jsonify({"error": ERROR_MODELO_NO_DISPONIBLE}), 503
+    except Exception as e:
+        print("❌ Error en /pregunta al llamar a OpenAI:", repr(e))
+        return jsonify({"error": "Error interno al generar la respuesta de la pregunta"}), 500
 
-    if not fecha_str:
-        return jsonify({"error": "No se pudo determinar una fecha válida para responder la pregunta"}), 400
+    payload["respuesta"] = respuesta
+    return jsonify(payload), 200
 
-    # Construir contexto y fuentes según el tipo
-    if tipo == "noticias":
-        contexto, fuentes = preparar_contexto_y_fuentes_noticias(fecha_str, termino_filtro=termino)
-        if not contexto:
-            return jsonify({
-                "respuesta": f"No encontré noticias relevantes para esa pregunta en la fecha {fecha_str}.",
-                "fuentes": [],
-                "tipo": tipo,
-                "fecha": fecha_str,
-            }), 200
 
-        system_msg = """
-Eres un analista que responde preguntas sobre noticias para un despacho de asuntos públicos.
+def en_contexto(generador):
+    """
+    Avanza el generador dentro de una copia del contexto (ContextVars) de
+    quien lo crea: el cuerpo de un stream se consume cuando el request ya
+    cerró su plazo y su endpoint de uso, y sin esto los perdería.
+    """
+    contexto = contextvars.copy_context()
 
-INSTRUCCIONES:
-- Responde SIEMPRE en español.
-- Usa EXCLUSIVAMENTE la información de los titulares que se te proporcionan.
-- No inventes contexto externo ni antecedentes.
-- No uses frases como:
-  "lo que indica", "lo que implica", "esto sugiere", "esto muestra que",
-  ni saques conclusiones políticas o estratégicas.
-- Puedes responder en 2 a 5 bullets si la pregunta pide un recuento.
-- Sé concreto y factual.
-"""
+    def avanzar():
+        while True:
+            try:
+                yield contexto.run(next, generador)
+            except StopIteration:
+                return
 
-        user_msg = f"""
-Pregunta del usuario:
-\"\"\"{texto_pregunta}\"\"\"
+    return avanzar()
 
-Fecha de referencia: {fecha_str}
 
-A continuación tienes titulares de noticias del día, uno por línea:
-\"\"\"{contexto}\"\"\"
+def fecha_de_payload(payload: dict) -> str | None:
+    """
+    Fecha (o rango "desde..hasta") de una respuesta de /pregunta, para la bitácora de uso.
+    """
+    if payload.get("desde"):
+        return f"{payload['desde']}..{payload.get('hasta') or payload['desde']}"
+    return payload.get("fecha")
 
-Responde a la pregunta usando ÚNICAMENTE lo que aparece en esos titulares.
-"""
 
-    else:  # tipo == "normativo"
-        contexto, fuentes = preparar_contexto_y_fuentes_diarios(fecha_str, jurisdiccion=jurisdiccion)
-        if not contexto:
-            desc_jur = f" para {jurisdiccion}" if jurisdiccion else ""
-            return jsonify({
-                "respuesta": f"No encontré contenido normativo relevante{desc_jur} en la fecha {fecha_str}.",
-                "fuentes": [],
-                "tipo": tipo,
-                "fecha": fecha_str,
-                "jurisdiccion": jurisdiccion,
-            }), 200
+def generar_respuesta_stream(payload: dict, mensajes: list):
+    yield json.dumps(payload, ensure_ascii=False) + "\n"
+    try:
+        modelo = os.getenv("PREGUNTA_MODEL", "gpt-4o-mini")
+        for pedazo in completar_stream(mensajes, modelo, fecha=fecha_de_payload(payload)):
+            yield json.dumps({"delta": pedazo}, ensure_ascii=False) + "\n"
+    except ModeloNoDisponible as e:
+        print("⚠️ /pregunta (stream) sin modelo:", repr(e))
+        yield json.dumps({"error": ERROR_MODELO_NO_DISPONIBLE}, ensure_ascii=False) + "\n"
+        return
+    except Exception as e:
+        print("❌ Error en /pregunta (stream) al llamar al modelo:", repr(e))
+        yield json.dumps({"error": "Error interno al generar la respuesta de la pregunta"}) + "\n"
+        return
+    yield json.dumps({"fin": True}) + "\n"
 
-        system_msg = """
-Eres un analista normativo que responde preguntas sobre diarios oficiales
-y gacetas parlamentarias para un despacho de asuntos públicos.
 
-INSTRUCCIONES:
-- Responde SIEMPRE en español.
-- Usa EXCLUSIVAMENTE la información del contexto normativo que se te proporciona.
-- No inventes artículos, leyes, fechas ni antecedentes externos.
-- No uses frases como:
-  "lo que indica", "lo que implica", "esto sugiere", "esto muestra que".
-- Describe de forma factual qué se publicó o qué medidas se adoptaron.
-- Puedes responder en 2 a 5 bullets si la pregunta pide un recuento.
-"""
+# ------------------------------
+# 🔥 Arranque en caliente (preload de gunicorn)
+# ------------------------------
 
-        user_msg = f"""
-Pregunta del usuario:
-\"\"\"{texto_pregunta}\"\"\"
+# Cuánto espera un request que llega mientras el proceso calienta. Pasado
+# este tiempo sigue de todos modos y carga lo que le falte por su cuenta.
+CALENTAMIENTO_ESPERA = float(os.getenv("CALENTAMIENTO_ESPERA", "30"))
 
-Fecha de referencia: {fecha_str}
-Jurisdicción: {jurisdiccion or "todas las disponibles"}
+# Rutas que responden aunque el proceso no haya terminado de calentar
+RUTAS_SIN_ESPERA = {"/health", "/ready", "/metrics", "/cache_stats", "/usage"}
 
-A continuación tienes resúmenes normativos de diarios oficiales y gacetas:
-\"\"\"{contexto}\"\"\"
+# Estado de este proceso: "frio" -> "calentando" -> "listo"
+_calentamiento = {"estado": "frio", "segundos": None, "pasos": {}, "errores": {}}
+_calentamiento_lock = threading.Lock()
+_caliente = threading.Event()
 
-Responde a la pregunta usando ÚNICAMENTE lo que aparece en este contexto.
-"""
 
-    # Llamada a OpenAI
-    try:
-        completion = client.chat.completions.create(
-            model=os.getenv("PREGUNTA_MODEL", "gpt-4o-mini"),
-            temperature=0,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-        )
-        respuesta = completion.choices[0].message.content.strip()
-    except Exception as e:
-        print("❌ Error en /pregunta al llamar a OpenAI:", repr(e))
-        return jsonify({"error": "Error interno al generar la respuesta de la pregunta"}), 500
+def precargar_resumenes() -> int:
+    """
+    Lee al LRU los _resumen.txt más recientes del índice (hasta
+    RESUMENES_CACHE_MAX), del más viejo al más nuevo para que los últimos
+    días sean los últimos en salir.
+    """
+    ordenado, _ = indice_do_ordenado()
+    if "summary_abspath" not in ordenado.columns:
+        return 0
+    rutas = [r for r in ordenado["summary_abspath"].tolist() if r][-RESUMENES_CACHE_MAX:]
+    return sum(leer_resumen(ruta) is not None for ruta in rutas)
+
+
+def calentar() -> dict:
+    """
+    Carga en este proceso lo que los requests leen de disco: los índices de
+    noticias y normativo, el LRU de resúmenes, el payload de /bootstrap, el
+    matcher de intención, el índice semántico y la base de items.
+
+    Con preload_app (gunicorn.conf.py) corre una sola vez en el master antes
+    del fork: los workers heredan todo ya armado y lo comparten
+    copy-on-write. Un paso que falla (p. ej. falta un CSV) se anota en el
+    estado y no impide quedar listo; ese dato se carga perezosamente como
+    siempre. Si otro thread ya está calentando, espera a que termine (hasta
+    CALENTAMIENTO_ESPERA) en lugar de repetir los pasos.
+    """
+    pasos = [
+        ("noticias", lambda: len(cargar_noticias_dap()[0])),
+        ("do_index", lambda: len(indice_do_ordenado()[0])),
+        ("resumenes", precargar_resumenes),
+        ("bootstrap", lambda: len(datos_bootstrap()["do_fechas"])),
+        ("intencion", lambda: len(matcher_intencion()[1])),
+        ("indice_semantico", lambda: len((cargar_indice_semantico() or ((), []))[1])),
+        ("items_do", items_do_al_dia),
+    ]
+
+    with _calentamiento_lock:
+        propio = _calentamiento["estado"] == "frio"
+        if propio:
+            _calentamiento["estado"] = "calentando"
+    if not propio:
+        # Ya listo, o calentando en otro thread: a lo más se espera a que acabe
+        esperar_calentamiento()
+        return estado_calentamiento()
+    return _calentar(pasos)
+
+
+def _calentar(pasos: list) -> dict:
+    # Los pasos corren sin el lock: /ready y los requests leen el estado mientras tanto
+    t0 = time.perf_counter()
+    for nombre, fn in pasos:
+        try:
+            with tramo(f"calentar_{nombre}"):
+                resultado = fn()
+            _calentamiento["pasos"][nombre] = True if resultado is None else resultado
+        except Exception as e:
+            print(f"⚠️ Arranque en caliente: no se pudo cargar {nombre}: {e!r}")
+            _calentamiento["errores"][nombre] = str(e) or repr(e)
+
+    with _calentamiento_lock:
+        _calentamiento["segundos"] = round(time.perf_counter() - t0, 3)
+        _calentamiento["estado"] = "listo"
+    _caliente.set()
+
+    print(f"🔥 Proceso {os.getpid()} listo en {_calentamiento['segundos']}s: {_calentamiento['pasos']}")
+    return estado_calentamiento()
+
+
+def iniciar_calentamiento() -> None:
+    """
+    Calienta en un thread si este proceso sigue frío (sin preload, cada
+    worker calienta al arrancar). Si ya está listo o calentando, no hace
+    nada. No bloquea: el lock solo cubre el cambio de estado.
+    """
+    if _calentamiento["estado"] != "frio":
+        return
+    threading.Thread(target=calentar, name="calentamiento", daemon=True).start()
+
+
+def estado_calentamiento() -> dict:
+    return {
+        "estado": _calentamiento["estado"],
+        "pid": os.getpid(),
+        "segundos": _calentamiento["segundos"],
+        "pasos": dict(_calentamiento["pasos"]),
+        "errores": dict(_calentamiento["errores"]),
+    }
 
-    return jsonify({
-        "respuesta": respuesta,
-        "fuentes": fuentes,
-        "tipo": tipo,
-        "fecha": fecha_str,
-        "jurisdiccion": jurisdiccion,
-        "termino": termino,
-    }), 200
+
+def esperar_calentamiento() -> None:
+    if _calentamiento["estado"] == "calentando":
+        _caliente.wait(CALENTAMIENTO_ESPERA)
+
+
+def _reiniciar_tras_fork() -> None:
+    """
+    Corre en el hijo justo después de un fork (workers de gunicorn). Los
+    DataFrames y cachés heredados sirven tal cual; lo que no se comparte
+    son los locks y vuelos que otro thread del padre tenía tomados. El
+    cliente del modelo lo rehace llm_utils.proveedor() (es por pid).
+    """
+    global _vuelos_lock, _calentamiento_lock
+    _vuelos.clear()
+    _vuelos_lock = threading.Lock()
+    _calentamiento_lock = threading.Lock()
+    if _calentamiento["estado"] != "listo":
+        # El thread que calentaba en el padre no existe en el hijo
+        _calentamiento["estado"] = "frio"
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
+
+
+@app.before_request
+def esperar_calentamiento_request():
+    if request.path not in RUTAS_SIN_ESPERA:
+        esperar_calentamiento()
+
+
+@app.route("/ready")
+def ready():
+    """
+    Endpoint:
+      GET /ready
+
+    Readiness para el balanceador: 200 cuando este proceso ya cargó índices
+    y cachés, 503 (con Retry-After) mientras calienta. /health solo dice que
+    el proceso responde. Si el proceso nunca empezó a calentar (p. ej.
+    python backend_dap.py), la primera consulta lo arranca.
+    """
+    iniciar_calentamiento()
+    estado = estado_calentamiento()
+    if estado["estado"] != "listo":
+        resp = jsonify(estado)
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "1"
+        return resp
+    return jsonify(estado), 200
 
 
 # ------------------------------
@@ -1320,6 +3904,36 @@ Responde a la pregunta usando ÚNICAMENTE lo que aparece en este contexto.
 # ------------------------------
 
 if __name__ == "__main__":
+    # python backend_dap.py --indexar  -> actualiza el índice semántico y sale
+    if "--indexar" in sys.argv[1:]:
+        print("✅ Índice semántico:", actualizar_indice_semantico())
+        sys.exit(0)
+
+    # python backend_dap.py --ingestar-items  -> parsea los _resumen.txt a la base de items
+    if "--ingestar-items" in sys.argv[1:]:
+        print("✅ Items normativos:", sincronizar_items(documentos_para_items(cargar_do_index())))
+        sys.exit(0)
+
+    # python backend_dap.py --verificar-intencion  -> preguntas de ejemplo contra el matcher
+    if "--verificar-intencion" in sys.argv[1:]:
+        fallas = verificar_intencion()
+        for falla in fallas:
+            print("❌", falla)
+        if fallas:
+            sys.exit(1)
+        print(f"✅ Intención: {len(EJEMPLOS_INTENCION)} ejemplos correctos")
+        sys.exit(0)
+
+    # python backend_dap.py --pregenerar 2026-01-01 2026-01-31  -> resúmenes del rango en un lote
+    if "--pregenerar" in sys.argv[1:]:
+        i = sys.argv.index("--pregenerar")
+        desde_arg = sys.argv[i + 1] if len(sys.argv) > i + 1 else None
+        hasta_arg = sys.argv[i + 2] if len(sys.argv) > i + 2 else desde_arg
+        if not desde_arg:
+            sys.exit("Uso: python backend_dap.py --pregenerar DESDE [HASTA]  (YYYY-MM-DD)")
+        print("✅ Pregeneración:", pregenerar_resumenes(desde_arg, hasta_arg))
+        sys.exit(0)
+
     port = int(os.getenv("PORT", 5000))
     debug = os.getenv("DEBUG", "true").lower() == "true"
     app.run(host="0.0.0.0", port=port, debug=debug)
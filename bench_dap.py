@@ -0,0 +1,453 @@
+"""
+Benchmarks de los caminos calientes de backend_dap con datos sintéticos.
+
+- Genera noticias_dap.csv, do_index.csv, los _resumen.txt y, para el día
+  que se mide, textos y PDFs de relleno, a la escala pedida.
+- Corre cada escala en un proceso aparte (backend_dap lee sus rutas al
+  importarse) con el proveedor falso de llm_utils (LLM_PROVEEDOR=falso).
+- Mide los loaders (en frío y en caliente), construir_contexto_* y todos los
+  endpoints GET de la app a través del test client de Flask.
+- Guarda los resultados en JSON y los compara con una corrida anterior para
+  detectar regresiones.
+- Con --imports mide con python -X importtime cuánto tarda en importarse
+  cada punto de entrada (servidor y worker) y falla si se pasa del
+  presupuesto o si arrastra módulos pesados (pandas, openai...).
+
+Escalas (titulares / documentos):
+  chica 1k / 50 · mediana 10k / 500 · grande 100k / 5k · enorme 1M / 50k
+
+Uso:
+  python bench_dap.py --escalas chica,mediana --json bench_base.json
+  python bench_dap.py --escalas chica,mediana --comparar bench_base.json
+  python bench_dap.py --imports
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ESCALAS = {
+    "chica": (1_000, 50),
+    "mediana": (10_000, 500),
+    "grande": (100_000, 5_000),
+    "enorme": (1_000_000, 50_000),
+}
+
+# Última fecha de los datos sintéticos; los días se cuentan hacia atrás.
+# Los CSV van en dd/mm/aaaa como los reales y la primera fila de cada uno es
+# de este día (> 12), para que pandas infiera el formato sin ambigüedad.
+FECHA_FINAL = date(2026, 2, 27)
+
+# Puntos de entrada cuyo import se mide con --imports, y el presupuesto (ms)
+# de cada uno sin contar el arranque del intérprete
+MODULOS_ARRANQUE = ["backend_dap", "asgi_dap", "google_news_worker_dap_sarampion"]
+PRESUPUESTO_IMPORT_MS = float(os.getenv("PRESUPUESTO_IMPORT_MS", "500"))
+
+# Módulos que ningún punto de entrada debe importar al arrancar
+MODULOS_PESADOS = ["pandas", "numpy", "openai", "feedparser", "requests", "pypdf", "tiktoken"]
+
+TEMAS = [
+    "industria_alimentaria", "cemento", "gas", "impuesto",
+    "casinos", "movilidad", "seguridad", "agenda nacional",
+]
+MEDIOS = [
+    "El Universal", "Milenio", "Reforma", "La Jornada", "Excélsior",
+    "El Financiero", "El Economista", "Proceso", "Expansión", "Infobae",
+]
+JURISDICCIONES = ["DOF", "SONORA", "VERACRUZ", "CDMX", "PUEBLA", "COAHUILA", "BAJA CALIFORNIA"]
+DEPENDENCIAS = [
+    "Secretaría de Economía", "Secretaría de Hacienda y Crédito Público",
+    "Secretaría de Energía", "Secretaría de Salud", "Comisión Reguladora de Energía",
+    "Secretaría de Movilidad", "Congreso del Estado", "Secretaría de Finanzas",
+]
+INSTRUMENTOS = ["decreto", "acuerdo", "aviso", "lineamientos", "norma oficial mexicana", "convocatoria"]
+PALABRAS = (
+    "precio tarifa reforma ley fiscal inversión planta producción exportación "
+    "importación padrón licitación regulación consumo subsidio permiso registro "
+    "empresa gobierno estatal federal municipal senado diputados iniciativa "
+    "sanción multa operativo transporte obra programa presupuesto"
+).split()
+
+
+# ------------------------------
+# 🏭 Datos sintéticos
+# ------------------------------
+
+def _frase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(PALABRAS) for _ in range(n))
+
+
+def generar_datos(directorio: str, titulares: int, documentos: int, semilla: int = 7) -> dict:
+    """
+    Escribe un juego de datos completo en 'directorio' y devuelve su
+    descripción (fecha del día medido, una jurisdicción y un id con PDF).
+
+    Las notas se repiten en 1 a 4 medios con variaciones, como en el CSV
+    real, para que el agrupamiento de casi duplicados tenga trabajo.
+    """
+    rng = random.Random(semilla)
+    dias = min(3650, max(30, titulares // 500))
+    fechas = [FECHA_FINAL - timedelta(days=i) for i in range(dias)]
+
+    with open(os.path.join(directorio, "noticias_dap.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["fecha", "titular", "termino", "enlace", "medio"])
+        n = 0
+        while n < titulares:
+            fecha = (rng.choice(fechas) if n else fechas[0]).strftime("%d/%m/%Y")
+            tema = rng.choice(TEMAS)
+            base = f"{tema.replace('_', ' ').capitalize()}: {_frase(rng, 9)}"
+            for medio in rng.sample(MEDIOS, rng.randint(1, 4)):
+                if n >= titulares:
+                    break
+                titular = base if rng.random() < 0.5 else f"{base} {rng.choice(PALABRAS)}"
+                w.writerow([fecha, titular, tema, f"https://noticias.example/{n}", medio])
+                n += 1
+
+    for jur in JURISDICCIONES:
+        os.makedirs(os.path.join(directorio, "do_resumenes", jur), exist_ok=True)
+    os.makedirs(os.path.join(directorio, "do_textos"), exist_ok=True)
+    os.makedirs(os.path.join(directorio, "pdfs"), exist_ok=True)
+
+    muestra = None
+    with open(os.path.join(directorio, "do_index.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "fecha", "jurisdiccion", "pdf_path", "text_path", "summary_path", "status", "created_at"])
+        for i in range(documentos):
+            # Los primeros documentos caen en FECHA_FINAL, así el día medido siempre tiene tomos
+            fecha = fechas[0] if i < len(JURISDICCIONES) * 2 else rng.choice(fechas)
+            jur = JURISDICCIONES[i % len(JURISDICCIONES)]
+            doc_id = f"{jur.replace(' ', '_')}_{fecha.isoformat()}-TOMO_{i}.pdf"
+            resumen_rel = os.path.join("do_resumenes", jur, doc_id.replace(".pdf", "_resumen.txt"))
+            texto_rel = ""
+
+            with open(os.path.join(directorio, resumen_rel), "w", encoding="utf-8") as r:
+                for _ in range(rng.randint(4, 12)):
+                    r.write(
+                        f"- La {rng.choice(DEPENDENCIAS)} publica el {rng.choice(INSTRUMENTOS)} "
+                        f"por el que se {_frase(rng, 14)}.\n"
+                    )
+
+            if fecha == fechas[0]:
+                # Texto (3 páginas) y PDF de relleno solo para el día que se mide
+                texto_rel = os.path.join("do_textos", doc_id.replace(".pdf", ".txt"))
+                with open(os.path.join(directorio, texto_rel), "w", encoding="utf-8") as t:
+                    t.write("\f".join("\n".join(_frase(rng, 12) for _ in range(60)) for _ in range(3)))
+                with open(os.path.join(directorio, "pdfs", doc_id), "wb") as p:
+                    p.write(b"%PDF-1.4\n" + os.urandom(256 * 1024) + b"\n%%EOF\n")
+                muestra = muestra or {"id": doc_id, "jurisdiccion": jur}
+
+            w.writerow([
+                doc_id, fecha.strftime("%d/%m/%Y"), jur, "pdfs" if texto_rel else "",
+                texto_rel, resumen_rel, "summary_ready", fecha.strftime("%d/%m/%Y"),
+            ])
+
+    return {"fecha": FECHA_FINAL.isoformat(), "dias": dias, **(muestra or {})}
+
+
+def preparar_datos(raiz: str, escala: str, semilla: int) -> tuple[str, dict]:
+    """
+    Genera los datos de una escala en raiz/escala, o reutiliza los de una
+    corrida anterior con la misma semilla.
+    """
+    titulares, documentos = ESCALAS[escala]
+    directorio = os.path.join(raiz, f"{escala}_{semilla}")
+    marca = os.path.join(directorio, "bench_datos.json")
+    if os.path.exists(marca):
+        with open(marca, encoding="utf-8") as f:
+            return directorio, json.load(f)
+
+    os.makedirs(directorio, exist_ok=True)
+    t0 = time.perf_counter()
+    print(f"🏭 Generando {escala}: {titulares:,} titulares, {documentos:,} documentos…")
+    info = generar_datos(directorio, titulares, documentos, semilla)
+    print(f"   listo en {time.perf_counter() - t0:.1f}s ({info['dias']} días)")
+    with open(marca, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    return directorio, info
+
+
+# ------------------------------
+# ⏱️ Medición (proceso hijo)
+# ------------------------------
+
+def medir(fn, repeticiones: int, antes=None) -> dict:
+    """
+    Primera llamada (fría) aparte; de las siguientes, mediana y mínimo.
+    'antes' corre antes de cada llamada sin contar en el tiempo.
+    """
+    tiempos = []
+    for _ in range(repeticiones + 1):
+        if antes:
+            antes()
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return {
+        "primera_ms": tiempos[0] * 1000,
+        "mediana_ms": statistics.median(tiempos[1:]) * 1000,
+        "min_ms": min(tiempos[1:]) * 1000,
+    }
+
+
+def consultas_get(info: dict) -> dict:
+    """
+    Query string con la que se llama cada endpoint GET; las reglas que no
+    están aquí se llaman sin parámetros (y así un endpoint nuevo aparece en
+    la tabla aunque nadie lo haya agregado).
+    """
+    fecha, jur, doc_id = info["fecha"], info.get("jurisdiccion", "DOF"), info.get("id", "")
+    desde = (date.fromisoformat(fecha) - timedelta(days=6)).isoformat()
+    return {
+        "/resumen_noticias": [f"fecha={fecha}", f"desde={desde}&hasta={fecha}"],
+        "/clusters_noticias": [f"fecha={fecha}"],
+        "/resumen_diarios": [f"fecha={fecha}", f"fecha={fecha}&jurisdiccion={jur}"],
+        "/do_jurisdicciones": [f"fecha={fecha}"],
+        "/jurisdicciones_disponibles": [f"fecha={fecha}"],
+        "/do_pdfs": [f"fecha={fecha}&jurisdiccion={jur}"],
+        "/descargar_pdf": [f"id={doc_id}"],
+        "/descargar_pdfs_zip": [f"fecha={fecha}&jurisdiccion={jur}"],
+        "/do_texto": [f"id={doc_id}&seccion=1"],
+    }
+
+
+def correr_hijo(directorio: str, info: dict, repeticiones: int, salida: str) -> None:
+    """
+    Corre dentro del proceso hijo: importa backend_dap apuntando a los datos
+    sintéticos y escribe los resultados en 'salida' (JSON).
+    """
+    sys.path.insert(0, BASE_DIR)
+    import backend_dap as dap
+
+    resultados = {}
+    fecha = info["fecha"]
+
+    def en_frio_noticias():
+        dap._noticias_cache["firma"] = None
+
+    def en_frio_do_index():
+        dap._do_index_cache["firma"] = None
+
+    resultados["cargar_noticias_dap (frío)"] = medir(dap.cargar_noticias_dap, repeticiones, en_frio_noticias)
+    resultados["cargar_noticias_dap_por_fecha"] = medir(lambda: dap.cargar_noticias_dap_por_fecha(fecha), repeticiones)
+    resultados["cargar_do_index (frío)"] = medir(dap.cargar_do_index, repeticiones, en_frio_do_index)
+    resultados["cargar_diarios_por_fecha"] = medir(lambda: dap.cargar_diarios_por_fecha(fecha), repeticiones)
+
+    noticias_dia = dap.cargar_noticias_dap_por_fecha(fecha)
+    df_dia = dap.cargar_diarios_por_fecha(fecha)
+    resultados["agrupar_noticias"] = medir(lambda: dap.agrupar_noticias(noticias_dia), repeticiones)
+    resultados["construir_contexto_por_tema"] = medir(
+        lambda: dap.construir_contexto_por_tema(noticias_dia), repeticiones
+    )
+    resultados["construir_contexto_diarios_por_jurisdiccion"] = medir(
+        lambda: dap.construir_contexto_diarios_por_jurisdiccion(df_dia), repeticiones
+    )
+
+    c = dap.app.test_client()
+    consultas = consultas_get(info)
+    reglas = sorted(
+        r.rule for r in dap.app.url_map.iter_rules()
+        if "GET" in r.methods and "<" not in r.rule
+    )
+    for regla in reglas:
+        for query in consultas.get(regla, [""]):
+            url = f"{regla}?{query}" if query else regla
+            estados = set()
+
+            def pedir():
+                r = c.get(url)
+                r.get_data()
+                estados.add(r.status_code)
+                r.close()
+
+            medida = medir(pedir, repeticiones)
+            medida["status"] = sorted(estados)
+            resultados[f"GET {url}"] = medida
+
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False)
+
+
+# ------------------------------
+# 🏁 Corrida
+# ------------------------------
+
+def correr_escala(escala: str, directorio: str, info: dict, repeticiones: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="dap_bench_") as tmp:
+        salida = os.path.join(tmp, "resultados.json")
+        env = dict(os.environ)
+        # Modelo falso de llm_utils: sin red, determinista y sin latencia
+        env["LLM_PROVEEDOR"] = "falso"
+        env["LLM_FALSO_LATENCIA"] = "0"
+        env["DO_INDEX_CSV"] = os.path.join(directorio, "do_index.csv")
+        env["NOTICIAS_DAP_CSV"] = os.path.join(directorio, "noticias_dap.csv")
+        env["RESUMENES_CACHE_DIR"] = os.path.join(tmp, "cache_resumenes")
+        env["INDICE_SEMANTICO_DIR"] = os.path.join(tmp, "indice_semantico")
+        env["USO_DB"] = os.path.join(tmp, "uso_llm.sqlite3")
+        env["DEBUG"] = "false"
+
+        comando = [
+            sys.executable, os.path.abspath(__file__), "--_hijo", directorio,
+            "--_info", json.dumps(info), "--_salida", salida, "--repeticiones", str(repeticiones),
+        ]
+        proc = subprocess.run(comando, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+        if proc.returncode != 0 or not os.path.exists(salida):
+            raise RuntimeError(f"Falló el benchmark de la escala {escala} (código {proc.returncode})")
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def imprimir(escala: str, resultados: dict, base: dict | None, tolerancia: float) -> list[str]:
+    """
+    Tabla de una escala; con 'base', la razón contra la corrida anterior.
+    Devuelve las mediciones que empeoraron más allá de la tolerancia.
+    """
+    regresiones = []
+    titulares, documentos = ESCALAS[escala]
+    print()
+    print(f"📊 {escala} ({titulares:,} titulares, {documentos:,} documentos)")
+    print(f"{'medición':<64} {'1ª ms':>9} {'mediana':>9} {'mín':>9} {'vs base':>8}")
+    for nombre, m in resultados.items():
+        comparacion = ""
+        anterior = (base or {}).get(nombre)
+        if anterior and anterior["mediana_ms"] > 0:
+            razon = m["mediana_ms"] / anterior["mediana_ms"]
+            comparacion = f"{razon:.2f}x"
+            # Debajo de 1 ms el ruido domina; no se cuenta como regresión
+            if razon > tolerancia and m["mediana_ms"] >= 1:
+                comparacion += " ⚠️"
+                regresiones.append(f"{escala} · {nombre}: {razon:.2f}x")
+        estado = "" if m.get("status", [200]) in ([200], [206], [304]) else f" {m['status']}"
+        print(
+            f"{(nombre + estado)[:64]:<64} {m['primera_ms']:>9.1f} "
+            f"{m['mediana_ms']:>9.2f} {m['min_ms']:>9.2f} {comparacion:>8}"
+        )
+    return regresiones
+
+
+def medir_import(modulo: str, repeticiones: int) -> dict:
+    """
+    Importa el módulo en un proceso nuevo con -X importtime (sin
+    OPENAI_API_KEY, como un contenedor recién levantado) y devuelve el
+    tiempo acumulado (el mínimo de las repeticiones), los 5 imports propios
+    más caros y los módulos pesados que quedaron cargados.
+    """
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    codigo = (
+        f"import json, sys, {modulo}; "
+        f"print(json.dumps([m for m in {MODULOS_PESADOS!r} if m in sys.modules]))"
+    )
+    tiempos, pesados, caros = [], [], []
+    for _ in range(repeticiones):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", codigo],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {modulo}:\n{proc.stderr[-2000:]}")
+
+        filas = []
+        for linea in proc.stderr.splitlines():
+            if not linea.startswith("import time:") or "self [us]" in linea:
+                continue
+            propio, acumulado, nombre = linea[len("import time:"):].split("|")
+            filas.append((int(propio), int(acumulado), nombre.strip()))
+        total = next(acum for _, acum, nombre in filas if nombre == modulo)
+        if not tiempos or total < min(tiempos):
+            caros = sorted(filas, reverse=True)[:5]
+        tiempos.append(total)
+        pesados = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    return {
+        "ms": min(tiempos) / 1000,
+        "pesados": pesados,
+        "caros": [(nombre, propio / 1000) for propio, _, nombre in caros],
+    }
+
+
+def revisar_imports(presupuesto_ms: float, repeticiones: int) -> list[str]:
+    fallas = []
+    print(f"{'módulo':<36} {'import ms':>10}  más caros (ms propios)")
+    for modulo in MODULOS_ARRANQUE:
+        r = medir_import(modulo, repeticiones)
+        caros = ", ".join(f"{n} {ms:.0f}" for n, ms in r["caros"][:3])
+        print(f"{modulo:<36} {r['ms']:>10.1f}  {caros}")
+        if r["ms"] > presupuesto_ms:
+            fallas.append(f"{modulo}: {r['ms']:.0f} ms > {presupuesto_ms:.0f} ms")
+        if r["pesados"]:
+            fallas.append(f"{modulo} importa al arrancar: {', '.join(r['pesados'])}")
+    return fallas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", default="chica,mediana", help=f"lista de {', '.join(ESCALAS)}")
+    parser.add_argument("--repeticiones", type=int, default=5, help="llamadas en caliente por medición")
+    parser.add_argument("--datos", default=os.path.join(tempfile.gettempdir(), "dap_bench_datos"),
+                        help="dónde generar (y reutilizar) los datos sintéticos")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--comparar", help="resultados de una corrida anterior (--json)")
+    parser.add_argument("--tolerancia", type=float, default=1.25,
+                        help="razón mediana/base a partir de la cual se reporta regresión")
+    parser.add_argument("--imports", action="store_true",
+                        help="solo medir el tiempo de import de los puntos de entrada")
+    parser.add_argument("--presupuesto-import", type=float, default=PRESUPUESTO_IMPORT_MS,
+                        help="ms máximos de import por punto de entrada (con --imports)")
+    parser.add_argument("--_hijo", help=argparse.SUPPRESS)
+    parser.add_argument("--_info", help=argparse.SUPPRESS)
+    parser.add_argument("--_salida", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._hijo:
+        correr_hijo(args._hijo, json.loads(args._info), args.repeticiones, args._salida)
+        return
+
+    if args.imports:
+        fallas = revisar_imports(args.presupuesto_import, args.repeticiones)
+        if fallas:
+            print(f"\n⚠️ {len(fallas)} puntos de entrada fuera de presupuesto:")
+            for f in fallas:
+                print(f"  - {f}")
+            sys.exit(1)
+        print(f"\n✅ Todos los imports bajo {args.presupuesto_import:.0f} ms y sin módulos pesados")
+        return
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    todos = {}
+    regresiones = []
+    for escala in [e.strip() for e in args.escalas.split(",") if e.strip()]:
+        if escala not in ESCALAS:
+            parser.error(f"Escala desconocida: {escala}")
+        directorio, info = preparar_datos(args.datos, escala, args.semilla)
+        print(f"🚀 Midiendo {escala}…")
+        todos[escala] = correr_escala(escala, directorio, info, args.repeticiones)
+        regresiones += imprimir(escala, todos[escala], (base or {}).get(escala), args.tolerancia)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(todos, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados en {args.json}")
+
+    if regresiones:
+        print(f"\n⚠️ {len(regresiones)} mediciones más lentas que la base (>{args.tolerancia}x):")
+        for r in regresiones:
+            print(f"  - {r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+from perezoso_utils import importar_perezoso
+
+# numpy solo hace falta para MinHash: se importa al primer uso
+np = importar_perezoso("numpy")
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+# Tokens de contexto que se gastan por llamada, según el modelo. Se puede
+# sobreescribir con PRESUPUESTO_TOKENS='{"gpt-4o-mini": 8000, ...}'
+PRESUPUESTO_TOKENS = {
+    "gpt-4o-mini": 6000,
+    "gpt-4o": 6000,
+    "gpt-4.1-mini": 6000,
+    "gpt-4.1": 6000,
+}
+PRESUPUESTO_TOKENS.update(json.loads(os.getenv("PRESUPUESTO_TOKENS", "{}")))
+
+# Presupuesto para modelos que no están en la tabla
+PRESUPUESTO_TOKENS_DEFAULT = int(os.getenv("CONTEXTO_MAX_TOKENS", "6000"))
+
+# Dos líneas cuyo SimHash difiere en a lo más estos bits se consideran la misma
+DEDUP_HAMMING = int(os.getenv("DEDUP_HAMMING", "3"))
+
+# Jaccard mínimo (sobre palabras de los titulares) para agrupar dos titulares
+# como la misma nota contada por distintos medios
+CLUSTER_JACCARD = float(os.getenv("CLUSTER_JACCARD", "0.4"))
+
+# MinHash: permutaciones = bandas x filas. Con 32 x 3, dos titulares con
+# Jaccard 0.4 quedan como candidatos ~88% de las veces (0.5: ~98%)
+MINHASH_BANDAS = 32
+MINHASH_FILAS = 3
+
+PALABRAS_VACIAS = {
+    "a", "al", "ante", "con", "como", "de", "del", "desde", "e", "el", "en",
+    "entre", "es", "esta", "este", "la", "las", "lo", "los", "mas", "o",
+    "para", "pero", "por", "que", "se", "sin", "sobre", "su", "sus", "tras",
+    "un", "una", "y",
+}
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def normalizar(texto) -> str:
+    """
+    Minúsculas, sin espacios en los extremos y sin acentos (NFKD).
+    """
+    if not isinstance(texto, str):
+        return ""
+    texto = texto.lower().strip()
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def presupuesto_tokens(modelo: str) -> int:
+    return int(PRESUPUESTO_TOKENS.get(modelo, PRESUPUESTO_TOKENS_DEFAULT))
+
+
+@lru_cache(maxsize=None)
+def _codificador(modelo: str | None):
+    # tiktoken (tokenizador local) se importa al primer conteo: tarda ~0.2 s
+    # y el arranque no lo necesita. Sin él se estima con caracteres / 4.
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        nombre = tiktoken.encoding_name_for_model(modelo or "")
+    except KeyError:
+        nombre = "o200k_base"
+    try:
+        return tiktoken.get_encoding(nombre)
+    except Exception as e:
+        # p. ej. sin red para bajar el vocabulario la primera vez
+        print("⚠️ tiktoken no disponible, se estiman tokens por caracteres:", repr(e))
+        return None
+
+
+def contar_tokens(texto: str, modelo: str | None = None) -> int:
+    enc = _codificador(modelo)
+    if enc is None:
+        return math.ceil(len(texto) / 4)
+    return len(enc.encode(texto, disallowed_special=()))
+
+
+# ------------------------------
+# 🧬 SimHash (casi duplicados)
+# ------------------------------
+
+def _rasgos(texto: str) -> list[str]:
+    palabras = re.findall(r"\w+", normalizar(texto))
+    return palabras + [f"{a} {b}" for a, b in zip(palabras, palabras[1:])]
+
+
+def simhash(texto: str) -> int:
+    """
+    SimHash de 64 bits sobre palabras y bigramas del texto normalizado:
+    textos casi iguales dan hashes a pocos bits de distancia.
+    """
+    pesos = [0] * 64
+    for rasgo in _rasgos(texto):
+        h = int.from_bytes(hashlib.blake2b(rasgo.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            pesos[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if pesos[bit] > 0)
+
+
+class IndiceSimHash:
+    """
+    Conjunto de SimHash con búsqueda de vecinos a <= umbral bits.
+
+    Los 64 bits se parten en umbral + 1 bandas: si dos hashes difieren en a
+    lo más umbral bits, coinciden por completo en al menos una banda, así que
+    solo se comparan los que comparten alguna.
+    """
+
+    def __init__(self, umbral: int = DEDUP_HAMMING):
+        self.umbral = umbral
+        ancho = math.ceil(64 / (umbral + 1))
+        self._bandas = [(i, min(ancho, 64 - i)) for i in range(0, 64, ancho)]
+        self._tablas = [{} for _ in self._bandas]
+
+    def _llaves(self, h: int):
+        for (inicio, largo), tabla in zip(self._bandas, self._tablas):
+            yield tabla, (h >> inicio) & ((1 << largo) - 1)
+
+    def buscar(self, h: int):
+        """
+        Devuelve el valor asociado a un hash parecido ya agregado, o None.
+        """
+        for tabla, llave in self._llaves(h):
+            for otro, valor in tabla.get(llave, ()):
+                if bin(h ^ otro).count("1") <= self.umbral:
+                    return valor
+        return None
+
+    def agregar(self, h: int, valor=True) -> None:
+        for tabla, llave in self._llaves(h):
+            tabla.setdefault(llave, []).append((h, valor))
+
+
+# ------------------------------
+# 📦 Empaquetado por presupuesto de tokens
+# ------------------------------
+
+def empacar_bloques(
+    bloques: list,
+    presupuesto: int,
+    modelo: str | None = None,
+    clave=None,
+) -> list[tuple]:
+    """
+    Llena un presupuesto de tokens con líneas de contexto, por prioridad.
+
+    - bloques: [(encabezado o None, [linea, ...]), ...] ya en orden de
+      prioridad (bloques y líneas dentro de cada bloque).
+    - clave: función linea -> texto con el que se detectan casi duplicados
+      (por defecto la línea misma); si devuelve "" o None, la línea no se
+      deduplica (p. ej. encabezados de tema dentro de un resumen).
+
+    Las líneas que no caben se saltan y se sigue con las siguientes, por si
+    alguna más corta cabe todavía. Las casi duplicadas de una ya elegida se
+    descartan. Un encabezado solo gasta tokens si su bloque aporta alguna línea.
+
+    Devuelve [(índice del bloque, [índices de las líneas elegidas]), ...]
+    sin los bloques que quedaron vacíos.
+    """
+    restante = presupuesto
+    vistos = IndiceSimHash()
+    salida = []
+
+    for n, (encabezado, lineas) in enumerate(bloques):
+        costo_encabezado = contar_tokens(encabezado, modelo) + 1 if encabezado else 0
+        elegidas = []
+
+        for i, linea in enumerate(lineas):
+            if not linea or not linea.strip():
+                continue
+
+            texto_clave = clave(linea) if clave else linea
+            h = simhash(texto_clave) if texto_clave else None
+            if h is not None and vistos.buscar(h) is not None:
+                continue
+
+            costo = contar_tokens(linea, modelo) + 1
+            if not elegidas:
+                costo += costo_encabezado
+            if costo > restante:
+                continue
+
+            restante -= costo
+            elegidas.append(i)
+            if h is not None:
+                vistos.agregar(h)
+
+        if elegidas:
+            salida.append((n, elegidas))
+
+    return salida
+
+
+def empacar_lineas(lineas: list, presupuesto: int, modelo: str | None = None, clave=None) -> list[int]:
+    """
+    empacar_bloques para una sola lista de líneas; devuelve los índices elegidos.
+    """
+    empacado = empacar_bloques([(None, lineas)], presupuesto, modelo, clave)
+    return empacado[0][1] if empacado else []
+
+
+# ------------------------------
+# 🗞️ MinHash (misma nota en varios medios)
+# ------------------------------
+
+_PRIMO = (1 << 31) - 1
+
+
+@lru_cache(maxsize=1)
+def _coeficientes_minhash() -> tuple:
+    # Semilla fija: las firmas son las mismas en todos los procesos
+    rng = np.random.default_rng(20260201)
+    a = rng.integers(1, _PRIMO, MINHASH_BANDAS * MINHASH_FILAS, dtype=np.uint64)
+    b = rng.integers(0, _PRIMO, MINHASH_BANDAS * MINHASH_FILAS, dtype=np.uint64)
+    return a, b
+
+
+def palabras_titular(texto: str) -> frozenset:
+    """
+    Conjunto de palabras de un titular: normalizado, sin palabras vacías y
+    recortado a 5 letras ("mueren"/"muere", "funcionarios"/"funcionario").
+    """
+    return frozenset(
+        p[:5] for p in re.findall(r"\w+", normalizar(texto))
+        if p not in PALABRAS_VACIAS and len(p) > 1
+    )
+
+
+def minhash(palabras: frozenset) -> np.ndarray:
+    if not palabras:
+        return np.full(MINHASH_BANDAS * MINHASH_FILAS, _PRIMO, dtype=np.uint64)
+    h = np.array(
+        [int.from_bytes(hashlib.blake2b(p.encode("utf-8"), digest_size=4).digest(), "big") & _PRIMO
+         for p in palabras],
+        dtype=np.uint64,
+    )
+    # (a * h + b) mod p para cada permutación; todo cabe en 62 bits
+    a, b = _coeficientes_minhash()
+    return ((a[:, None] * h[None, :] + b[:, None]) % _PRIMO).min(axis=1)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def agrupar_casi_duplicados(
+    textos: list[str], umbral: float = CLUSTER_JACCARD, ignorar: str = ""
+) -> list[list[int]]:
+    """
+    Agrupa textos casi iguales (p. ej. la misma nota en distintos medios).
+    Las palabras de 'ignorar' (p. ej. el tema, que comparten todos los
+    titulares del grupo) no cuentan para la similitud.
+
+    MinHash + LSH por bandas propone pares candidatos sin comparar todos
+    contra todos; cada candidato se confirma con el Jaccard exacto y los
+    grupos se cierran por transitividad (union-find).
+
+    Devuelve listas de índices; cada grupo en orden de aparición y los grupos
+    ordenados por su primer elemento.
+    """
+    comunes = palabras_titular(ignorar)
+    conjuntos = [palabras_titular(t) - comunes for t in textos]
+    padre = list(range(len(textos)))
+
+    def raiz(i):
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    cubetas = {}
+    for i, conjunto in enumerate(conjuntos):
+        if not conjunto:
+            continue
+        firma = minhash(conjunto)
+        for banda in range(MINHASH_BANDAS):
+            llave = (banda, firma[banda * MINHASH_FILAS:(banda + 1) * MINHASH_FILAS].tobytes())
+            cubetas.setdefault(llave, []).append(i)
+
+    revisados = set()
+    for miembros in cubetas.values():
+        for x, i in enumerate(miembros):
+            for j in miembros[x + 1:]:
+                if (i, j) in revisados:
+                    continue
+                revisados.add((i, j))
+                ri, rj = raiz(i), raiz(j)
+                if ri != rj and jaccard(conjuntos[i], conjuntos[j]) >= umbral:
+                    padre[max(ri, rj)] = min(ri, rj)
+
+    grupos = {}
+    for i in range(len(textos)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return sorted(grupos.values(), key=lambda g: g[0])
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+DO_INDEX_CSV = os.getenv("DO_INDEX_CSV", "do_index.csv")
+
+# Directorio base del proyecto (usado para armar rutas absolutas)
+BASE_DIR = os.path.dirname(os.path.abspath(DO_INDEX_CSV))
+
+# Carpeta raíz de los textos extraídos (do_textos/<JURISDICCION>/<id>.txt)
+DO_TEXTOS_DIR = os.getenv("DO_TEXTOS_DIR", os.path.join(BASE_DIR, "do_textos"))
+
+# Caché de texto por página, direccionada por hash del contenido de la página
+DO_TEXTOS_CACHE_DIR = os.getenv(
+    "DO_TEXTOS_CACHE_DIR", os.path.join(DO_TEXTOS_DIR, ".cache_paginas")
+)
+
+# Separador entre páginas en el .txt final (salto de página, como pdftotext)
+SEPARADOR_PAGINAS = "\f"
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def resolver_ruta(ruta_rel: str) -> str:
+    """
+    Convierte una ruta tal como viene en do_index.csv (posiblemente con
+    separadores de Windows y relativa al proyecto) en una ruta absoluta.
+    """
+    ruta = str(ruta_rel or "").strip().replace("\\", os.sep)
+    if not ruta:
+        return ""
+    if not os.path.isabs(ruta):
+        ruta = os.path.join(BASE_DIR, ruta)
+    return os.path.normpath(ruta)
+
+
+def hash_pagina(page) -> str:
+    """
+    Hash estable de una página del PDF.
+
+    Se calcula sobre el content stream de la página; se añaden los nombres de
+    las fuentes que usa (el mismo stream con otra fuente puede extraer otro
+    texto) y la versión del extractor, para invalidar la caché si cambia pypdf.
+    """
+    from pypdf import __version__ as pypdf_version
+
+    h = hashlib.sha256()
+    h.update(f"pypdf-{pypdf_version}\n".encode("utf-8"))
+
+    contenido = page.get_contents()
+    if contenido is not None:
+        h.update(contenido.get_data())
+
+    try:
+        fuentes = page.get("/Resources", {}).get_object().get("/Font", {}).get_object()
+        nombres = sorted(
+            str(f.get_object().get("/BaseFont", "")) for f in fuentes.values()
+        )
+        h.update("\n".join(nombres).encode("utf-8"))
+    except Exception:
+        pass
+
+    return h.hexdigest()
+
+
+def _ruta_cache_pagina(h: str) -> str:
+    return os.path.join(DO_TEXTOS_CACHE_DIR, h[:2], f"{h}.txt")
+
+
+def leer_pagina_cacheada(h: str) -> str | None:
+    ruta = _ruta_cache_pagina(h)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def guardar_pagina_cacheada(h: str, texto: str) -> None:
+    ruta = _ruta_cache_pagina(h)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Escritura atómica: otro proceso nunca ve una página a medio escribir
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+
+def extraer_texto_pdf(ruta_pdf: str) -> tuple[str, dict]:
+    """
+    Extrae el texto de un PDF página por página, reutilizando la caché
+    para las páginas cuyo contenido ya se había extraído antes (anexos
+    republicados, páginas de machote, PDFs corregidos y re-descargados).
+
+    Devuelve (texto, stats) con stats = {"paginas", "cacheadas", "extraidas"}.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(ruta_pdf)
+
+    paginas = []
+    stats = {"paginas": 0, "cacheadas": 0, "extraidas": 0}
+
+    for page in reader.pages:
+        stats["paginas"] += 1
+        h = hash_pagina(page)
+
+        texto = leer_pagina_cacheada(h)
+        if texto is None:
+            texto = page.extract_text() or ""
+            guardar_pagina_cacheada(h, texto)
+            stats["extraidas"] += 1
+        else:
+            stats["cacheadas"] += 1
+
+        paginas.append(texto)
+
+    return SEPARADOR_PAGINAS.join(paginas), stats
+
+
+def extraer_textos_index(ids: list[str] | None = None, forzar: bool = False) -> dict:
+    """
+    Recorre do_index.csv y genera do_textos para cada PDF.
+
+    - Si se pasan ids, solo procesa esos documentos (siempre, aunque el .txt exista).
+    - Si no, procesa los documentos sin .txt o cuyo PDF es más nuevo que el .txt.
+    """
+    if not os.path.exists(DO_INDEX_CSV):
+        raise FileNotFoundError(f"No se encontró el archivo {DO_INDEX_CSV}")
+
+    import pandas as pd  # Solo la extracción lo usa; el servidor no paga el import
+
+    df = pd.read_csv(DO_INDEX_CSV, dtype=str, keep_default_na=False)
+
+    totales = {"documentos": 0, "paginas": 0, "cacheadas": 0, "extraidas": 0}
+
+    for _, row in df.iterrows():
+        doc_id = str(row.get("id", "")).strip()
+        if not doc_id:
+            continue
+        if ids and doc_id not in ids:
+            continue
+
+        ruta_pdf = os.path.join(resolver_ruta(row.get("pdf_path", "")), doc_id)
+        if not os.path.exists(ruta_pdf):
+            print(f"⚠️ No se encontró el PDF: {ruta_pdf}")
+            continue
+
+        ruta_txt = resolver_ruta(row.get("text_path", ""))
+        if not ruta_txt:
+            jurisdiccion = str(row.get("jurisdiccion", "")).strip().upper()
+            ruta_txt = os.path.join(
+                DO_TEXTOS_DIR, jurisdiccion, os.path.splitext(doc_id)[0] + ".txt"
+            )
+
+        pendiente = (
+            forzar
+            or bool(ids)
+            or not os.path.exists(ruta_txt)
+            or os.path.getmtime(ruta_pdf) > os.path.getmtime(ruta_txt)
+        )
+        if not pendiente:
+            continue
+
+        try:
+            texto, stats = extraer_texto_pdf(ruta_pdf)
+        except Exception as e:
+            print(f"❌ Error al extraer {ruta_pdf}: {e}")
+            continue
+
+        os.makedirs(os.path.dirname(ruta_txt), exist_ok=True)
+        with open(ruta_txt, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+        print(
+            f"📄 {doc_id}: {stats['paginas']} páginas "
+            f"({stats['cacheadas']} de caché, {stats['extraidas']} extraídas)"
+        )
+
+        totales["documentos"] += 1
+        for k in ("paginas", "cacheadas", "extraidas"):
+            totales[k] += stats[k]
+
+    return totales
+
+
+# ------------------------------
+# 🗂️ Índice de offsets + lectura con mmap
+# ------------------------------
+
+# Sufijo del índice sidecar: X.txt -> X.txt.idx.json
+SUFIJO_INDICE = ".idx.json"
+
+# Índices ya cargados en este proceso: ruta -> (mtime_ns, size, indice)
+_indices_offsets = {}
+
+
+def construir_indice_offsets(ruta_txt: str) -> dict:
+    """
+    Recorre el archivo una sola vez (vía mmap) y calcula:
+      - "lineas": offset en bytes del inicio de cada línea
+      - "secciones": offset en bytes del inicio de cada página
+        (texto separado por SEPARADOR_PAGINAS; si no hay, una sola sección)
+    """
+    st = os.stat(ruta_txt)
+    lineas = [0]
+    secciones = [0]
+
+    if st.st_size > 0:
+        with open(ruta_txt, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lineas.extend(m.end() for m in re.finditer(b"\n", mm) if m.end() < st.st_size)
+            sep = SEPARADOR_PAGINAS.encode("utf-8")
+            secciones.extend(m.end() for m in re.finditer(re.escape(sep), mm))
+
+    return {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "lineas": lineas,
+        "secciones": secciones,
+    }
+
+
+def cargar_indice_offsets(ruta_txt: str) -> dict:
+    """
+    Devuelve el índice de offsets de un texto. Se construye una sola vez y se
+    guarda junto al archivo (X.txt.idx.json); se regenera si el .txt cambia.
+    """
+    st = os.stat(ruta_txt)
+    en_memoria = _indices_offsets.get(ruta_txt)
+    if en_memoria and en_memoria[0] == st.st_mtime_ns and en_memoria[1] == st.st_size:
+        return en_memoria[2]
+
+    ruta_idx = ruta_txt + SUFIJO_INDICE
+    indice = None
+    if os.path.exists(ruta_idx):
+        try:
+            with open(ruta_idx, "r", encoding="utf-8") as f:
+                indice = json.load(f)
+            if indice.get("mtime_ns") != st.st_mtime_ns or indice.get("size") != st.st_size:
+                indice = None
+        except Exception as e:
+            print(f"⚠️ Índice de offsets inválido {ruta_idx}: {e}")
+            indice = None
+
+    if indice is None:
+        indice = construir_indice_offsets(ruta_txt)
+        try:
+            tmp = f"{ruta_idx}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(indice, f)
+            os.replace(tmp, ruta_idx)
+        except OSError as e:
+            # Sin permisos de escritura: seguimos con el índice en memoria
+            print(f"⚠️ No se pudo guardar el índice {ruta_idx}: {e}")
+
+    _indices_offsets[ruta_txt] = (st.st_mtime_ns, st.st_size, indice)
+    return indice
+
+
+def leer_rango(ruta_txt: str, inicio: int, fin: int | None = None) -> str:
+    """
+    Lee solo los bytes [inicio, fin) del archivo vía mmap, sin cargarlo completo.
+    """
+    size = os.path.getsize(ruta_txt)
+    fin = size if fin is None else min(fin, size)
+    inicio = max(0, inicio)
+    if inicio >= fin:
+        return ""
+
+    with open(ruta_txt, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[inicio:fin].decode("utf-8", errors="replace")
+
+
+def leer_lineas(ruta_txt: str, desde: int, hasta: int | None = None) -> str:
+    """
+    Devuelve las líneas [desde, hasta) (base 0) usando el índice de offsets.
+    Un rango vacío o al revés (hasta <= desde) devuelve "".
+    """
+    lineas = cargar_indice_offsets(ruta_txt)["lineas"]
+    desde = max(0, desde)
+    if desde >= len(lineas) or (hasta is not None and hasta <= desde):
+        return ""
+    inicio = lineas[desde]
+    fin = lineas[hasta] if hasta is not None and hasta < len(lineas) else None
+    return leer_rango(ruta_txt, inicio, fin)
+
+
+def leer_seccion(ruta_txt: str, n: int) -> str:
+    """
+    Devuelve la sección (página) n (base 0) del texto, sin el separador.
+    """
+    secciones = cargar_indice_offsets(ruta_txt)["secciones"]
+    if n < 0 or n >= len(secciones):
+        return ""
+    fin = secciones[n + 1] - len(SEPARADOR_PAGINAS.encode("utf-8")) if n + 1 < len(secciones) else None
+    return leer_rango(ruta_txt, secciones[n], fin)
+
+
+# ------------------------------
+# ▶️ Main
+# ------------------------------
+
+if __name__ == "__main__":
+    # Uso:
+    #   python do_textos_utils.py                 -> solo PDFs nuevos o modificados
+    #   python do_textos_utils.py --forzar        -> todos los PDFs del índice
+    #   python do_textos_utils.py ID.pdf [...]    -> solo esos documentos
+    args = sys.argv[1:]
+    forzar = "--forzar" in args
+    ids = [a for a in args if not a.startswith("--")]
+
+    totales = extraer_textos_index(ids=ids or None, forzar=forzar)
+    print(
+        f"✅ {totales['documentos']} documentos, {totales['paginas']} páginas: "
+        f"{totales['cacheadas']} de caché, {totales['extraidas']} extraídas"
+    )
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+
+from perezoso_utils import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+# Formatos de las columnas "fecha" de los CSV, en el orden en que se prueban.
+# do_index.csv y noticias_dap.csv traen 29/01/2026; el notebook escribe
+# 2026-01-29. Nunca se infiere por fila: 05/02/2026 es siempre 5 de febrero.
+FORMATOS_FECHA = tuple(
+    f.strip()
+    for f in os.getenv("FORMATOS_FECHA", "%d/%m/%Y|%Y-%m-%d|%Y-%m-%d %H:%M:%S").split("|")
+    if f.strip()
+)
+
+# Ordinal de las filas sin fecha reconocible (date.toordinal() empieza en 1)
+SIN_FECHA = 0
+
+# datetime64[D] cuenta días desde 1970-01-01; sumando esto queda date.toordinal()
+_ORDINAL_1970 = date(1970, 1, 1).toordinal()
+
+
+# ------------------------------
+# 📅 Fechas como ordinales
+# ------------------------------
+
+def ordinales_fecha(valores) -> np.ndarray:
+    """
+    Columna de fechas en texto -> arreglo int32 de ordinales (date.toordinal()),
+    con SIN_FECHA donde ningún formato de FORMATOS_FECHA aplica.
+
+    Se parsea cada valor distinto una sola vez (un CSV repite la misma fecha
+    en cientos de filas) y cada formato es una sola pasada vectorizada sobre
+    lo que los anteriores no pudieron leer. Comparar ordinales es comparar
+    enteros: filtrar por fecha o cortar un rango no crea objetos date.
+    """
+    codigos, unicos = pd.factorize(pd.Series(valores, dtype=object).astype(str).str.strip())
+    leidas = pd.Series(pd.NaT, index=range(len(unicos)), dtype="datetime64[ns]")
+    pendientes = np.ones(len(unicos), dtype=bool)
+    texto = pd.Series(unicos)
+    for formato in FORMATOS_FECHA:
+        if not pendientes.any():
+            break
+        intento = pd.to_datetime(texto[pendientes], format=formato, errors="coerce")
+        leidas[intento.index] = intento
+        pendientes = leidas.isna().to_numpy()
+
+    dias = leidas.to_numpy().astype("datetime64[D]").astype(np.int64) + _ORDINAL_1970
+    por_unico = np.where(pendientes, SIN_FECHA, dias).astype(np.int32)
+    # factorize marca los nulos con -1: el lugar extra del final es SIN_FECHA
+    return np.append(por_unico, np.int32(SIN_FECHA))[codigos]
+
+
+def fechas_de_ordinales(ordinales) -> list:
+    """
+    Ordinales -> lista de date (None en SIN_FECHA), creando un date por valor distinto.
+    """
+    ordinales = np.asarray(ordinales)
+    memo = {int(o): date.fromordinal(int(o)) if o != SIN_FECHA else None for o in np.unique(ordinales)}
+    return [memo[int(o)] for o in ordinales]
+
+
+def iso_de_ordinal(ordinal: int) -> str:
+    return date.fromordinal(int(ordinal)).isoformat()
@@ -1,6 +1,5 @@
 import os
 import time
-import feedparser
 from datetime import datetime, timezone
 from urllib.parse import urlparse
 from zoneinfo import ZoneInfo
@@ -111,6 +110,9 @@ def procesar_feed():
         print("❌ Falta TELEGRAM_BOT_TOKEN_DAP o TELEGRAM_CHAT_ID_DAP_SALUD.")
         return
 
+    # Se importa hasta que hay configuración completa (arranque rápido)
+    import feedparser
+
     print("🔎 Revisando RSS Google News: sarampión (edición MX)…")
     feed = feedparser.parse(RSS_URL)
 
@@ -0,0 +1,47 @@
+"""
+Configuración de gunicorn con arranque en caliente.
+
+  gunicorn -c gunicorn.conf.py backend_dap:app
+  gunicorn -c gunicorn.conf.py asgi_dap:app -k uvicorn.workers.UvicornWorker
+
+Con preload_app el master importa la app y corre backend_dap.calentar()
+antes de crear los workers: los índices de noticias y del normativo, el LRU
+de resúmenes y el índice semántico se cargan una vez y los workers los
+comparten copy-on-write, en lugar de que cada uno los lea al recibir su
+primer request. Cada worker crea su propio cliente de OpenAI al nacer
+(os.register_at_fork en backend_dap y asgi_dap).
+
+Sin preload (GUNICORN_PRELOAD=0) cada worker calienta en un thread al
+arrancar. En ambos casos GET /ready da 503 hasta que el worker está listo:
+úsalo como readiness probe del balanceador.
+
+Ojo: con preload, un cambio de código necesita reiniciar el master
+(kill -HUP ya no basta para recargarlo).
+"""
+import gc
+import os
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    # Corre en el master, ya con la app importada y antes del primer fork
+    if not preload_app:
+        return
+    import backend_dap
+
+    backend_dap.calentar()
+    # Saca lo ya cargado del alcance del recolector: si no, cada pasada del
+    # GC en un worker toca los objetos heredados y copia sus páginas
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Sin preload el worker acaba de importar la app; con preload ya está listo
+    import backend_dap
+
+    backend_dap.iniciar_calentamiento()
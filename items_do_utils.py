@@ -0,0 +1,384 @@
+import os
+import re
+import sqlite3
+import threading
+
+from contexto_utils import normalizar
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+DO_INDEX_CSV = os.getenv("DO_INDEX_CSV", "do_index.csv")
+
+# Directorio base del proyecto (usado para armar rutas absolutas)
+BASE_DIR = os.path.dirname(os.path.abspath(DO_INDEX_CSV))
+
+# Base SQLite con un renglón por bullet de los _resumen.txt
+ITEMS_DO_DB = os.getenv("ITEMS_DO_DB", os.path.join(BASE_DIR, "items_do.sqlite3"))
+
+# Máximo de items que devuelve una consulta
+ITEMS_DO_LIMITE = int(os.getenv("ITEMS_DO_LIMITE", "500"))
+
+# Tipo de instrumento: variante (sin acentos, minúsculas) -> nombre canónico.
+# Si un bullet menciona varios, gana el primero que aparece en el texto.
+INSTRUMENTOS = {
+    "norma oficial mexicana": "norma oficial mexicana",
+    "normas oficiales mexicanas": "norma oficial mexicana",
+    "reglas de operacion": "reglas de operación",
+    "fe de erratas": "fe de erratas",
+    "decreto": "decreto",
+    "decretos": "decreto",
+    "acuerdo": "acuerdo",
+    "acuerdos": "acuerdo",
+    "aviso": "aviso",
+    "avisos": "aviso",
+    "lineamientos": "lineamientos",
+    "reglamento": "reglamento",
+    "reglamentos": "reglamento",
+    "convocatoria": "convocatoria",
+    "convocatorias": "convocatoria",
+    "circular": "circular",
+    "resolucion": "resolución",
+    "resoluciones": "resolución",
+    "convenio": "convenio",
+    "convenios": "convenio",
+    "declaratoria": "declaratoria",
+    "edicto": "edicto",
+    "edictos": "edicto",
+    "iniciativa": "iniciativa",
+    "iniciativas": "iniciativa",
+    "licitacion": "licitación",
+    "manual": "manual",
+    "programa": "programa",
+    "programas": "programa",
+    "ley": "ley",
+}
+
+# Palabra con la que empieza el nombre de una dependencia o autoridad emisora.
+# El nombre sigue mientras vengan palabras con mayúscula o conectores seguidos
+# de una (Secretaría de Hacienda y Crédito Público, Congreso del Estado de Sonora).
+# "Sistema" va solo con su nombre completo: suelto atrapa "Sistema de Datos
+# Personales" y similares, que no emiten nada.
+INICIOS_DEPENDENCIA = [
+    "Secretaría", "Subsecretaría", "Comisión", "Consejo", "Instituto", "Congreso",
+    "Diputación Permanente", "Poder Ejecutivo", "Poder Judicial", "Poder Legislativo",
+    "Tribunal", "Suprema Corte", "Cámara", "Ayuntamiento", "Gobierno", "Procuraduría",
+    "Fiscalía", "Servicio de Administración Tributaria", "Banco de México", "Junta",
+    "Agencia", "Coordinación", "Dirección General", "Auditoría", "Tesorería",
+    "Oficialía Mayor", "Universidad", "Legislatura",
+    # Ciudad de México
+    "Alcaldía", "Jefatura de Gobierno", "Jefa de Gobierno", "Jefe de Gobierno", "Policía",
+    "Sistema de Aguas", "Sistema para el Desarrollo Integral", "Sistema de Transporte Colectivo",
+]
+
+# Cambia cuando cambian las reglas de parsear_bullets: la siguiente
+# sincronización vuelve a parsear todos los resúmenes
+VERSION_PARSER = 2
+
+_PATRON_INSTRUMENTO = re.compile(
+    r"\b(" + "|".join(re.escape(v) for v in sorted(INSTRUMENTOS, key=len, reverse=True)) + r")\b"
+)
+
+_MAYUSCULA = r"[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑáéíóúñü.-]*"
+_PATRON_DEPENDENCIA = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in sorted(INICIOS_DEPENDENCIA, key=len, reverse=True)) + r")"
+    r"(?:\s+(?:(?:de|del|y|e|para)\s+(?:(?:la|las|los|el)\s+)?)?" + _MAYUSCULA + r")*"
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    doc_id TEXT PRIMARY KEY,
+    ruta TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    jurisdiccion TEXT NOT NULL,
+    dependencia TEXT,
+    dependencia_norm TEXT,
+    instrumento TEXT,
+    texto TEXT NOT NULL,
+    texto_norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_doc ON items (doc_id);
+CREATE INDEX IF NOT EXISTS idx_items_fecha ON items (fecha, jurisdiccion);
+DROP INDEX IF EXISTS idx_items_dependencia;
+CREATE INDEX IF NOT EXISTS idx_items_instrumento ON items (instrumento, fecha);
+
+-- Palabras de dependencia_norm, para buscar "economia" dentro de
+-- "secretaria de economia" sin recorrer la tabla. Lo mantienen los triggers.
+CREATE VIRTUAL TABLE IF NOT EXISTS items_dependencia_fts
+    USING fts5(dependencia_norm, content='items', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS items_dependencia_fts_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_dependencia_fts (rowid, dependencia_norm) VALUES (new.id, new.dependencia_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS items_dependencia_fts_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_dependencia_fts (items_dependencia_fts, rowid, dependencia_norm)
+    VALUES ('delete', old.id, old.dependencia_norm);
+END;
+
+-- "escrituras": sube con cada cambio a items (versión para ETags);
+-- "parser": VERSION_PARSER con la que se parsearon
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+# Una sola sincronización a la vez dentro del proceso (entre procesos, SQLite)
+_sincronizando = threading.Lock()
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def conectar(ruta: str | None = None) -> sqlite3.Connection:
+    """
+    Conexión nueva a la base de items (una por llamada: sqlite3 no comparte
+    conexiones entre threads). WAL deja leer mientras otro proceso escribe.
+    """
+    ruta = ruta or ITEMS_DO_DB
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    conn = sqlite3.connect(ruta, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    sin_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'items_dependencia_fts'"
+    ).fetchone() is None
+    conn.executescript(_ESQUEMA)
+    if sin_fts:
+        # Base de antes de la búsqueda por palabras: indexar lo que ya hay
+        with conn:
+            conn.execute("INSERT INTO items_dependencia_fts (items_dependencia_fts) VALUES ('rebuild')")
+    return conn
+
+
+def _leer_estado(conn: sqlite3.Connection, clave: str) -> int:
+    fila = conn.execute("SELECT valor FROM estado WHERE clave = ?", (clave,)).fetchone()
+    return fila["valor"] if fila else 0
+
+
+def _contar_escritura(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "INSERT INTO estado (clave, valor) VALUES ('escrituras', 1) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = valor + 1"
+    )
+
+
+def version_items(ruta_db: str | None = None) -> int:
+    """
+    Contador de escrituras a la base de items: cambia con cada
+    sincronización que cambió algo, en este proceso o en cualquier otro.
+    """
+    conn = conectar(ruta_db)
+    try:
+        return _leer_estado(conn, "escrituras")
+    finally:
+        conn.close()
+
+
+def detectar_instrumento(texto: str) -> str | None:
+    m = _PATRON_INSTRUMENTO.search(normalizar(texto))
+    return INSTRUMENTOS[m.group(1)] if m else None
+
+
+def detectar_dependencia(texto: str) -> str | None:
+    """
+    Primera dependencia o autoridad nombrada en el bullet, o None.
+    """
+    m = _PATRON_DEPENDENCIA.search(texto.replace("*", ""))
+    return m.group(0).rstrip(".-") if m else None
+
+
+def parsear_bullets(texto: str) -> list[dict]:
+    """
+    Un dict por bullet ("- ...", "• ...", "* ...") de un _resumen.txt, con
+    su orden, texto limpio, dependencia e instrumento detectados.
+    """
+    items = []
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        if not linea or linea[0] not in "-•*" or linea.startswith("**"):
+            continue
+        limpio = re.sub(r"\s+", " ", linea.lstrip("-•* ").replace("**", "")).strip()
+        if not limpio:
+            continue
+        dependencia = detectar_dependencia(limpio)
+        items.append({
+            "orden": len(items),
+            "texto": limpio,
+            "dependencia": dependencia,
+            "instrumento": detectar_instrumento(limpio),
+        })
+    return items
+
+
+# ------------------------------
+# 🗂️ Ingesta
+# ------------------------------
+
+def sincronizar_items(documentos: list[dict], ruta_db: str | None = None) -> dict:
+    """
+    Pone la base al día con los documentos del índice.
+
+    - documentos: [{"doc_id", "fecha" (YYYY-MM-DD), "jurisdiccion", "ruta"
+      (ruta absoluta del _resumen.txt)}, ...]
+    - Solo se vuelven a parsear los _resumen.txt cuya versión (mtime +
+      tamaño) cambió, o todos si cambió VERSION_PARSER; los documentos que
+      ya no están en el índice se borran.
+
+    Devuelve conteos: documentos, actualizados, borrados, items.
+    """
+    totales = {"documentos": 0, "actualizados": 0, "borrados": 0, "items": 0}
+
+    with _sincronizando:
+        conn = conectar(ruta_db)
+        try:
+            versiones = {
+                r["doc_id"]: (r["ruta"], r["mtime_ns"], r["size"])
+                for r in conn.execute("SELECT doc_id, ruta, mtime_ns, size FROM documentos")
+            }
+            reparsear = _leer_estado(conn, "parser") != VERSION_PARSER
+            vigentes = set()
+
+            for doc in documentos:
+                doc_id, ruta = doc["doc_id"], doc["ruta"]
+                if not doc_id or not ruta or not doc.get("fecha"):
+                    continue
+                try:
+                    st = os.stat(ruta)
+                except OSError:
+                    continue
+                vigentes.add(doc_id)
+                totales["documentos"] += 1
+
+                version = (ruta, st.st_mtime_ns, st.st_size)
+                if versiones.get(doc_id) == version and not reparsear:
+                    continue
+
+                try:
+                    with open(ruta, "r", encoding="utf-8") as f:
+                        bullets = parsear_bullets(f.read())
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"⚠️ No se pudo leer {ruta}: {e}")
+                    continue
+
+                with conn:
+                    conn.execute("DELETE FROM items WHERE doc_id = ?", (doc_id,))
+                    conn.executemany(
+                        "INSERT INTO items (doc_id, orden, fecha, jurisdiccion, dependencia, "
+                        "dependencia_norm, instrumento, texto, texto_norm) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                doc_id, b["orden"], doc["fecha"], doc["jurisdiccion"],
+                                b["dependencia"], normalizar(b["dependencia"]) or None,
+                                b["instrumento"], b["texto"], normalizar(b["texto"]),
+                            )
+                            for b in bullets
+                        ],
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documentos (doc_id, ruta, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                        (doc_id, *version),
+                    )
+                    _contar_escritura(conn)
+                totales["actualizados"] += 1
+                totales["items"] += len(bullets)
+
+            sobrantes = [(d,) for d in versiones if d not in vigentes]
+            if sobrantes:
+                with conn:
+                    conn.executemany("DELETE FROM items WHERE doc_id = ?", sobrantes)
+                    conn.executemany("DELETE FROM documentos WHERE doc_id = ?", sobrantes)
+                    _contar_escritura(conn)
+                totales["borrados"] = len(sobrantes)
+
+            if reparsear:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('parser', ?)", (VERSION_PARSER,)
+                    )
+        finally:
+            conn.close()
+
+    return totales
+
+
+# ------------------------------
+# 🔎 Consultas
+# ------------------------------
+
+def buscar_items(
+    desde: str | None = None,
+    hasta: str | None = None,
+    jurisdiccion: str | None = None,
+    dependencia: str | None = None,
+    instrumento: str | None = None,
+    texto: str | None = None,
+    limite: int = ITEMS_DO_LIMITE,
+    ruta_db: str | None = None,
+) -> tuple[list[dict], int]:
+    """
+    Items que cumplen todos los filtros, del más reciente al más antiguo.
+
+    - desde/hasta: fechas YYYY-MM-DD (inclusive).
+    - dependencia: palabras seguidas del nombre, sin acentos ni mayúsculas,
+      la última puede ir incompleta ("economia" o "seguridad ciud"); se
+      resuelve con el índice de texto completo.
+    - texto: subcadena, sin acentos ni mayúsculas.
+    - instrumento: nombre canónico o variante ("acuerdos" -> "acuerdo").
+
+    Devuelve (items, total sin límite).
+    """
+    condiciones, params = [], []
+    if desde:
+        condiciones.append("fecha >= ?")
+        params.append(desde)
+    if hasta:
+        condiciones.append("fecha <= ?")
+        params.append(hasta)
+    if jurisdiccion:
+        condiciones.append("jurisdiccion = ?")
+        params.append(jurisdiccion.strip().upper())
+    if dependencia and dependencia.strip():
+        palabras = re.findall(r"\w+", normalizar(dependencia))
+        if palabras:
+            condiciones.append(
+                "id IN (SELECT rowid FROM items_dependencia_fts WHERE items_dependencia_fts MATCH ?)"
+            )
+            # Frase con la última palabra como prefijo: "seguridad ciud" *
+            params.append(f'"{" ".join(palabras)}" *')
+        else:
+            condiciones.append("0")  # solo signos: no hay nombre que buscar
+    if instrumento:
+        canonico = INSTRUMENTOS.get(normalizar(instrumento), instrumento.strip().lower())
+        condiciones.append("instrumento = ?")
+        params.append(canonico)
+    if texto:
+        condiciones.append("texto_norm LIKE ? ESCAPE '\\'")
+        params.append(f"%{_escapar_like(normalizar(texto))}%")
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    conn = conectar(ruta_db)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM items {where}", params).fetchone()[0]
+        filas = conn.execute(
+            f"SELECT fecha, jurisdiccion, doc_id, orden, dependencia, instrumento, texto "
+            f"FROM items {where} ORDER BY fecha DESC, jurisdiccion, doc_id, orden LIMIT ?",
+            [*params, max(0, int(limite))],
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(f) for f in filas], total
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
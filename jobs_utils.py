@@ -0,0 +1,337 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+DO_INDEX_CSV = os.getenv("DO_INDEX_CSV", "do_index.csv")
+
+# Directorio base del proyecto (usado para armar rutas absolutas)
+BASE_DIR = os.path.dirname(os.path.abspath(DO_INDEX_CSV))
+
+# Tabla de jobs compartida por todos los workers (no hace falta broker)
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(BASE_DIR, "jobs.sqlite3"))
+
+# Threads que ejecutan jobs en cada proceso
+JOBS_HILOS = int(os.getenv("JOBS_HILOS", "2"))
+
+# Cada cuánto revisa la tabla un thread ocioso (por jobs encolados en otro worker)
+JOBS_SONDEO = float(os.getenv("JOBS_SONDEO", "1"))
+
+# Cada cuánto marca su latido un job en curso (segundos)
+JOBS_LATIDO = float(os.getenv("JOBS_LATIDO", "15"))
+
+# Un job "corriendo" sin latido por más de esto se da por perdido (worker
+# muerto) y se reencola. Un job lento pero vivo sigue latiendo: no se repite.
+JOBS_TIMEOUT = float(os.getenv("JOBS_TIMEOUT", "120"))
+
+# Un job que se perdió esta cantidad de veces (p. ej. porque tumba al worker
+# que lo ejecuta) pasa a error en vez de reencolarse otra vez
+JOBS_MAX_INTENTOS = int(os.getenv("JOBS_MAX_INTENTOS", "3"))
+
+# Los jobs terminados se borran después de esto (segundos)
+JOBS_RETENCION = float(os.getenv("JOBS_RETENCION", str(24 * 3600)))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    params TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    status INTEGER,
+    resultado TEXT,
+    error TEXT,
+    latido REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_estado ON jobs (estado, creado);
+"""
+
+# El esquema se crea (o se migra) una vez por proceso y ruta
+_esquema_listo = set()
+_esquema_lock = threading.Lock()
+
+# tipo -> fn(params: dict) -> (payload: dict, status: int)
+_ejecutores = {}
+
+# Threads de este proceso; tras un fork (gunicorn) se vuelven a arrancar
+_hilos = {"pid": None, "lista": []}
+_hilos_lock = threading.Lock()
+_hay_trabajo = threading.Event()
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def _conectar() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(JOBS_DB)), exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    with _esquema_lock:
+        if JOBS_DB not in _esquema_listo:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_ESQUEMA)
+            # Tablas creadas antes de que existiera el latido
+            columnas = {c["name"] for c in conn.execute("PRAGMA table_info(jobs)")}
+            if "latido" not in columnas:
+                try:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN latido REAL")
+                except sqlite3.OperationalError:
+                    pass  # otro worker la agregó primero
+            _esquema_listo.add(JOBS_DB)
+    return conn
+
+
+def _a_dict(fila: sqlite3.Row) -> dict:
+    job = {
+        "id": fila["id"],
+        "tipo": fila["tipo"],
+        "estado": fila["estado"],
+        "intentos": fila["intentos"],
+        "creado": fila["creado"],
+        "iniciado": fila["iniciado"],
+        "terminado": fila["terminado"],
+    }
+    if fila["estado"] == "terminado":
+        job["status"] = fila["status"]
+        job["resultado"] = json.loads(fila["resultado"])
+    elif fila["estado"] == "error":
+        job["error"] = fila["error"]
+        # Un 5xx del resolver trae también el cuerpo que habría respondido
+        if fila["status"] is not None:
+            job["status"] = fila["status"]
+            job["resultado"] = json.loads(fila["resultado"])
+    return job
+
+
+def _desactualizado(fila: sqlite3.Row) -> bool:
+    return fila["estado"] == "terminado" and bool(json.loads(fila["resultado"]).get("desactualizado"))
+
+
+def registrar_tipo(tipo: str, fn) -> None:
+    """
+    Registra la función que ejecuta los jobs de un tipo:
+    fn(params) -> (payload, status HTTP con el que respondería el endpoint).
+    """
+    _ejecutores[tipo] = fn
+
+
+# ------------------------------
+# 📥 Encolar y consultar
+# ------------------------------
+
+def encolar(job_id: str, tipo: str, params: dict) -> dict:
+    """
+    Encola un job, o devuelve el que ya existe con ese id.
+
+    El id lo decide quien encola (p. ej. un hash de la petición y de la
+    versión de los datos), así que un envío duplicado se pega al job
+    pendiente o en curso, y uno ya terminado se devuelve tal cual. Solo se
+    vuelve a encolar un job que terminó en error (excepción o status 5xx,
+    p. ej. el modelo no disponible) o con un resultado desactualizado
+    (respaldo servido mientras el modelo no contestaba).
+    """
+    if tipo not in _ejecutores:
+        raise ValueError(f"Tipo de job desconocido: {tipo}")
+
+    ahora = time.time()
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "DELETE FROM jobs WHERE estado IN ('terminado', 'error') AND terminado < ?",
+            (ahora - JOBS_RETENCION,),
+        )
+        fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if fila is None or fila["estado"] == "error" or _desactualizado(fila):
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, tipo, params, estado, creado) VALUES (?, ?, ?, 'pendiente', ?)",
+                (job_id, tipo, json.dumps(params, ensure_ascii=False), ahora),
+            )
+            fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    asegurar_hilos()
+    _hay_trabajo.set()
+    return _a_dict(fila)
+
+
+def obtener_job(job_id: str) -> dict | None:
+    conn = _conectar()
+    try:
+        fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if fila is not None and fila["estado"] in ("pendiente", "corriendo"):
+        # Que haya quien lo atienda aunque el proceso que lo encoló ya no exista
+        asegurar_hilos()
+    return _a_dict(fila) if fila is not None else None
+
+
+# ------------------------------
+# ⚙️ Ejecución
+# ------------------------------
+
+def _reclamar() -> sqlite3.Row | None:
+    """
+    Toma el job pendiente más viejo de un tipo conocido y lo marca como
+    corriendo, en una transacción (dos workers nunca toman el mismo).
+    Antes reencola los que llevan más de JOBS_TIMEOUT sin latido, o los
+    marca como error si ya agotaron JOBS_MAX_INTENTOS.
+    """
+    ahora = time.time()
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE jobs SET estado = 'error', worker = NULL, terminado = ?, error = ?"
+            " WHERE estado = 'corriendo' AND COALESCE(latido, iniciado) < ? AND intentos >= ?",
+            (
+                ahora, f"Se perdió el worker en {JOBS_MAX_INTENTOS} intentos; no se reintenta",
+                ahora - JOBS_TIMEOUT, JOBS_MAX_INTENTOS,
+            ),
+        )
+        conn.execute(
+            "UPDATE jobs SET estado = 'pendiente', worker = NULL"
+            " WHERE estado = 'corriendo' AND COALESCE(latido, iniciado) < ?",
+            (ahora - JOBS_TIMEOUT,),
+        )
+        marcas = ",".join("?" * len(_ejecutores))
+        fila = conn.execute(
+            f"SELECT * FROM jobs WHERE estado = 'pendiente' AND tipo IN ({marcas}) ORDER BY creado LIMIT 1",
+            list(_ejecutores),
+        ).fetchone()
+        if fila is not None:
+            conn.execute(
+                "UPDATE jobs SET estado = 'corriendo', worker = ?, iniciado = ?, latido = ?,"
+                " intentos = intentos + 1 WHERE id = ?",
+                (_worker(), ahora, ahora, fila["id"]),
+            )
+        conn.execute("COMMIT")
+        return fila
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _worker() -> str:
+    return f"{os.getpid()}:{threading.get_ident()}"
+
+
+def _latir(job_id: str, worker: str, parar: threading.Event) -> None:
+    """
+    Mientras el job corre, renueva su latido cada JOBS_LATIDO segundos para
+    que ningún worker lo dé por perdido y lo ejecute otra vez.
+    """
+    while not parar.wait(JOBS_LATIDO):
+        try:
+            conn = _conectar()
+            try:
+                conn.execute(
+                    "UPDATE jobs SET latido = ? WHERE id = ? AND worker = ? AND estado = 'corriendo'",
+                    (time.time(), job_id, worker),
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo marcar el latido del job {job_id}: {e}")
+
+
+def _terminar(job_id: str, worker: str, estado: str, status=None, resultado=None, error=None) -> None:
+    """
+    Guarda el resultado, solo si el job sigue siendo de este worker: si se
+    dio por perdido y lo tomó otro, el resultado de ese otro es el que vale.
+    """
+    conn = _conectar()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET estado = ?, terminado = ?, status = ?, resultado = ?, error = ?"
+            " WHERE id = ? AND worker = ? AND estado = 'corriendo'",
+            (
+                estado, time.time(), status,
+                json.dumps(resultado, ensure_ascii=False) if resultado is not None else None,
+                error, job_id, worker,
+            ),
+        )
+    finally:
+        conn.close()
+    if cursor.rowcount == 0:
+        print(f"⚠️ El job {job_id} ya no es de este worker; se descarta su resultado")
+
+
+def _trabajar() -> None:
+    while True:
+        try:
+            fila = _reclamar() if _ejecutores else None
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo leer la tabla de jobs: {e}")
+            fila = None
+
+        if fila is None:
+            _hay_trabajo.wait(JOBS_SONDEO)
+            _hay_trabajo.clear()
+            continue
+
+        worker = _worker()
+        parar = threading.Event()
+        threading.Thread(
+            target=_latir, args=(fila["id"], worker, parar), name="jobs-latido", daemon=True
+        ).start()
+        try:
+            try:
+                payload, status = _ejecutores[fila["tipo"]](json.loads(fila["params"]))
+            except Exception as e:
+                print(f"❌ Job {fila['id']} ({fila['tipo']}) falló: {e!r}")
+                fin = {"estado": "error", "error": str(e) or repr(e)}
+            else:
+                if status >= 500:
+                    # Falla pasajera (modelo no disponible, error interno): que el
+                    # siguiente envío lo vuelva a intentar en vez de heredarla
+                    fin = {"estado": "error", "status": status, "resultado": payload,
+                           "error": str(payload.get("error") or status)}
+                else:
+                    fin = {"estado": "terminado", "status": status, "resultado": payload}
+            _terminar(fila["id"], worker, **fin)
+        except sqlite3.Error as e:
+            # El thread sigue vivo; sin latido, el job se reencola tras JOBS_TIMEOUT
+            print(f"⚠️ No se pudo guardar el resultado del job {fila['id']}: {e}")
+        finally:
+            parar.set()
+
+
+def asegurar_hilos() -> None:
+    """
+    Arranca los threads de este proceso que no estén corriendo. Los threads
+    no sobreviven a un fork, así que tras uno (otro pid) se arrancan todos;
+    en el mismo proceso se reemplaza el que haya muerto.
+    """
+    with _hilos_lock:
+        if _hilos["pid"] != os.getpid():
+            _hilos["pid"] = os.getpid()
+            _hilos["lista"] = [None] * JOBS_HILOS
+        for i, h in enumerate(_hilos["lista"]):
+            if h is not None and h.is_alive():
+                continue
+            if h is not None:
+                print(f"⚠️ Thread de jobs {h.name} terminó; se arranca otro")
+            _hilos["lista"][i] = threading.Thread(target=_trabajar, name=f"jobs-{i}", daemon=True)
+            _hilos["lista"][i].start()
@@ -0,0 +1,674 @@
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import types
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from metricas_utils import incrementar
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+# Proveedor del modelo: "openai" o "falso" (respuestas deterministas, sin red
+# ni llave; para benchmarks, pruebas de carga y desarrollo offline)
+LLM_PROVEEDOR = os.getenv("LLM_PROVEEDOR", "openai").strip().lower()
+
+# Latencia simulada del proveedor falso, en segundos por llamada
+LLM_FALSO_LATENCIA = float(os.getenv("LLM_FALSO_LATENCIA", "0"))
+
+# Dimensión de los embeddings del proveedor falso
+LLM_FALSO_DIMENSION = int(os.getenv("LLM_FALSO_DIMENSION", "64"))
+
+# Batch API de OpenAI: cada cuánto se consulta el estado y cuánto se espera
+# como máximo (el batch se compromete a terminar en 24 h)
+LLM_BATCH_SONDEO = float(os.getenv("LLM_BATCH_SONDEO", "30"))
+LLM_BATCH_TIMEOUT = float(os.getenv("LLM_BATCH_TIMEOUT", str(24 * 3600)))
+
+# Llamadas en línea: timeout de cada intento, reintentos ante 429/5xx/timeout
+# y espera entre intentos (exponencial con jitter, o lo que diga Retry-After)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_REINTENTOS = int(os.getenv("LLM_REINTENTOS", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Plazo total de una llamada (con reintentos) cuando el request no fija otro
+LLM_PLAZO = float(os.getenv("LLM_PLAZO", "120"))
+
+# Circuit breaker: tras LLM_CIRCUITO_FALLOS fallas seguidas deja de llamar
+# al modelo durante LLM_CIRCUITO_ENFRIAMIENTO segundos y luego deja pasar
+# una llamada de prueba
+LLM_CIRCUITO_FALLOS = int(os.getenv("LLM_CIRCUITO_FALLOS", "5"))
+LLM_CIRCUITO_ENFRIAMIENTO = float(os.getenv("LLM_CIRCUITO_ENFRIAMIENTO", "30"))
+
+# Status HTTP que vale la pena reintentar (además de los 5xx)
+_STATUS_REINTENTABLES = {408, 409, 429}
+
+# Estados finales de un batch de OpenAI
+_BATCH_TERMINADO = {"completed", "failed", "expired", "cancelled"}
+
+
+# ------------------------------
+# 🔌 Interfaz
+# ------------------------------
+
+class Proveedor(ABC):
+    """
+    Lo que backend_dap necesita de un modelo. Las respuestas son
+    (texto, usage), con usage un objeto con prompt_tokens/completion_tokens
+    (o None) para las métricas.
+
+    - completar(mensajes, modelo, timeout): una llamada síncrona (temperature=0).
+    - completar_async(mensajes, modelo, timeout): lo mismo en el event loop (asgi_dap).
+    - completar_lote({id: (mensajes, modelo)}): muchas llamadas como un solo
+      trabajo; devuelve {id: (texto, usage)} o {id: Exception} por solicitud.
+    - stream(mensajes, modelo, al_terminar, timeout): genera el texto por
+      pedazos y al final llama al_terminar(usage).
+    - embeber(textos, modelo, timeout): un vector por texto (sin normalizar).
+
+    timeout es el de un solo intento, en segundos (None: el del cliente). Los
+    métodos no reintentan: de eso se encargan llamar()/llamar_async(), así
+    que un error transitorio debe salir como excepción (ver es_reintentable).
+
+    completar() y embeber() son obligatorios: un proveedor sin alguno no se
+    puede instanciar. Las implementaciones por defecto de async, lote y
+    stream se apoyan en completar(); un proveedor las reemplaza si tiene
+    algo mejor.
+    """
+
+    @abstractmethod
+    def completar(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        ...
+
+    async def completar_async(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        return await asyncio.to_thread(self.completar, mensajes, modelo, timeout)
+
+    def completar_lote(self, solicitudes: dict) -> dict:
+        respuestas = {}
+        for id_, (mensajes, modelo) in solicitudes.items():
+            try:
+                respuestas[id_] = self.completar(mensajes, modelo)
+            except Exception as e:
+                respuestas[id_] = e
+        return respuestas
+
+    def stream(self, mensajes: list, modelo: str, al_terminar=None, timeout: float | None = None):
+        texto, usage = self.completar(mensajes, modelo, timeout)
+        yield texto
+        if al_terminar:
+            al_terminar(usage)
+
+    @abstractmethod
+    def embeber(self, textos: list[str], modelo: str, timeout: float | None = None) -> list[list[float]]:
+        ...
+
+
+# ------------------------------
+# ☁️ OpenAI
+# ------------------------------
+
+class ProveedorOpenAI(Proveedor):
+    """
+    Chat completions, embeddings y Batch API de OpenAI. Los clientes (y el
+    import del SDK) se crean al primer uso, sin reintentos propios: los
+    hace llamar() con el plazo del request.
+    """
+
+    def __init__(self, api_key: str | None = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._cliente = None
+        self._cliente_async = None
+
+    def _llave(self) -> str:
+        if not self.api_key:
+            raise RuntimeError("Falta la variable de entorno OPENAI_API_KEY")
+        return self.api_key
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            from openai import OpenAI
+
+            self._cliente = OpenAI(api_key=self._llave(), max_retries=0)
+        return self._cliente
+
+    @property
+    def cliente_async(self):
+        if self._cliente_async is None:
+            from openai import AsyncOpenAI
+
+            self._cliente_async = AsyncOpenAI(api_key=self._llave(), max_retries=0)
+        return self._cliente_async
+
+    def completar(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        completion = self.cliente.chat.completions.create(
+            model=modelo,
+            temperature=0,
+            messages=mensajes,
+            **_con_timeout(timeout),
+        )
+        return completion.choices[0].message.content.strip(), getattr(completion, "usage", None)
+
+    async def completar_async(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        completion = await self.cliente_async.chat.completions.create(
+            model=modelo,
+            temperature=0,
+            messages=mensajes,
+            **_con_timeout(timeout),
+        )
+        return completion.choices[0].message.content.strip(), getattr(completion, "usage", None)
+
+    def stream(self, mensajes: list, modelo: str, al_terminar=None, timeout: float | None = None):
+        usage = None
+        respuesta = self.cliente.chat.completions.create(
+            model=modelo,
+            temperature=0,
+            messages=mensajes,
+            stream=True,
+            stream_options={"include_usage": True},
+            **_con_timeout(timeout),
+        )
+        for chunk in respuesta:
+            # El último chunk trae el usage y ningún choice
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        if al_terminar:
+            al_terminar(usage)
+
+    def completar_lote(self, solicitudes: dict) -> dict:
+        """
+        Manda todas las solicitudes como un solo batch (/v1/chat/completions)
+        y espera a que termine: cuesta la mitad que las llamadas sueltas y no
+        gasta el rate limit de los endpoints en línea, a cambio de tardar
+        minutos u horas. Para backfills, no para requests.
+        """
+        if not solicitudes:
+            return {}
+
+        # Aquí no hay request esperando: que el SDK reintente los tropiezos
+        cliente = self.cliente.with_options(max_retries=2)
+        lineas = [
+            json.dumps({
+                "custom_id": id_,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": modelo, "temperature": 0, "messages": mensajes},
+            }, ensure_ascii=False)
+            for id_, (mensajes, modelo) in solicitudes.items()
+        ]
+        archivo = cliente.files.create(
+            file=("lote.jsonl", "\n".join(lineas).encode("utf-8")), purpose="batch"
+        )
+        lote = cliente.batches.create(
+            input_file_id=archivo.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        print(f"📦 Batch {lote.id}: {len(lineas)} solicitudes")
+
+        limite = time.monotonic() + LLM_BATCH_TIMEOUT
+        while lote.status not in _BATCH_TERMINADO:
+            if time.monotonic() > limite:
+                cliente.batches.cancel(lote.id)
+                raise TimeoutError(f"El batch {lote.id} no terminó en {LLM_BATCH_TIMEOUT:.0f}s")
+            time.sleep(LLM_BATCH_SONDEO)
+            lote = cliente.batches.retrieve(lote.id)
+            conteos = getattr(lote, "request_counts", None)
+            if conteos is not None:
+                print(f"⏳ Batch {lote.id} {lote.status}: {conteos.completed}/{conteos.total}")
+
+        respuestas = {}
+        for id_archivo in (lote.output_file_id, lote.error_file_id):
+            if not id_archivo:
+                continue
+            for linea in cliente.files.content(id_archivo).text.splitlines():
+                if linea.strip():
+                    fila = json.loads(linea)
+                    respuestas[fila["custom_id"]] = _respuesta_de_batch(fila)
+
+        for id_ in solicitudes:
+            respuestas.setdefault(id_, RuntimeError(f"Sin respuesta en el batch {lote.id} ({lote.status})"))
+        return respuestas
+
+    def embeber(self, textos: list[str], modelo: str, timeout: float | None = None) -> list[list[float]]:
+        resp = self.cliente.embeddings.create(model=modelo, input=textos, **_con_timeout(timeout))
+        return [d.embedding for d in resp.data]
+
+
+def _con_timeout(timeout: float | None) -> dict:
+    # timeout=None en el SDK significa "sin límite", no "el de siempre"
+    return {"timeout": timeout} if timeout is not None else {}
+
+
+def _respuesta_de_batch(fila: dict):
+    """
+    Una línea del archivo de salida (o de errores) de un batch ->
+    (texto, usage) o la excepción correspondiente.
+    """
+    respuesta = fila.get("response") or {}
+    cuerpo = respuesta.get("body") or {}
+    if fila.get("error") or respuesta.get("status_code") != 200:
+        detalle = fila.get("error") or cuerpo.get("error") or respuesta.get("status_code")
+        return RuntimeError(f"Solicitud {fila.get('custom_id')} falló en el batch: {detalle}")
+    usage = cuerpo.get("usage")
+    return (
+        cuerpo["choices"][0]["message"]["content"].strip(),
+        types.SimpleNamespace(**usage) if usage else None,
+    )
+
+
+# ------------------------------
+# 🧪 Falso (local, determinista)
+# ------------------------------
+
+class ProveedorFalso(Proveedor):
+    """
+    Contesta sin red: el texto depende solo de los mensajes (misma entrada,
+    misma salida en cualquier proceso) y cada llamada tarda
+    LLM_FALSO_LATENCIA. Un lote paga la latencia una sola vez, como un batch.
+    Si la latencia pasa del timeout del intento, espera el timeout y lanza
+    TimeoutError, como un modelo que no contesta a tiempo.
+    Los embeddings son bolsas de palabras con hash, así que textos con
+    palabras en común salen parecidos.
+    """
+
+    def __init__(self, latencia: float | None = None):
+        self.latencia = LLM_FALSO_LATENCIA if latencia is None else latencia
+
+    def _responder(self, mensajes: list, modelo: str) -> tuple:
+        entrada = "\n".join(str(m.get("content") or "") for m in mensajes)
+        firma = hashlib.sha1(f"{modelo}\n{entrada}".encode("utf-8")).hexdigest()[:8]
+        texto = f"- Resumen de prueba {firma}."
+        usage = types.SimpleNamespace(
+            prompt_tokens=len(entrada) // 4,
+            completion_tokens=len(texto) // 4,
+            total_tokens=len(entrada) // 4 + len(texto) // 4,
+        )
+        return texto, usage
+
+    def _espera(self, timeout: float | None) -> tuple[float, bool]:
+        if timeout is not None and self.latencia > timeout:
+            return timeout, True
+        return self.latencia, False
+
+    def completar(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        espera, agotado = self._espera(timeout)
+        if espera:
+            time.sleep(espera)
+        if agotado:
+            raise TimeoutError(f"El proveedor falso no contestó en {timeout:.1f}s")
+        return self._responder(mensajes, modelo)
+
+    async def completar_async(self, mensajes: list, modelo: str, timeout: float | None = None) -> tuple:
+        espera, agotado = self._espera(timeout)
+        if espera:
+            await asyncio.sleep(espera)
+        if agotado:
+            raise TimeoutError(f"El proveedor falso no contestó en {timeout:.1f}s")
+        return self._responder(mensajes, modelo)
+
+    def completar_lote(self, solicitudes: dict) -> dict:
+        if self.latencia:
+            time.sleep(self.latencia)
+        return {id_: self._responder(m, modelo) for id_, (m, modelo) in solicitudes.items()}
+
+    def stream(self, mensajes: list, modelo: str, al_terminar=None, timeout: float | None = None):
+        espera, agotado = self._espera(timeout)
+        if agotado:
+            time.sleep(espera)
+            raise TimeoutError(f"El proveedor falso no contestó en {timeout:.1f}s")
+        texto, usage = self._responder(mensajes, modelo)
+        palabras = texto.split(" ")
+        for i, palabra in enumerate(palabras):
+            if self.latencia:
+                time.sleep(self.latencia / len(palabras))
+            yield palabra if i == 0 else " " + palabra
+        if al_terminar:
+            al_terminar(usage)
+
+    def embeber(self, textos: list[str], modelo: str, timeout: float | None = None) -> list[list[float]]:
+        vectores = []
+        for texto in textos:
+            vector = [0.0] * LLM_FALSO_DIMENSION
+            for palabra in texto.lower().split():
+                h = int.from_bytes(hashlib.blake2b(palabra.encode("utf-8"), digest_size=4).digest(), "big")
+                vector[h % LLM_FALSO_DIMENSION] += 1.0
+            vectores.append(vector)
+        return vectores
+
+
+# ------------------------------
+# 🧭 Selección
+# ------------------------------
+
+PROVEEDORES = {
+    "openai": ProveedorOpenAI,
+    "falso": ProveedorFalso,
+}
+
+# Instancia de este proceso; tras un fork (gunicorn) se crea otra, porque
+# los pools de conexiones HTTP no se comparten entre procesos
+_actual = {"pid": None, "proveedor": None}
+
+
+def registrar_proveedor(nombre: str, clase) -> None:
+    PROVEEDORES[nombre] = clase
+
+
+def proveedor() -> Proveedor:
+    if _actual["pid"] != os.getpid():
+        clase = PROVEEDORES.get(LLM_PROVEEDOR)
+        if clase is None:
+            raise ValueError(
+                f"LLM_PROVEEDOR desconocido: {LLM_PROVEEDOR} (opciones: {', '.join(PROVEEDORES)})"
+            )
+        _actual["proveedor"] = clase()
+        _actual["pid"] = os.getpid()
+    return _actual["proveedor"]
+
+
+def usar_proveedor(instancia: Proveedor) -> None:
+    """
+    Fija el proveedor de este proceso (p. ej. un ProveedorFalso con otra latencia).
+    """
+    _actual["proveedor"] = instancia
+    _actual["pid"] = os.getpid()
+
+
+# ------------------------------
+# 🛡️ Reintentos, plazos y circuit breaker
+# ------------------------------
+
+class ModeloNoDisponible(RuntimeError):
+    """
+    El modelo no contestó dentro del plazo o siguió fallando tras los reintentos.
+    """
+
+
+class CircuitoAbierto(ModeloNoDisponible):
+    """
+    El circuito está abierto: la llamada ni se intentó.
+    """
+
+
+class Circuito:
+    """
+    Circuit breaker compartido por los threads (y el event loop) del proceso.
+
+    - cerrado: las llamadas pasan; cada falla transitoria suma, cada éxito
+      pone el conteo en cero. Con `fallos` seguidas se abre.
+    - abierto: durante `enfriamiento` segundos permitir() lanza CircuitoAbierto
+      sin tocar la red, así un upstream caído no se come el plazo de cada request.
+    - semiabierto: pasado el enfriamiento deja pasar una sola llamada de
+      prueba; si sale bien se cierra y si falla se vuelve a abrir. Si la
+      prueba no termina ni en éxito ni en falla (request cancelado, cliente
+      que se desconecta a mitad del stream), soltar() deja pasar otra.
+    """
+
+    def __init__(self, fallos: int, enfriamiento: float):
+        self.fallos_max = fallos
+        self.enfriamiento = enfriamiento
+        self._lock = threading.Lock()
+        self.estado = "cerrado"
+        self.fallos = 0
+        self.abierto_desde = None
+        self._probando = False
+
+    def permitir(self) -> None:
+        with self._lock:
+            if self.estado == "cerrado":
+                return
+            transcurrido = time.monotonic() - self.abierto_desde
+            if self.estado == "abierto" and transcurrido >= self.enfriamiento:
+                self.estado = "semiabierto"
+                self._probando = False
+            if self.estado == "semiabierto" and not self._probando:
+                self._probando = True
+                return
+            restante = max(0.0, self.enfriamiento - transcurrido)
+        raise CircuitoAbierto(f"Modelo no disponible (circuito abierto, nueva prueba en {restante:.0f}s)")
+
+    def exito(self) -> None:
+        with self._lock:
+            if self.estado != "cerrado":
+                print("✅ Circuito del modelo cerrado")
+            self.estado = "cerrado"
+            self.fallos = 0
+            self._probando = False
+
+    def fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+            self._probando = False
+            if self.estado == "semiabierto" or (self.estado == "cerrado" and self.fallos >= self.fallos_max):
+                self.estado = "abierto"
+                self.abierto_desde = time.monotonic()
+                print(f"⚠️ Circuito del modelo abierto tras {self.fallos} fallas seguidas")
+
+    def soltar(self) -> None:
+        # Va en un finally tras permitir(): tras exito()/fallo() no cambia nada
+        with self._lock:
+            if self.estado == "semiabierto":
+                self._probando = False
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"estado": self.estado, "fallos": self.fallos}
+
+    def reiniciar_lock(self) -> None:
+        # Tras un fork el lock pudo quedar tomado por un thread que ya no existe
+        self._lock = threading.Lock()
+
+
+circuito = Circuito(LLM_CIRCUITO_FALLOS, LLM_CIRCUITO_ENFRIAMIENTO)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=circuito.reiniciar_lock)
+
+# Momento (time.monotonic) en que vence el plazo del request en curso. Es un
+# ContextVar para que valga igual en Flask y en asgi_dap (y en los threads
+# de asyncio.to_thread, que copian el contexto).
+_plazo_request = ContextVar("plazo_llm", default=None)
+
+
+def iniciar_plazo(segundos: float):
+    """
+    Fija el plazo de las llamadas al modelo del request en curso; devuelve
+    el token para terminar_plazo().
+    """
+    return _plazo_request.set(time.monotonic() + segundos)
+
+
+def terminar_plazo(token) -> None:
+    _plazo_request.reset(token)
+
+
+@contextmanager
+def plazo(segundos: float):
+    token = iniciar_plazo(segundos)
+    try:
+        yield
+    finally:
+        terminar_plazo(token)
+
+
+def _limite(segundos: float | None) -> float:
+    limite = time.monotonic() + (LLM_PLAZO if segundos is None else segundos)
+    del_request = _plazo_request.get()
+    return limite if del_request is None else min(limite, del_request)
+
+
+def plazo_restante(segundos: float | None = None) -> float:
+    """
+    Segundos que le quedan al plazo del request (o a `segundos`, el que
+    venza antes): lo más que tiene sentido esperar por una respuesta.
+    """
+    return max(0.0, _limite(segundos) - time.monotonic())
+
+
+def es_reintentable(e: Exception) -> bool:
+    """
+    Timeouts, errores de conexión, 408/409/429 y 5xx: vale la pena otro
+    intento. Un 400 o un 401 no se arreglan reintentando.
+    """
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    if type(e).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and (status in _STATUS_REINTENTABLES or status >= 500)
+
+
+def _motivo(e: Exception) -> str:
+    status = getattr(e, "status_code", None)
+    if isinstance(status, int):
+        return str(status) if status < 500 else "5xx"
+    if isinstance(e, TimeoutError) or type(e).__name__ == "APITimeoutError":
+        return "timeout"
+    return "conexion"
+
+
+def espera_sugerida(e: Exception) -> float | None:
+    """
+    Segundos que pide esperar el servidor (Retry-After / retry-after-ms), o None.
+    """
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return max(0.0, float(ms) / 1000)
+        valor = headers.get("retry-after")
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            fecha = email.utils.parsedate_to_datetime(valor)
+            return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def espera_reintento(intento: int, e: Exception) -> float:
+    """
+    Backoff exponencial con jitter completo; si el servidor dijo cuánto
+    esperar, al menos eso.
+    """
+    espera = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** intento))
+    sugerida = espera_sugerida(e)
+    return espera if sugerida is None else max(espera, sugerida)
+
+
+def _tras_falla(e: Exception, intento: int, limite: float) -> float:
+    """
+    Anota la falla y decide: devuelve cuánto esperar antes del siguiente
+    intento, o lanza ModeloNoDisponible si ya no cabe otro en el plazo.
+    """
+    if not es_reintentable(e):
+        # El modelo contestó (mal): no es culpa del upstream
+        circuito.exito()
+        raise e
+    circuito.fallo()
+    incrementar("dap_llm_fallas_total", motivo=_motivo(e))
+    espera = espera_reintento(intento, e)
+    if intento >= LLM_REINTENTOS or time.monotonic() + espera >= limite:
+        raise ModeloNoDisponible(f"El modelo no contestó tras {intento + 1} intento(s): {e!r}") from e
+    return espera
+
+
+def _timeout_intento(limite: float) -> float:
+    restante = limite - time.monotonic()
+    if restante <= 0:
+        raise ModeloNoDisponible("Se agotó el plazo para llamar al modelo")
+    return min(LLM_TIMEOUT, restante)
+
+
+def llamar(fn, segundos: float | None = None):
+    """
+    Llama fn(timeout) con reintentos, dentro del plazo del request (o de
+    `segundos`, el que venza antes) y detrás del circuit breaker. timeout es
+    el que le toca a ese intento: nunca más que lo que queda del plazo.
+
+    Lanza CircuitoAbierto sin llamar si el circuito está abierto, y
+    ModeloNoDisponible si se acaban los intentos o el plazo. Los errores que
+    no vale la pena reintentar salen tal cual al primer intento.
+    """
+    limite = _limite(segundos)
+    intento = 0
+    while True:
+        timeout = _timeout_intento(limite)
+        circuito.permitir()
+        try:
+            resultado = fn(timeout)
+        except ModeloNoDisponible:
+            raise
+        except Exception as e:
+            espera = _tras_falla(e, intento, limite)
+        else:
+            circuito.exito()
+            return resultado
+        finally:
+            circuito.soltar()
+        time.sleep(espera)
+        intento += 1
+
+
+async def llamar_async(fn, segundos: float | None = None):
+    """
+    Como llamar(), con fn(timeout) una corrutina y esperas que no bloquean el event loop.
+    """
+    limite = _limite(segundos)
+    intento = 0
+    while True:
+        timeout = _timeout_intento(limite)
+        circuito.permitir()
+        try:
+            resultado = await fn(timeout)
+        except ModeloNoDisponible:
+            raise
+        except Exception as e:
+            espera = _tras_falla(e, intento, limite)
+        else:
+            circuito.exito()
+            return resultado
+        finally:
+            # Una cancelación (CancelledError) no es Exception: sin esto la
+            # prueba del circuito semiabierto quedaría tomada para siempre
+            circuito.soltar()
+        await asyncio.sleep(espera)
+        intento += 1
+
+
+def stream_protegido(crear, segundos: float | None = None):
+    """
+    Generador: crear(timeout) devuelve el iterador de pedazos del modelo.
+    Pasa por el circuit breaker y recibe el timeout del plazo, pero no
+    reintenta: lo ya mandado al cliente no se puede repetir.
+    """
+    timeout = _timeout_intento(_limite(segundos))
+    circuito.permitir()
+    try:
+        yield from crear(timeout)
+    except Exception as e:
+        if not es_reintentable(e):
+            circuito.exito()
+            raise
+        circuito.fallo()
+        incrementar("dap_llm_fallas_total", motivo=_motivo(e))
+        raise ModeloNoDisponible(f"El stream del modelo se cortó: {e!r}") from e
+    else:
+        circuito.exito()
+    finally:
+        # GeneratorExit si el cliente se desconecta a mitad del stream
+        circuito.soltar()
@@ -0,0 +1,270 @@
+"""
+Prueba de carga: modo síncrono (gunicorn + Flask) contra modo asíncrono
+(uvicorn + asgi_dap) con el mismo número de workers, es decir, con la
+misma memoria base.
+
+- Levanta un OpenAI falso local con latencia fija (no gasta tokens).
+- Arranca cada servidor apuntando ahí vía OPENAI_BASE_URL.
+- Dispara N requests concurrentes a POST /pregunta.
+- Reporta requests/s, latencias p50/p95 y RSS pico de los procesos del servidor.
+
+Uso:
+  python loadtest_dap.py --concurrencia 200 --latencia 2 --workers 2
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ------------------------------
+# 🤖 OpenAI falso
+# ------------------------------
+
+class _OpenAIFalso(BaseHTTPRequestHandler):
+    latencia = 1.0
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length", "0"))
+        pedido = json.loads(self.rfile.read(largo) or b"{}")
+        time.sleep(self.latencia)
+
+        cuerpo = json.dumps({
+            "id": "chatcmpl-loadtest",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": pedido.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "- Respuesta de prueba."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorFalso(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 2048
+
+
+def levantar_openai_falso(latencia: float) -> tuple[ThreadingHTTPServer, int]:
+    handler = type("_OpenAIFalsoConLatencia", (_OpenAIFalso,), {"latencia": latencia})
+    servidor = _ServidorFalso(("127.0.0.1", 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, servidor.server_address[1]
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_arbol_mb(pid: int) -> float | None:
+    """
+    RSS total (MB) de un proceso y sus descendientes. Solo Linux (/proc).
+    """
+    if not os.path.isdir("/proc"):
+        return None
+
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            hijos.setdefault(ppid, []).append(int(entrada))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total_kb = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        pendientes.extend(hijos.get(actual, []))
+        try:
+            with open(f"/proc/{actual}/status") as f:
+                for linea in f:
+                    if linea.startswith("VmRSS:"):
+                        total_kb += int(linea.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def esperar_servidor(url: str, timeout: float = 60) -> None:
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f"El servidor en {url} no respondió a tiempo")
+
+
+def un_request(url: str, fecha: str | None) -> tuple[int, float]:
+    cuerpo = {"pregunta": "¿Qué pasó con el gas?"}
+    if fecha:
+        cuerpo["fecha"] = fecha
+    req = urllib.request.Request(
+        url + "/pregunta",
+        data=json.dumps(cuerpo).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=600) as r:
+            r.read()
+            status = r.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - t0
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+# ------------------------------
+# 🏁 Corrida
+# ------------------------------
+
+def correr_modo(nombre: str, comando: list[str], env: dict, puerto: int, args) -> dict:
+    url = f"http://127.0.0.1:{puerto}"
+    proc = subprocess.Popen(
+        comando, cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        esperar_servidor(url)
+        # Un request de calentamiento (carga de CSVs, índices, etc.)
+        un_request(url, args.fecha)
+        rss_reposo = rss_arbol_mb(proc.pid)
+
+        rss_pico = [rss_reposo or 0.0]
+        midiendo = threading.Event()
+
+        def muestrear():
+            while not midiendo.is_set():
+                rss = rss_arbol_mb(proc.pid)
+                if rss:
+                    rss_pico[0] = max(rss_pico[0], rss)
+                time.sleep(0.2)
+
+        threading.Thread(target=muestrear, daemon=True).start()
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+            resultados = list(pool.map(
+                lambda _: un_request(url, args.fecha), range(args.requests)
+            ))
+        duracion = time.perf_counter() - t0
+        midiendo.set()
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    latencias = [t for status, t in resultados if status == 200]
+    return {
+        "modo": nombre,
+        "ok": len(latencias),
+        "errores": len(resultados) - len(latencias),
+        "duracion_s": duracion,
+        "req_s": len(latencias) / duracion if duracion else 0.0,
+        "p50_s": percentil(latencias, 50),
+        "p95_s": percentil(latencias, 95),
+        "rss_reposo_mb": rss_reposo,
+        "rss_pico_mb": rss_pico[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="workers por servidor (misma memoria base)")
+    parser.add_argument("--concurrencia", type=int, default=100, help="requests simultáneos")
+    parser.add_argument("--requests", type=int, default=400, help="requests totales por modo")
+    parser.add_argument("--latencia", type=float, default=2.0, help="segundos que tarda el OpenAI falso")
+    parser.add_argument("--fecha", default=None, help="fecha fija para /pregunta (YYYY-MM-DD)")
+    parser.add_argument("--modos", default="sync,async", help="sync, async o ambos")
+    args = parser.parse_args()
+
+    _, puerto_openai = levantar_openai_falso(args.latencia)
+
+    env = dict(os.environ)
+    env["OPENAI_API_KEY"] = "loadtest"
+    env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{puerto_openai}/v1"
+    env["RESUMENES_CACHE_DIR"] = tempfile.mkdtemp(prefix="dap_loadtest_")
+    env["USO_DB"] = os.path.join(env["RESUMENES_CACHE_DIR"], "uso_llm.sqlite3")
+    env["DEBUG"] = "false"
+    # El OpenAI falso solo imita chat completions, no embeddings
+    env["RECUPERACION_SEMANTICA"] = "0"
+
+    modos = {
+        "sync": lambda p: [
+            sys.executable, "-m", "gunicorn", "backend_dap:app",
+            "-w", str(args.workers), "--timeout", "600", "--bind", f"127.0.0.1:{p}",
+        ],
+        "async": lambda p: [
+            sys.executable, "-m", "uvicorn", "asgi_dap:app",
+            "--workers", str(args.workers), "--host", "127.0.0.1", "--port", str(p),
+            "--log-level", "warning",
+        ],
+    }
+
+    filas = []
+    for nombre in [m.strip() for m in args.modos.split(",") if m.strip()]:
+        puerto = puerto_libre()
+        print(f"🚀 Modo {nombre}: {args.requests} requests, concurrencia {args.concurrencia}…")
+        filas.append(correr_modo(nombre, modos[nombre](puerto), env, puerto, args))
+
+    print()
+    print(f"Workers por servidor: {args.workers} | latencia del modelo: {args.latencia}s")
+    print(f"{'modo':<6} {'ok':>5} {'err':>5} {'req/s':>8} {'p50 s':>7} {'p95 s':>7} {'RSS reposo':>11} {'RSS pico':>9}")
+    for f in filas:
+        rss_r = f"{f['rss_reposo_mb']:.0f} MB" if f["rss_reposo_mb"] else "n/d"
+        rss_p = f"{f['rss_pico_mb']:.0f} MB" if f["rss_pico_mb"] else "n/d"
+        print(
+            f"{f['modo']:<6} {f['ok']:>5} {f['errores']:>5} {f['req_s']:>8.1f} "
+            f"{f['p50_s']:>7.2f} {f['p95_s']:>7.2f} {rss_r:>11} {rss_p:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
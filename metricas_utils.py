@@ -0,0 +1,293 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import pyinstrument  # Perfilador opcional (PERFIL_HERRAMIENTA=pyinstrument)
+except ImportError:
+    pyinstrument = None
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+# "1" agrega el header Server-Timing (tramos del request) a cada respuesta
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# Requests más lentos que esto (ms) dejan un perfil en PERFILES_DIR; 0 = apagado.
+# Con el perfilador prendido todos los requests corren más lento.
+PERFIL_LENTO_MS = float(os.getenv("PERFIL_LENTO_MS", "0"))
+PERFILES_DIR = os.getenv("PERFILES_DIR", "perfiles")
+
+# "cprofile" (.prof, se abre con snakeviz o pstats) o "pyinstrument" (.html)
+PERFIL_HERRAMIENTA = os.getenv("PERFIL_HERRAMIENTA", "cprofile").lower()
+
+# Límites (segundos) de los histogramas de duración
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Descripción y tipo de cada métrica, en el orden en que se exportan
+METRICAS = {
+    "dap_requests_total": ("counter", "Requests atendidos por endpoint, método y status"),
+    "dap_request_segundos": ("histogram", "Duración de los requests por endpoint"),
+    "dap_tramo_segundos": ("histogram", "Duración de los tramos (carga de índices, contexto, LLM...)"),
+    "dap_llm_llamadas_total": ("counter", "Llamadas al modelo por modelo"),
+    "dap_llm_tokens_total": ("counter", "Tokens del modelo por modelo y tipo (prompt/completion)"),
+    "dap_llm_fallas_total": ("counter", "Intentos fallidos de llamadas al modelo por motivo (timeout, 429, 5xx...)"),
+    "dap_cache_total": ("counter", "Consultas a cachés por caché y resultado (hit/miss)"),
+}
+
+# Valores: (nombre, etiquetas ordenadas) -> número o [conteos por cubeta, suma, total]
+_contadores = {}
+_histogramas = {}
+_medidores = {}
+_lock = threading.Lock()
+
+# Tramos del request en curso: lista de (nombre, segundos). Es un ContextVar
+# para que funcione igual con threads (Flask) y con asyncio (asgi_dap); los
+# threads de asyncio.to_thread copian el contexto y anotan en la misma lista.
+_tramos_request = ContextVar("tramos_request", default=None)
+
+
+# ------------------------------
+# 📈 Registro
+# ------------------------------
+
+def _llave(nombre: str, etiquetas: dict) -> tuple:
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def incrementar(nombre: str, valor: float = 1, **etiquetas) -> None:
+    llave = _llave(nombre, etiquetas)
+    with _lock:
+        _contadores[llave] = _contadores.get(llave, 0) + valor
+
+
+def observar(nombre: str, segundos: float, **etiquetas) -> None:
+    llave = _llave(nombre, etiquetas)
+    with _lock:
+        h = _histogramas.get(llave)
+        if h is None:
+            h = _histogramas[llave] = [[0] * len(CUBETAS_SEGUNDOS), 0.0, 0]
+        for i, limite in enumerate(CUBETAS_SEGUNDOS):
+            if segundos <= limite:
+                h[0][i] += 1
+        h[1] += segundos
+        h[2] += 1
+
+
+def registrar_medidor(nombre: str, tipo: str, ayuda: str, fn) -> None:
+    """
+    Métrica que se lee al exportar: fn() -> número, o
+    {((etiqueta, valor), ...): número} para una serie por combinación de etiquetas.
+    Sirve para estado que ya se lleva en otro lado (p. ej. cache_info de un LRU).
+    """
+    METRICAS[nombre] = (tipo, ayuda)
+    _medidores[nombre] = fn
+
+
+def registrar_cache(cache: str, hit: bool) -> None:
+    incrementar("dap_cache_total", cache=cache, resultado="hit" if hit else "miss")
+
+
+def registrar_llm(modelo: str, usage) -> None:
+    """
+    Cuenta una llamada al modelo y sus tokens (usage de la respuesta de OpenAI).
+    """
+    incrementar("dap_llm_llamadas_total", modelo=modelo)
+    if usage is None:
+        return
+    for tipo in ("prompt", "completion"):
+        tokens = getattr(usage, f"{tipo}_tokens", None)
+        if tokens:
+            incrementar("dap_llm_tokens_total", tokens, modelo=modelo, tipo=tipo)
+
+
+def registrar_request(endpoint: str, metodo: str, status: int, segundos: float) -> None:
+    incrementar("dap_requests_total", endpoint=endpoint, metodo=metodo, status=status)
+    observar("dap_request_segundos", segundos, endpoint=endpoint)
+
+
+# ------------------------------
+# ⏱️ Tramos por request
+# ------------------------------
+
+def iniciar_request():
+    """
+    Abre la lista de tramos del request en curso; devuelve el token para cerrarla.
+    """
+    return _tramos_request.set([])
+
+
+def terminar_request(token) -> None:
+    _tramos_request.reset(token)
+
+
+def tramos_request() -> list:
+    return _tramos_request.get() or []
+
+
+@contextmanager
+def tramo(nombre: str):
+    """
+    Mide un tramo de trabajo: va al histograma dap_tramo_segundos y, si hay
+    un request en curso, a su lista de tramos (Server-Timing).
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - t0
+        observar("dap_tramo_segundos", segundos, tramo=nombre)
+        tramos = _tramos_request.get()
+        if tramos is not None:
+            tramos.append((nombre, segundos))
+
+
+def server_timing(tramos: list, total: float) -> str:
+    """
+    Header Server-Timing: un valor por nombre de tramo (sumando repeticiones,
+    p. ej. varias llamadas al modelo) más el total del request.
+    """
+    por_nombre = {}
+    for nombre, segundos in tramos:
+        duracion, veces = por_nombre.get(nombre, (0.0, 0))
+        por_nombre[nombre] = (duracion + segundos, veces + 1)
+
+    partes = []
+    for nombre, (duracion, veces) in por_nombre.items():
+        parte = f"{nombre};dur={duracion * 1000:.1f}"
+        if veces > 1:
+            parte += f';desc="x{veces}"'
+        partes.append(parte)
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes)
+
+
+# ------------------------------
+# 🐢 Perfiles de requests lentos
+# ------------------------------
+
+def iniciar_perfil():
+    """
+    Arranca el perfilador del request si PERFIL_LENTO_MS > 0; None si no.
+    cProfile solo mide el thread actual y admite un perfilador a la vez por
+    thread: si ya hay uno activo, este request no se perfila.
+    """
+    if PERFIL_LENTO_MS <= 0:
+        return None
+    try:
+        if PERFIL_HERRAMIENTA == "pyinstrument" and pyinstrument is not None:
+            perfil = pyinstrument.Profiler()
+            perfil.start()
+        else:
+            perfil = cProfile.Profile()
+            perfil.enable()
+        return perfil
+    except (RuntimeError, ValueError):
+        return None
+
+
+def terminar_perfil(perfil, etiqueta: str, segundos: float) -> str | None:
+    """
+    Detiene el perfilador y, si el request pasó de PERFIL_LENTO_MS, guarda el
+    perfil en PERFILES_DIR. Devuelve la ruta escrita o None.
+    """
+    if perfil is None:
+        return None
+
+    es_pyinstrument = pyinstrument is not None and isinstance(perfil, pyinstrument.Profiler)
+    if es_pyinstrument:
+        perfil.stop()
+    else:
+        perfil.disable()
+
+    if segundos * 1000 < PERFIL_LENTO_MS:
+        return None
+
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    nombre = re.sub(r"[^\w.-]+", "_", etiqueta).strip("_") or "request"
+    base = os.path.join(
+        PERFILES_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{int(segundos * 1000)}ms_{nombre}_{os.getpid()}"
+    )
+    try:
+        if es_pyinstrument:
+            ruta = base + ".html"
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(perfil.output_html())
+        else:
+            ruta = base + ".prof"
+            perfil.dump_stats(ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el perfil {base}: {e}")
+        return None
+    print(f"🐢 Request lento ({segundos:.2f}s) {etiqueta}: perfil en {ruta}")
+    return ruta
+
+
+# ------------------------------
+# 📤 Exportación (texto de Prometheus)
+# ------------------------------
+
+def _etiquetas(pares) -> str:
+    if not pares:
+        return ""
+    escapadas = []
+    for k, v in pares:
+        v = v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escapadas.append(f'{k}="{v}"')
+    return "{" + ",".join(escapadas) + "}"
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def exportar_prometheus() -> str:
+    """
+    Todas las métricas en el formato de texto de Prometheus (versión 0.0.4).
+
+    Las métricas son por proceso: con varios workers de gunicorn, cada
+    scrape ve solo al worker que lo atendió.
+    """
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {k: ([*v[0]], v[1], v[2]) for k, v in _histogramas.items()}
+
+    lineas = []
+    for nombre, (tipo, ayuda) in METRICAS.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+        if nombre in _medidores:
+            try:
+                valores = _medidores[nombre]()
+            except Exception as e:
+                print(f"⚠️ Métrica {nombre} no disponible: {e}")
+                continue
+            if not isinstance(valores, dict):
+                valores = {(): valores}
+            for pares, valor in valores.items():
+                if valor is not None:
+                    lineas.append(f"{nombre}{_etiquetas(pares)} {_numero(valor)}")
+            continue
+
+        if tipo == "histogram":
+            for (n, pares), (conteos, suma, total) in sorted(histogramas.items()):
+                if n != nombre:
+                    continue
+                for limite, conteo in zip(CUBETAS_SEGUNDOS, conteos):
+                    lineas.append(f"{nombre}_bucket{_etiquetas(pares + (('le', _numero(limite)),))} {conteo}")
+                lineas.append(f"{nombre}_bucket{_etiquetas(pares + (('le', '+Inf'),))} {total}")
+                lineas.append(f"{nombre}_sum{_etiquetas(pares)} {suma!r}")
+                lineas.append(f"{nombre}_count{_etiquetas(pares)} {total}")
+        else:
+            for (n, pares), valor in sorted(contadores.items()):
+                if n == nombre:
+                    lineas.append(f"{nombre}{_etiquetas(pares)} {_numero(valor)}")
+
+    return "\n".join(lineas) + "\n"
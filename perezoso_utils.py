@@ -0,0 +1,41 @@
+import importlib
+
+
+# ------------------------------
+# 💤 Imports perezosos
+# ------------------------------
+
+class ModuloPerezoso:
+    """
+    Hace las veces de un módulo pesado (pandas, numpy) sin importarlo hasta
+    que se usa uno de sus atributos: pd = importar_perezoso("pandas") y luego
+    pd.read_csv(...) como siempre. Así /health, los estáticos y /ready no
+    pagan el import, y un proceso nuevo arranca en una fracción del tiempo.
+
+    Para anotaciones de tipo (pd.DataFrame) hace falta
+    `from __future__ import annotations`, o se evaluarían al definir la función.
+    """
+
+    def __init__(self, nombre: str):
+        self._nombre = nombre
+        self._modulo = None
+
+    def _cargar(self):
+        if self._modulo is None:
+            # import_module ya es thread-safe (lock de import por módulo)
+            self._modulo = importlib.import_module(self._nombre)
+        return self._modulo
+
+    def __getattr__(self, atributo: str):
+        valor = getattr(self._cargar(), atributo)
+        # Siguiente acceso sin pasar por __getattr__
+        setattr(self, atributo, valor)
+        return valor
+
+    def __repr__(self) -> str:
+        estado = "cargado" if self._modulo is not None else "sin cargar"
+        return f"<módulo perezoso {self._nombre} ({estado})>"
+
+
+def importar_perezoso(nombre: str) -> ModuloPerezoso:
+    return ModuloPerezoso(nombre)
@@ -1,6 +1,6 @@
-import requests
-
 def telegram_send_message(bot_token: str, chat_id: str, text: str):
+    import requests  # Al primer envío: el worker arranca sin cargarlo
+
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
 
     # 🔒 Por si acaso: límite seguro de longitud
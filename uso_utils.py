@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+
+
+# ------------------------------
+# 🚀 Configuración base
+# ------------------------------
+
+DO_INDEX_CSV = os.getenv("DO_INDEX_CSV", "do_index.csv")
+
+# Directorio base del proyecto (usado para armar rutas absolutas)
+BASE_DIR = os.path.dirname(os.path.abspath(DO_INDEX_CSV))
+
+# Bitácora de llamadas al modelo (solo se agregan renglones), compartida por
+# todos los workers
+USO_DB = os.getenv("USO_DB", os.path.join(BASE_DIR, "uso_llm.sqlite3"))
+
+# "0" apaga la bitácora (las métricas de Prometheus siguen)
+USO_ACTIVO = os.getenv("USO_ACTIVO", "1") == "1"
+
+# Precio en USD por millón de tokens: modelo -> (entrada, salida). Se
+# completa o corrige con USO_PRECIOS='{"gpt-4o-mini": [0.15, 0.6]}'.
+# El costo se calcula al registrar la llamada: cambiar un precio no
+# reescribe la historia.
+PRECIOS_POR_MILLON = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    **{k: tuple(v) for k, v in json.loads(os.getenv("USO_PRECIOS") or "{}").items()},
+}
+
+# La Batch API cobra la mitad
+DESCUENTO_LOTE = 0.5
+
+# Columnas por las que se puede agrupar el reporte
+AGRUPACIONES = ("dia", "endpoint", "modelo", "fecha", "tipo")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS uso_llm (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    dia TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    fecha TEXT,
+    modelo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    segundos REAL,
+    costo_usd REAL
+);
+CREATE INDEX IF NOT EXISTS idx_uso_llm_dia ON uso_llm (dia);
+"""
+
+# Endpoint y fecha de los datos a los que se atribuye la llamada en curso.
+# ContextVar: vale igual en Flask, en asgi_dap y en los threads de los jobs.
+_contexto = ContextVar("uso_llm", default={})
+
+# El esquema se crea una vez por proceso y ruta
+_esquema_listo = set()
+_esquema_lock = threading.Lock()
+
+
+# ------------------------------
+# 🔧 Helpers
+# ------------------------------
+
+def _conectar() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(USO_DB)), exist_ok=True)
+    conn = sqlite3.connect(USO_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    with _esquema_lock:
+        if USO_DB not in _esquema_listo:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_ESQUEMA)
+            _esquema_listo.add(USO_DB)
+    return conn
+
+
+def costo_usd(modelo: str, prompt_tokens: int, completion_tokens: int, tipo: str = "chat") -> float | None:
+    """
+    Costo de una llamada según PRECIOS_POR_MILLON, o None si no se conoce el modelo.
+    """
+    precio = PRECIOS_POR_MILLON.get(modelo)
+    if precio is None:
+        return None
+    costo = (prompt_tokens * precio[0] + completion_tokens * precio[1]) / 1_000_000
+    return costo * DESCUENTO_LOTE if tipo == "lote" else costo
+
+
+def iniciar_uso(endpoint: str | None = None, fecha: str | None = None):
+    """
+    Atribuye las llamadas al modelo que sigan a un endpoint y/o a una fecha
+    de datos (o rango "desde..hasta"); lo que no se pasa se hereda. Devuelve
+    el token para terminar_uso().
+    """
+    actual = dict(_contexto.get())
+    if endpoint is not None:
+        actual["endpoint"] = endpoint
+    if fecha is not None:
+        actual["fecha"] = fecha
+    return _contexto.set(actual)
+
+
+def terminar_uso(token) -> None:
+    _contexto.reset(token)
+
+
+@contextmanager
+def uso(endpoint: str | None = None, fecha: str | None = None):
+    """
+    iniciar_uso() para un bloque: el request fija el endpoint y cada resumen
+    su fecha. No sirve alrededor de un yield si el generador avanza en
+    threads distintos (asgi_dap): ahí la fecha se pasa a registrar_uso.
+    """
+    token = iniciar_uso(endpoint, fecha)
+    try:
+        yield
+    finally:
+        terminar_uso(token)
+
+
+# ------------------------------
+# 🧾 Registro
+# ------------------------------
+
+def registrar_uso(modelo: str, usage, segundos: float | None = None, tipo: str = "chat",
+                  fecha: str | None = None) -> None:
+    """
+    Agrega un renglón a la bitácora: tokens de `usage` (el de la respuesta,
+    puede ser None), latencia, endpoint y fecha del contexto (ver uso()) y
+    costo estimado. tipo es "chat", "stream" o "lote". Si la base falla se
+    avisa y se sigue: la bitácora nunca tumba un request.
+    """
+    if not USO_ACTIVO:
+        return
+    contexto = _contexto.get()
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    completion = int(getattr(usage, "completion_tokens", 0) or 0)
+    ahora = time.time()
+    try:
+        conn = _conectar()
+        try:
+            conn.execute(
+                "INSERT INTO uso_llm (ts, dia, endpoint, fecha, modelo, tipo, prompt_tokens,"
+                " completion_tokens, segundos, costo_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ahora, date.fromtimestamp(ahora).isoformat(),
+                    contexto.get("endpoint") or "sin_endpoint", fecha or contexto.get("fecha"),
+                    modelo, tipo, prompt, completion, segundos,
+                    costo_usd(modelo, prompt, completion, tipo),
+                ),
+            )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo registrar el uso del modelo en {USO_DB}: {e}")
+
+
+# ------------------------------
+# 📊 Reporte
+# ------------------------------
+
+def reporte_uso(desde: date | None = None, hasta: date | None = None,
+                por: tuple = ("dia", "endpoint", "modelo")) -> dict:
+    """
+    Suma la bitácora entre dos días de llamada (inclusive; por defecto los
+    últimos 30), agrupando por las columnas de `por` (ver AGRUPACIONES).
+    Las filas salen de la de más costo a la de menos; "total" suma todo.
+    """
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=29)
+    if desde > hasta:
+        raise ValueError("'desde' no puede ser posterior a 'hasta'")
+    desconocidas = [c for c in por if c not in AGRUPACIONES]
+    if desconocidas:
+        raise ValueError(f"No se puede agrupar por {', '.join(desconocidas)} (opciones: {', '.join(AGRUPACIONES)})")
+
+    agregados = """
+        COUNT(*) AS llamadas,
+        COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+        COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+        ROUND(COALESCE(SUM(costo_usd), 0), 6) AS costo_usd,
+        ROUND(AVG(segundos), 3) AS segundos_promedio,
+        ROUND(MAX(segundos), 3) AS segundos_max
+    """
+    rango = (desde.isoformat(), hasta.isoformat())
+    columnas = ", ".join(por)
+    conn = _conectar()
+    try:
+        filas = conn.execute(
+            f"SELECT {columnas + ', ' if por else ''}{agregados} FROM uso_llm"
+            f" WHERE dia BETWEEN ? AND ?"
+            f"{' GROUP BY ' + columnas if por else ''} ORDER BY costo_usd DESC, llamadas DESC",
+            rango,
+        ).fetchall()
+        total = conn.execute(f"SELECT {agregados} FROM uso_llm WHERE dia BETWEEN ? AND ?", rango).fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "por": list(por),
+        "filas": [dict(f) for f in filas],
+        "total": dict(total),
+    }